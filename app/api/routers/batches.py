@@ -0,0 +1,47 @@
+from typing import Annotated, cast
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import FileResponse, Response
+
+from app.schemas.batch import BatchEndpoint, BatchJob
+from app.services.batch_service import BatchService
+
+router = APIRouter()
+
+
+def _service(request: Request) -> BatchService:
+    return cast(BatchService, request.app.state.batch_service)
+
+
+@router.post("/batches", response_model=BatchJob, status_code=202)
+async def create_batch(request: Request, endpoint: Annotated[BatchEndpoint, Query()]) -> BatchJob:
+    """
+    Start a job from a JSONL request body (one ChatRequest / EmbeddingsRequest per line).
+
+    The body is spooled to disk as it arrives; poll GET /batches/{id} for progress.
+    """
+    return await _service(request).create(endpoint, request.stream())
+
+
+@router.get("/batches")
+def list_batches(request: Request) -> dict[str, list[BatchJob]]:
+    return {"data": _service(request).list()}
+
+
+@router.get("/batches/{batch_id}", response_model=BatchJob)
+def get_batch(batch_id: str, request: Request) -> BatchJob:
+    return _service(request).get(batch_id)
+
+
+@router.get("/batches/{batch_id}/output", response_class=FileResponse)
+def get_batch_output(batch_id: str, request: Request) -> Response:
+    """Results written so far (JSONL, completion order; each line carries its input `line`)."""
+    path = _service(request).output_path(batch_id)
+    if not path.exists():
+        return Response(content=b"", media_type="application/jsonl")
+    return FileResponse(path, media_type="application/jsonl")
+
+
+@router.post("/batches/{batch_id}/cancel", response_model=BatchJob)
+async def cancel_batch(batch_id: str, request: Request) -> BatchJob:
+    return await _service(request).cancel(batch_id)
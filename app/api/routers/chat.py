@@ -1,22 +1,66 @@
+import json
+import logging
+from collections.abc import AsyncIterator
 from typing import cast
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
 
-from app.schemas.chat import ChatRequest, ChatResponse
+from app.core.errors import AppError
+from app.core.serialization import JSONBytesResponse, dumps
+from app.schemas.chat import ChatRequest, ChatResponse, ChatStreamDelta, ChatStreamEnd
 from app.services.chat_service import ChatService
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+
+def _sse(data: str, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n"
+
+
+def _frame(item: ChatStreamDelta | ChatStreamEnd) -> str:
+    if isinstance(item, ChatStreamEnd):
+        return _sse(item.model_dump_json(), event="done")
+    return _sse(item.model_dump_json())
+
+
+async def _relay(first: ChatStreamDelta | ChatStreamEnd, events: AsyncIterator[ChatStreamDelta | ChatStreamEnd]) -> AsyncIterator[str]:
+    yield _frame(first)
+    try:
+        async for item in events:
+            yield _frame(item)
+    except AppError as e:
+        # Headers are already sent, so the error travels in-band as its own event
+        logger.warning("chat stream aborted", extra={"fields": {"code": e.code}})
+        yield _sse(json.dumps(e.to_payload()), event="error")
+
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest, request: Request) -> ChatResponse:
+async def chat(req: ChatRequest, request: Request) -> Response:
     """
     Thin route:
     - validates input via Pydantic
     - delegates business logic to ChatService
-    - returns stable response schema
+    - returns stable response schema (or an SSE stream when `stream` is true),
+      encoded once here rather than re-validated by FastAPI (app.core.serialization)
 
     ChatService is stored on app.state to keep wiring centralized in create_app().
     """
     chat_service = cast(ChatService, request.app.state.chat_service)
-    return await chat_service.chat(req)
\ No newline at end of file
+
+    if not req.stream:
+        return JSONBytesResponse(dumps(await chat_service.chat(req)))
+
+    # Pull the first event before committing to a 200: errors raised while
+    # connecting upstream still go through the regular AppError handler.
+    events = chat_service.stream(req)
+    first = await anext(events)
+
+    return StreamingResponse(
+        _relay(first, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
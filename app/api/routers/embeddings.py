@@ -1,14 +1,32 @@
 from typing import cast
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 
+from app.core.serialization import JSONBytesResponse
 from app.schemas.embed import EmbeddingsRequest, EmbeddingsResponse
 from app.services.embed_service import EmbeddingsService
 
 router = APIRouter()
 
 
-@router.post("/embeddings", response_model=EmbeddingsResponse)
-async def embeddings(req: EmbeddingsRequest, request: Request) -> EmbeddingsResponse:
+@router.post(
+    "/embeddings",
+    response_model=EmbeddingsResponse,
+    responses={200: {"content": {"application/octet-stream": {}}, "description": "JSON, or a float32 .npy matrix when encoding_format=binary"}},
+)
+async def embeddings(req: EmbeddingsRequest, request: Request) -> Response:
     embed_service = cast(EmbeddingsService, request.app.state.embeddings_service)
-    return await embed_service.embed(req)
\ No newline at end of file
+
+    if req.encoding_format != "binary":
+        # Encoded by the service: response_model only documents the body
+        return JSONBytesResponse(await embed_service.embed_json(req))
+
+    result = await embed_service.embed_binary(req)
+    headers = {
+        "X-Embeddings-Model": result.model,
+        "X-Embeddings-Latency-ms": f"{result.latency_ms:.2f}",
+    }
+    if result.usage is not None and result.usage.total_tokens is not None:
+        headers["X-Embeddings-Total-Tokens"] = str(result.usage.total_tokens)
+
+    return Response(content=result.body, media_type="application/octet-stream", headers=headers)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    Prometheus text exposition of the in-process metrics registry
+    (in multi-worker mode: the sum over all workers).
+    """
+    registry = request.app.state.metrics
+    if registry is None:
+        return PlainTextResponse("# metrics disabled (METRICS_ENABLED=false)\n", status_code=404)
+    publisher = request.app.state.metrics_publisher
+    body = await publisher.render() if publisher is not None else registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
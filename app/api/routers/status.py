@@ -0,0 +1,36 @@
+import os
+from typing import cast
+
+from fastapi import APIRouter, Request
+
+from app.core.concurrency import ConcurrencyLimiterRegistry
+from app.core.logging import logging_stats
+from app.core.rate_limit import RateLimiterRegistry
+
+router = APIRouter()
+
+
+@router.get("/status")
+def status(request: Request) -> dict:
+    """
+    Runtime state of the gateway's protective layers, for dashboards and debugging.
+    """
+    limiters = cast(ConcurrencyLimiterRegistry, request.app.state.limiters)
+    rate_limiters = cast(RateLimiterRegistry, request.app.state.rate_limiters)
+    return {
+        "limiters": limiters.snapshot(),
+        "rate_limits": rate_limiters.snapshot(),
+        "backends": {kind: pool.snapshot() for kind, pool in request.app.state.backend_pools.items()},
+        "coalescing": {kind: provider.stats() for kind, provider in request.app.state.coalescing.items()},
+        "retries": retrier.stats() if (retrier := request.app.state.retrier) is not None else None,
+        "hedging": request.app.state.hedging.stats() if request.app.state.hedging is not None else None,
+        "response_cache": cache.stats() if (cache := request.app.state.response_cache) is not None else None,
+        "embed_cache": cache.stats() if (cache := request.app.state.embed_cache) is not None else None,
+        "embed_batching": batching.stats() if (batching := request.app.state.embed_batching) is not None else None,
+        "semantic_cache": semantic.stats() if (semantic := request.app.state.semantic_cache) is not None else None,
+        "tokens": request.app.state.tokens.stats(),
+        "embed_store": store.stats() if (store := request.app.state.embed_store) is not None else None,
+        "history_trimming": trimmer.stats() if (trimmer := request.app.state.history_trimmer) is not None else None,
+        "logging": logging_stats(),
+        "worker": {"pid": os.getpid(), "shared_state": shared.stats() if (shared := request.app.state.shared_state) is not None else None},
+    }
@@ -0,0 +1,89 @@
+"""
+Run a JSONL batch of chat / embeddings requests locally, without a server.
+
+Uses the same services (and so the same caches, limits and routing) as the
+API, configured from the environment as usual:
+
+    python -m app.batch evals.jsonl --endpoint chat --output results.jsonl --concurrency 16
+
+Each input line is a ChatRequest / EmbeddingsRequest body, or
+{"custom_id": "...", "body": {...}}. Results are appended to --output as they
+finish; progress goes to stderr. A checkpoint is kept next to the output
+(<output>.checkpoint.json): rerunning the same command after an interruption
+picks up where it stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+from app.main import create_app
+from app.schemas.batch import BatchJob
+from app.services.batch_service import BatchRunner
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.batch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="JSONL file, one request per line")
+    parser.add_argument("--endpoint", choices=["chat", "embeddings"], required=True)
+    parser.add_argument("--output", type=Path, required=True, help="results JSONL (appended to when resuming)")
+    parser.add_argument("--concurrency", type=int, default=8, help="lines in flight")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="results between checkpoints")
+    parser.add_argument("--log", action="store_true", help="keep gateway INFO logs on stdout")
+    return parser.parse_args(argv)
+
+
+async def _report_progress(job: BatchJob, every_s: float = 1.0) -> None:
+    while True:
+        await asyncio.sleep(every_s)
+        print(f"\r{job.lines_done} done ({job.lines_failed} failed)", end="", file=sys.stderr, flush=True)
+
+
+async def run(args: argparse.Namespace) -> BatchJob:
+    app = create_app(resume_batches=False)
+    # The lifespan loads the encoder and prewarms connections, and on the way out
+    # flushes the embeddings store and closes the HTTP client
+    async with app.router.lifespan_context(app):
+        runner = BatchRunner(
+            chat_service=app.state.chat_service,
+            embeddings_service=app.state.embeddings_service,
+            concurrency=args.concurrency,
+            checkpoint_every=args.checkpoint_every,
+        )
+
+        job = BatchJob(id=args.output.stem, endpoint=args.endpoint, status="running", created_at=time.time(), started_at=time.time())
+        progress = asyncio.create_task(_report_progress(job))
+        try:
+            await runner.run(
+                job,
+                input_path=args.input,
+                output_path=args.output,
+                checkpoint_path=args.output.with_name(args.output.name + ".checkpoint.json"),
+            )
+        finally:
+            progress.cancel()
+
+    job.status = "completed"
+    job.finished_at = time.time()
+    return job
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if not args.log:
+        logging.disable(logging.INFO)
+    try:
+        job = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\ninterrupted; rerun the same command to resume", file=sys.stderr)
+        sys.exit(130)
+    print(file=sys.stderr)
+    print(job.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
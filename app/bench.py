@@ -0,0 +1,329 @@
+"""
+Offline load-test harness for the gateway.
+
+Builds the real app with create_app(), swapping the upstream vendors for
+simulated providers (latency distribution, failure rate, embedding size),
+then drives open-loop traffic through the in-process ASGI client and prints
+a JSON report (throughput, latency percentiles, status codes, memory).
+
+    python -m app.bench --endpoint chat --rps 500 --duration 10 \\
+        --latency-dist lognormal --latency-ms 80 --failure-rate 0.01
+
+Open loop: requests are sent on a fixed schedule whether or not earlier
+ones have finished, and latency is measured from the scheduled send time,
+so a slow gateway can't hide its queueing (no coordinated omission).
+Requests that would exceed --concurrency in flight are counted as dropped.
+
+Gateway settings (caches, limits, batching, ...) come from the environment
+as usual; the report echoes the harness parameters and the git commit so
+runs can be compared between commits.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from array import array
+from collections import Counter
+from collections.abc import AsyncIterator
+from typing import Any, Literal
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.errors import UpstreamUnavailable
+from app.core.tokens import default_counter, estimate_tokens
+from app.main import create_app
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+LatencyDist = Literal["constant", "uniform", "exponential", "lognormal"]
+
+
+class SimulatedLatency:
+    """Upstream latency sampler with a given mean (ms); `sigma` shapes the lognormal tail."""
+
+    def __init__(self, dist: LatencyDist, mean_ms: float, sigma: float, rng: random.Random) -> None:
+        self.dist = dist
+        self.mean_s = mean_ms / 1000.0
+        self.sigma = sigma
+        self.rng = rng
+        # lognormal parameterised so that E[X] == mean
+        self._mu = math.log(self.mean_s) - sigma**2 / 2 if self.mean_s > 0 else 0.0
+
+    def sample(self) -> float:
+        if self.mean_s <= 0:
+            return 0.0
+        if self.dist == "uniform":
+            return self.rng.uniform(0.0, 2 * self.mean_s)
+        if self.dist == "exponential":
+            return self.rng.expovariate(1.0 / self.mean_s)
+        if self.dist == "lognormal":
+            return self.rng.lognormvariate(self._mu, self.sigma)
+        return self.mean_s
+
+
+class SimulatedChatProvider(ChatProvider):
+    """Chat upstream with sampled latency, random failures and estimated token usage."""
+
+    def __init__(self, name: str, latency: SimulatedLatency, failure_rate: float, rng: random.Random, output_words: int = 32) -> None:
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.output_words = output_words
+
+    async def _upstream_delay(self) -> None:
+        await asyncio.sleep(self.latency.sample())
+        if self.rng.random() < self.failure_rate:
+            raise UpstreamUnavailable("Simulated upstream failure")
+
+    def _usage(self, messages: list[ChatMessage], model: str, text: str) -> dict[str, int]:
+        prompt = default_counter.count_chat(messages, model)
+        completion = default_counter.count(text, model)
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        await self._upstream_delay()
+        text = " ".join(["token"] * self.output_words)
+        return {"text": text, "model": model, "usage": self._usage(messages, model, text)}
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        # Sampled latency is time to first token; the rest streams back-to-back
+        await self._upstream_delay()
+        for i in range(self.output_words):
+            yield {"text": "token" if i == 0 else " token"}
+            await asyncio.sleep(0)
+        text = " ".join(["token"] * self.output_words)
+        yield {"text": "", "model": model, "usage": self._usage(messages, model, text)}
+
+
+class SimulatedEmbeddingsProvider(EmbeddingsProvider):
+    """Embeddings upstream returning float32 vectors of a configurable dimension."""
+
+    def __init__(self, name: str, latency: SimulatedLatency, failure_rate: float, rng: random.Random, dim: int) -> None:
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.vector = array("f", (rng.uniform(-1, 1) for _ in range(dim)))
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        await asyncio.sleep(self.latency.sample())
+        if self.rng.random() < self.failure_rate:
+            raise UpstreamUnavailable("Simulated upstream failure")
+        return {
+            "embeddings": [array("f", self.vector) for _ in inputs],
+            "model": model,
+            "usage": {"total_tokens": sum(estimate_tokens(t) for t in inputs)},
+        }
+
+
+def build_app(args: argparse.Namespace) -> FastAPI:
+    rng = random.Random(args.seed)
+    upstreams: list[tuple[str, ChatProvider, EmbeddingsProvider]] = []
+    for i in range(args.backends):
+        name = f"sim{i}"
+        latency = SimulatedLatency(args.latency_dist, args.latency_ms, args.latency_sigma, rng)
+        upstreams.append((
+            name,
+            SimulatedChatProvider(name, latency, args.failure_rate, rng, output_words=args.output_words),
+            SimulatedEmbeddingsProvider(name, latency, args.failure_rate, rng, dim=args.embed_dim),
+        ))
+    return create_app(upstreams=upstreams)
+
+
+def _request(args: argparse.Namespace, i: int) -> tuple[str, dict[str, Any]]:
+    # Unique text per request so response caches don't turn the run into a cache benchmark
+    words = " ".join(["lorem"] * args.prompt_words)
+    if args.endpoint == "embeddings":
+        return "/v1/embeddings", {"input": [f"{i}-{j} {words}" for j in range(args.batch_size)], "encoding_format": args.encoding_format}
+    return "/v1/chat", {
+        "messages": [{"role": "user", "content": f"{i} {words}"}],
+        "temperature": 0,
+        "max_output_tokens": args.output_words * 2,
+        "stream": args.endpoint == "chat_stream",
+    }
+
+
+def _percentiles(latencies: list[float]) -> dict[str, float | None]:
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float | None:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)] * 1000.0, 3)
+
+    return {
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "p999_ms": pct(0.999),
+        "max_ms": pct(1.0),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000.0, 3) if ordered else None,
+    }
+
+
+def _rss_mb() -> dict[str, float | None]:
+    current: float | None = None
+    peak: float | None = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # KiB on Linux, bytes on macOS
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    except ImportError:
+        pass
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "max_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+async def run_load(app: FastAPI, args: argparse.Namespace) -> dict[str, Any]:
+    total = max(1, int(args.rps * args.duration))
+    interval = 1.0 / args.rps
+
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    in_flight: set[asyncio.Task[None]] = set()
+    dropped = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i: int, scheduled: float) -> None:
+            path, payload = _request(args, i)
+            try:
+                if args.endpoint == "chat_stream":
+                    async with client.stream("POST", path, json=payload) as response:
+                        async for _ in response.aiter_raw():
+                            pass
+                else:
+                    response = await client.post(path, json=payload)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                return
+            if response.status_code < 400:
+                latencies.append(time.perf_counter() - scheduled)
+
+        for i in range(args.warmup):
+            await one(-1 - i, time.perf_counter())
+        latencies.clear()
+        statuses.clear()
+
+        memory_before = _rss_mb()
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= args.concurrency:
+                dropped += 1
+                continue
+            task = asyncio.create_task(one(i, scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        sent_s = time.perf_counter() - start
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        elapsed = time.perf_counter() - start
+
+    completed = sum(n for code, n in statuses.items() if code.isdigit())
+    return {
+        "requests": {
+            "scheduled": total,
+            "sent": total - dropped,
+            "dropped": dropped,
+            "ok": len(latencies),
+            "statuses": dict(sorted(statuses.items())),
+        },
+        "throughput": {
+            "target_rps": args.rps,
+            "offered_rps": round((total - dropped) / sent_s, 1) if sent_s > 0 else None,
+            "completed_rps": round(completed / elapsed, 1),
+            "ok_rps": round(len(latencies) / elapsed, 1),
+            "elapsed_s": round(elapsed, 3),
+        },
+        "latency": _percentiles(latencies),
+        "memory": {"before": memory_before, "after": _rss_mb()},
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    traffic = parser.add_argument_group("traffic")
+    traffic.add_argument("--endpoint", choices=["chat", "chat_stream", "embeddings"], default="chat")
+    traffic.add_argument("--rps", type=float, default=200.0, help="target arrival rate (open loop)")
+    traffic.add_argument("--duration", type=float, default=5.0, help="seconds of traffic")
+    traffic.add_argument("--concurrency", type=int, default=256, help="max requests in flight; arrivals beyond it are dropped")
+    traffic.add_argument("--warmup", type=int, default=10, help="sequential requests before measuring")
+    traffic.add_argument("--prompt-words", type=int, default=50)
+    traffic.add_argument("--batch-size", type=int, default=8, help="inputs per embeddings request")
+    traffic.add_argument("--encoding-format", choices=["float", "base64", "binary"], default="float")
+
+    upstream = parser.add_argument_group("simulated upstream")
+    upstream.add_argument("--backends", type=int, default=1, help="number of simulated upstream backends (>1 enables routing)")
+    upstream.add_argument("--latency-dist", choices=["constant", "uniform", "exponential", "lognormal"], default="lognormal")
+    upstream.add_argument("--latency-ms", type=float, default=50.0, help="mean upstream latency")
+    upstream.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal shape (tail heaviness)")
+    upstream.add_argument("--failure-rate", type=float, default=0.0)
+    upstream.add_argument("--output-words", type=int, default=32, help="chat completion length")
+    upstream.add_argument("--embed-dim", type=int, default=1536)
+    upstream.add_argument("--seed", type=int, default=0)
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", help="also write the JSON report to this file")
+    output.add_argument("--log", action="store_true", help="keep gateway INFO logs (off by default: stdout is the report)")
+    return parser.parse_args(argv)
+
+
+async def bench(args: argparse.Namespace) -> dict[str, Any]:
+    app = build_app(args)
+    if not args.log:
+        logging.disable(logging.INFO)
+    try:
+        result = await run_load(app, args)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "log")}
+    return {"commit": _git_commit(), "params": params, **result}
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(bench(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
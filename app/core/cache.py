@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store behind the response caches.
+
+    Values are JSON-compatible dicts so an out-of-process backend
+    (e.g. Redis) can be dropped in without changing callers.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> dict[str, Any] | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: dict[str, Any], ttl_s: float | None = None) -> None:
+        raise NotImplementedError
+
+
+class InMemoryCache(CacheBackend):
+    """
+    Bounded in-process cache with LRU + TTL eviction.
+
+    - max_entries caps memory (least recently used entry goes first)
+    - expired entries are dropped lazily on read, or pushed out by LRU
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float | None = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[str, tuple[float | None, dict[str, Any]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any], ttl_s: float | None = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, memory-capped store for embedding vectors.
+
+    Layout choices (millions of chunks must fit in RAM):
+    - key is (model, sha256(text)) -> 32 raw bytes, never the text itself
+    - value is an array('f') (4 bytes/dim) instead of a list of Python floats (~32 bytes/dim)
+    - size is tracked in bytes; the least recently used vectors are evicted past max_bytes
+    """
+
+    # Rough per-entry bookkeeping cost (key tuple, digest bytes, dict node, array header)
+    ENTRY_OVERHEAD_BYTES = 256
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._data: OrderedDict[tuple[str, bytes], array[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @staticmethod
+    def key(model: str, text: str) -> tuple[str, bytes]:
+        return model, hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get(self, key: tuple[str, bytes]) -> array[float] | None:
+        vector = self._data.get(key)
+        if vector is not None:
+            self._data.move_to_end(key)
+        return vector
+
+    def put(self, key: tuple[str, bytes], vector: array[float]) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size_bytes -= self._entry_size(old)
+
+        self._data[key] = vector
+        self.size_bytes += self._entry_size(vector)
+
+        while self.size_bytes > self.max_bytes and self._data:
+            _, evicted = self._data.popitem(last=False)
+            self.size_bytes -= self._entry_size(evicted)
+
+    def _entry_size(self, vector: array[float]) -> int:
+        return vector.itemsize * len(vector) + self.ENTRY_OVERHEAD_BYTES
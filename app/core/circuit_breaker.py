@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Literal
+
+State = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker for one upstream backend.
+
+    - closed: traffic flows; `failure_threshold` consecutive failures open it
+    - open: traffic is refused for `reset_timeout_s`
+    - half_open: one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+
+        self.state: State = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures}
+
+    def available(self) -> bool:
+        """Would allow() let a call through right now? (no state change)"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self._opened_at >= self.reset_timeout_s
+        return not self._trial_in_flight
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout_s:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+
+        # half_open: exactly one trial at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """The call ended without a verdict on the backend (cancelled, deadline, local load shedding): free the half-open trial slot."""
+        self._trial_in_flight = False
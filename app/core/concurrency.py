@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Any
+
+from app.core.errors import Overloaded
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for one upstream (provider, model).
+
+    - the limit grows by ~1 per "window" of fast calls (additive increase)
+    - it shrinks by `backoff` when smoothed latency is well above the baseline
+      (at most once per `limit` calls, like TCP's once-per-RTT) or at once
+      when the upstream reports overload (multiplicative decrease)
+    - callers beyond the limit wait in a bounded FIFO queue; when that is full
+      they fail fast with Overloaded (503 + Retry-After) instead of piling up
+
+    Latency is judged on its EWMA, not per call: with heavy-tailed upstreams
+    single calls routinely exceed 2x the fastest one without any congestion.
+    Baseline is the minimum EWMA over the previous sample window, so it
+    follows genuine shifts (new model, new region) instead of sticking to
+    one lucky sample forever.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        max_queue: int = 100,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.9,
+        window: int = 100,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.window = window
+
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+        self._baseline_s: float | None = None
+        self._window_min_s = float("inf")
+        self._window_count = 0
+        self._ewma_s: float | None = None
+        self._since_decrease = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "baseline_ms": round(self._baseline_s * 1000.0, 2) if self._baseline_s is not None else None,
+            "ewma_ms": round(self._ewma_s * 1000.0, 2) if self._ewma_s is not None else None,
+        }
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("Too many in-flight upstream requests", retry_after_s=self._retry_after_s())
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over right before cancellation: pass it on
+                self.in_flight -= 1
+                self._wake()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self, latency_s: float | None, overloaded: bool = False) -> None:
+        """
+        Free a slot and feed the sample into the AIMD controller.
+
+        latency_s=None releases without adjusting (e.g. a client error unrelated to load).
+        """
+        self.in_flight -= 1
+
+        if overloaded:
+            self._decrease()
+        elif latency_s is not None:
+            self._observe(latency_s)
+
+        self._wake()
+
+    def _observe(self, latency_s: float) -> None:
+        ewma = self._ewma_s = latency_s if self._ewma_s is None else 0.9 * self._ewma_s + 0.1 * latency_s
+
+        self._window_min_s = min(self._window_min_s, ewma)
+        self._window_count += 1
+        if self._baseline_s is None or self._window_count >= self.window:
+            self._baseline_s = self._window_min_s
+            self._window_min_s = float("inf")
+            self._window_count = 0
+
+        self._since_decrease += 1
+        if ewma > self.latency_tolerance * self._baseline_s:
+            # Calls started before the last decrease still carry the old queueing
+            if self._since_decrease >= self.limit:
+                self._decrease()
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def _decrease(self) -> None:
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self._since_decrease = 0
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _retry_after_s(self) -> float:
+        # Time to drain the current queue at the current limit
+        per_call = self._ewma_s if self._ewma_s is not None else 1.0
+        return max(1.0, len(self._waiters) * per_call / max(self.limit, 1.0))
+
+
+class ConcurrencyLimiterRegistry:
+    """One AdaptiveConcurrencyLimiter per (provider, model), created on first use."""
+
+    def __init__(self, **limiter_kwargs: Any) -> None:
+        self._limiter_kwargs = limiter_kwargs
+        self._limiters: dict[tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+
+    def get(self, provider: str, model: str) -> AdaptiveConcurrencyLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(**self._limiter_kwargs)
+            self._limiters[key] = limiter
+        return limiter
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {f"{provider}/{model}": limiter.snapshot() for (provider, model), limiter in self._limiters.items()}
@@ -1,7 +1,22 @@
-from pydantic import Field
+from pydantic import AliasChoices, BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class BackendConfig(BaseModel):
+    """
+    One upstream deployment (key / region / endpoint) in PROVIDER_BACKENDS.
+
+    PROVIDER_BACKENDS='[{"name": "us", "api_key": "..."}, {"name": "eu", "api_key": "...", "base_url": "..."}]'
+    """
+    name: str
+    # a name in app.providers.registry ("openai", "fake")
+    kind: str = "openai"
+    api_key: str = ""
+    base_url: str | None = None
+    # fake backends only: simulated upstream latency
+    latency_ms: float = 0.0
+
+
 class Settings(BaseSettings):
     """
     Centralized config (12-factor).
@@ -12,12 +27,129 @@ class Settings(BaseSettings):
     app_env: str = Field(default="dev", alias="APP_ENV")
 
     openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
-    openai_timeout_s: float = Field(default=20.0, alias="OPENAI_TIMEOUT_S")
-    openai_max_retries: int = Field(default=2, alias="OPENAI_MAX_RETRIES")
+
+    # Per-request deadline: X-Request-Timeout-ms header, else the default; capped by the max (0 = none)
+    request_default_timeout_ms: float = Field(default=0.0, alias="REQUEST_DEFAULT_TIMEOUT_MS")
+    request_max_timeout_ms: float = Field(default=0.0, alias="REQUEST_MAX_TIMEOUT_MS")
+
+    # Gateway-managed upstream retries (the SDK does not retry): jittered exponential backoff,
+    # within the request deadline and a global budget of retries per request;
+    # OPENAI_MAX_RETRIES is the old name of the retry count
+    upstream_max_retries: int = Field(default=2, validation_alias=AliasChoices("UPSTREAM_MAX_RETRIES", "OPENAI_MAX_RETRIES"))
+    retry_budget_ratio: float = Field(default=0.1, alias="RETRY_BUDGET_RATIO")
+    retry_min_per_s: float = Field(default=10.0, alias="RETRY_MIN_PER_S")
+    retry_backoff_base_ms: float = Field(default=100.0, alias="RETRY_BACKOFF_BASE_MS")
+    retry_backoff_max_ms: float = Field(default=2000.0, alias="RETRY_BACKOFF_MAX_MS")
+
+    # Shared upstream HTTP client: one pool per origin for all providers, prewarmed at startup
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(default=20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    http_keepalive_expiry_s: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY_S")
+    http2_enabled: bool = Field(default=False, alias="HTTP2_ENABLED")
+    http_connect_timeout_s: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT_S")
+    # OPENAI_TIMEOUT_S is the old name of the read timeout
+    http_read_timeout_s: float = Field(default=20.0, validation_alias=AliasChoices("HTTP_READ_TIMEOUT_S", "OPENAI_TIMEOUT_S"))
+    http_pool_timeout_s: float = Field(default=5.0, alias="HTTP_POOL_TIMEOUT_S")
+    http_prewarm_connections: int = Field(default=2, alias="HTTP_PREWARM_CONNECTIONS")
+
+    # Logging: async = bounded queue + writer thread; success access logs can be sampled
+    log_async: bool = Field(default=True, alias="LOG_ASYNC")
+    log_queue_size: int = Field(default=10000, alias="LOG_QUEUE_SIZE")
+    access_log_sample_rate: float = Field(default=1.0, alias="ACCESS_LOG_SAMPLE_RATE")
+
+    # In-process Prometheus-style metrics at /v1/metrics
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
+    # Multi-worker mode (python -m app.serve): worker processes, and the state server
+    # they share the chat cache, rate limits and metrics through (set by app.serve)
+    workers: int = Field(default=1, alias="WEB_CONCURRENCY")
+    shared_state_socket: str = Field(default="", alias="SHARED_STATE_SOCKET")
+    shared_state_timeout_s: float = Field(default=1.0, alias="SHARED_STATE_TIMEOUT_S")
+    metrics_push_interval_s: float = Field(default=1.0, alias="METRICS_PUSH_INTERVAL_S")
 
     default_chat_model: str = Field(default="gpt-4o-mini", alias="DEFAULT_CHAT_MODEL")
     default_embed_model: str = Field(default="text-embedding-3-small", alias="DEFAULT_EMBED_MODEL")
 
+    # Pre-flight check of prompt tokens + max_output_tokens against the model's context window;
+    # MODEL_CONTEXT_WINDOWS='{"my-model": 32768}' adds or overrides windows (by model prefix)
+    context_check_enabled: bool = Field(default=True, alias="CONTEXT_CHECK_ENABLED")
+    model_context_windows: dict[str, int] = Field(default_factory=dict, alias="MODEL_CONTEXT_WINDOWS")
+
+    # Chat history trimming: keeps system messages and the latest turns within a prompt token budget;
+    # CHAT_HISTORY_MODEL_BUDGETS='{"gpt-4o": 16000}' sets budgets per model prefix
+    chat_history_trim_enabled: bool = Field(default=False, alias="CHAT_HISTORY_TRIM_ENABLED")
+    chat_history_budget_tokens: int = Field(default=8000, alias="CHAT_HISTORY_BUDGET_TOKENS")
+    chat_history_model_budgets: dict[str, int] = Field(default_factory=dict, alias="CHAT_HISTORY_MODEL_BUDGETS")
+    chat_history_min_truncated_tokens: int = Field(default=64, alias="CHAT_HISTORY_MIN_TRUNCATED_TOKENS")
+
+    # Exact-match chat response cache
+    chat_cache_enabled: bool = Field(default=True, alias="CHAT_CACHE_ENABLED")
+    chat_cache_max_entries: int = Field(default=1024, alias="CHAT_CACHE_MAX_ENTRIES")
+    chat_cache_ttl_s: float = Field(default=300.0, alias="CHAT_CACHE_TTL_S")
+    chat_cache_deterministic_only: bool = Field(default=True, alias="CHAT_CACHE_DETERMINISTIC_ONLY")
+
+    # Semantic chat cache: answers prompts similar to a recent one (embeds each prompt)
+    semantic_cache_enabled: bool = Field(default=False, alias="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(default=0.92, alias="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_embed_model: str = Field(default="", alias="SEMANTIC_CACHE_EMBED_MODEL")
+    semantic_cache_max_mb: int = Field(default=64, alias="SEMANTIC_CACHE_MAX_MB")
+    semantic_cache_ttl_s: float = Field(default=3600.0, alias="SEMANTIC_CACHE_TTL_S")
+    semantic_cache_ann_min_entries: int = Field(default=10_000, alias="SEMANTIC_CACHE_ANN_MIN_ENTRIES")
+    semantic_cache_ann_nprobe: int = Field(default=8, alias="SEMANTIC_CACHE_ANN_NPROBE")
+
+    # Per-text embedding cache (float32 vectors, capped by memory)
+    embed_cache_enabled: bool = Field(default=True, alias="EMBED_CACHE_ENABLED")
+    embed_cache_max_mb: int = Field(default=256, alias="EMBED_CACHE_MAX_MB")
+
+    # Persistent embedding store (memory-mapped files, shared by workers); off unless a directory is set
+    embed_store_dir: str = Field(default="", alias="EMBED_STORE_DIR")
+    embed_store_max_mb: int = Field(default=4096, alias="EMBED_STORE_MAX_MB")
+
+    # Single-flight: identical requests in flight at the same time share one upstream call
+    coalesce_enabled: bool = Field(default=True, alias="COALESCE_ENABLED")
+
+    # Cross-request micro-batching of embeddings calls (per model)
+    embed_batch_enabled: bool = Field(default=True, alias="EMBED_BATCH_ENABLED")
+    embed_batch_window_ms: float = Field(default=5.0, alias="EMBED_BATCH_WINDOW_MS")
+    embed_batch_max_size: int = Field(default=256, alias="EMBED_BATCH_MAX_SIZE")
+    embed_batch_max_tokens: int = Field(default=100_000, alias="EMBED_BATCH_MAX_TOKENS")
+
+    # Oversized embeddings requests are split into provider-sized chunks run concurrently
+    embed_max_chunk_size: int = Field(default=2048, alias="EMBED_MAX_CHUNK_SIZE")
+    embed_max_chunk_tokens: int = Field(default=300_000, alias="EMBED_MAX_CHUNK_TOKENS")
+    embed_chunk_concurrency: int = Field(default=4, alias="EMBED_CHUNK_CONCURRENCY")
+
+    # Adaptive (AIMD) concurrency limit per upstream (provider, model)
+    concurrency_limit_enabled: bool = Field(default=True, alias="CONCURRENCY_LIMIT_ENABLED")
+    concurrency_initial_limit: int = Field(default=20, alias="CONCURRENCY_INITIAL_LIMIT")
+    concurrency_min_limit: int = Field(default=1, alias="CONCURRENCY_MIN_LIMIT")
+    concurrency_max_limit: int = Field(default=200, alias="CONCURRENCY_MAX_LIMIT")
+    concurrency_max_queue: int = Field(default=100, alias="CONCURRENCY_MAX_QUEUE")
+    concurrency_latency_tolerance: float = Field(default=2.0, alias="CONCURRENCY_LATENCY_TOLERANCE")
+
+    # Client-side provider quota per (provider, model); 0 = learn from x-ratelimit-* headers
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_rpm: int = Field(default=0, alias="RATE_LIMIT_RPM")
+    rate_limit_tpm: int = Field(default=0, alias="RATE_LIMIT_TPM")
+    rate_limit_max_wait_s: float = Field(default=5.0, alias="RATE_LIMIT_MAX_WAIT_S")
+
+    # Multi-backend routing (empty = single backend chosen from OPENAI_API_KEY)
+    provider_backends: list[BackendConfig] = Field(default_factory=list, alias="PROVIDER_BACKENDS")
+    breaker_failure_threshold: int = Field(default=5, alias="BREAKER_FAILURE_THRESHOLD")
+    breaker_reset_timeout_s: float = Field(default=30.0, alias="BREAKER_RESET_TIMEOUT_S")
+
+    # Hedged chat requests: duplicate a call still running past the model's p95
+    chat_hedge_enabled: bool = Field(default=False, alias="CHAT_HEDGE_ENABLED")
+    chat_hedge_percentile: float = Field(default=0.95, alias="CHAT_HEDGE_PERCENTILE")
+    chat_hedge_max_ratio: float = Field(default=0.05, alias="CHAT_HEDGE_MAX_RATIO")
+    chat_hedge_min_samples: int = Field(default=20, alias="CHAT_HEDGE_MIN_SAMPLES")
+
+    # /v1/batches jobs (JSONL in, JSONL out, checkpointed on disk)
+    batch_dir: str = Field(default="data/batches", alias="BATCH_DIR")
+    batch_concurrency: int = Field(default=8, alias="BATCH_CONCURRENCY")
+    batch_checkpoint_every: int = Field(default=100, alias="BATCH_CHECKPOINT_EVERY")
+    batch_max_input_mb: int = Field(default=512, alias="BATCH_MAX_INPUT_MB")
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
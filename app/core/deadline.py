@@ -0,0 +1,155 @@
+"""
+Per-request deadlines.
+
+The middleware sets the deadline from the `X-Request-Timeout-ms` header (or
+REQUEST_DEFAULT_TIMEOUT_MS) as a time.monotonic() instant in a ContextVar, so it
+follows the request through services, providers and the tasks they start:
+- services reject a request whose deadline has passed and bound the provider call by it
+- retries and failovers are only attempted while time is left
+- upstream SDK timeouts are clamped to the time left
+
+Work shared by several requests (coalesced calls, embedding micro-batches) runs
+under a SharedDeadline: the latest deadline among the requests waiting for it, so
+one caller's deadline does not cut the call short for the others, who each still
+wait only until their own. Batch jobs outlive their request and run `detached()`.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.core.errors import DeadlineExceeded
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout-ms"
+
+
+
+class SharedDeadline:
+    """
+    Deadline of work shared by several requests: the latest of theirs, or none
+    as soon as one of them has none.
+
+    Requests join while the work is in flight, which can only push it later.
+    Joining from inside other shared work (a micro-batch under a coalesced call)
+    follows that work's deadline as it moves.
+    """
+
+    __slots__ = ("_sources",)
+
+    def __init__(self) -> None:
+        self._sources: list[float | SharedDeadline | None] = []
+
+    def join(self) -> None:
+        """Add the current request's deadline."""
+        self._sources.append(deadline_ctx.get())
+
+    @property
+    def at(self) -> float | None:
+        latest: float | None = None
+        for source in self._sources:
+            at = source.at if isinstance(source, SharedDeadline) else source
+            if at is None:
+                return None
+            latest = at if latest is None else max(latest, at)
+        return latest
+
+
+# Absolute deadline (time.monotonic()) of the current request, or of the shared work
+# running in this context; None: no deadline
+deadline_ctx: contextvars.ContextVar[float | SharedDeadline | None] = contextvars.ContextVar("deadline", default=None)
+
+
+def parse_timeout_ms(raw: str | None, default_ms: float = 0.0, max_ms: float = 0.0) -> float | None:
+    """
+    Deadline (time.monotonic()) for a request timeout header value.
+
+    Unparseable or missing values fall back to `default_ms` (0: no deadline); `max_ms`
+    (0: no cap) bounds what a client may ask for. Zero or negative timeouts give a
+    deadline that has already passed, so the request is rejected.
+    """
+    timeout_ms: float | None = None
+    if raw is not None:
+        try:
+            timeout_ms = float(raw)
+        except ValueError:
+            timeout_ms = None
+    if timeout_ms is None:
+        if not default_ms:
+            return None
+        timeout_ms = default_ms
+    if max_ms:
+        timeout_ms = min(timeout_ms, max_ms)
+    return time.monotonic() + timeout_ms / 1000.0
+
+
+def current() -> float | None:
+    """The current deadline (time.monotonic()), or None."""
+    deadline = deadline_ctx.get()
+    return deadline.at if isinstance(deadline, SharedDeadline) else deadline
+
+
+def remaining_s() -> float | None:
+    """Seconds left before the current deadline (negative once passed), or None."""
+    deadline = current()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    remaining = remaining_s()
+    return remaining is not None and remaining <= 0
+
+
+def check() -> None:
+    """Raise DeadlineExceeded if the current request's deadline has passed."""
+    if expired():
+        raise DeadlineExceeded()
+
+
+def clamp(timeout_s: float) -> float:
+    """`timeout_s`, shortened to the time left before the deadline."""
+    remaining = remaining_s()
+    return timeout_s if remaining is None else max(0.0, min(timeout_s, remaining))
+
+
+@asynccontextmanager
+async def bounded(at: float | None = None) -> AsyncIterator[None]:
+    """
+    Cancel the enclosed awaits at the deadline and raise DeadlineExceeded.
+
+    `at` is a deadline captured earlier (streams outlive the request context);
+    by default the current request's. Never hold it across the `yield` of an
+    async generator: the generator may be resumed by another task.
+    """
+    deadline = at if at is not None else current()
+    if deadline is None:
+        yield
+        return
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+
+    timeout = asyncio.timeout(remaining)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError:
+        if timeout.expired():
+            raise DeadlineExceeded() from None
+        raise
+
+
+def shared(deadline: SharedDeadline) -> contextvars.Context:
+    """A copy of the current context running under `deadline`, for tasks serving several requests."""
+    context = contextvars.copy_context()
+    context.run(deadline_ctx.set, deadline)
+    return context
+
+
+def detached() -> contextvars.Context:
+    """A copy of the current context without a deadline, for work that outlives its request."""
+    context = contextvars.copy_context()
+    context.run(deadline_ctx.set, None)
+    return context
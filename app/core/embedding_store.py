@@ -0,0 +1,365 @@
+"""
+Disk-backed embedding store, shared by all workers and kept across restarts.
+
+Two files in one directory, both memory-mapped:
+- vectors.bin: append-only records (16-byte key, dim, float32 vector)
+- index.bin: open-addressing hash table, key -> record offset (24 bytes per slot)
+
+Keys are the first 16 bytes of sha256(model, text). Nothing is loaded at startup:
+lookups probe the mapped index and return a float32 view of the mapped record,
+so the OS page cache holds the hot vectors, not the Python heap.
+
+Concurrency (threads and worker processes):
+- writers hold an exclusive flock on `store.lock`; each put_many appends all of
+  its records with one write, then fills the index slots
+- readers take no lock; a slot is written offset first, key last, and every hit
+  is checked against the key stored in the record, so a racing read is a miss
+- resizing and compaction write new files, rename them into place and then flag
+  the old index as stale; processes reopen both files when they see the flag
+
+Records are never updated in place. Compaction rewrites the live records, dropping
+the oldest ones when the data file is over `max_bytes`, and drops records left
+unreferenced by a crash between the two writes.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from app.core.vectors import Vector, to_f32
+
+logger = logging.getLogger(__name__)
+
+DATA_MAGIC = b"MRVEC001"
+INDEX_MAGIC = b"MRIDX001"
+BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+
+# File headers: magic and byte order; the index adds capacity, entries, live bytes and the stale flag
+HEADER_SIZE = 64
+DATA_HEADER = struct.Struct("<8sc")
+INDEX_HEADER = struct.Struct("<8sc7xQQQ")
+COUNTS_OFFSET = 24
+STALE_OFFSET = 40
+
+RECORD_HEADER = struct.Struct("<16sI4x")  # key, dim (vector data stays 8-byte aligned)
+SLOT = struct.Struct("<Q16s")  # record offset, key (all-zero key: empty slot)
+EMPTY_KEY = bytes(16)
+
+MAX_LOAD = 0.7
+# Compaction also runs once this much of the data file is unreferenced
+MIN_GARBAGE_BYTES = 64 * 1024 * 1024
+
+
+def _next_power_of_two(n: int) -> int:
+    return 1 << max(n - 1, 1).bit_length()
+
+
+def _capacity_for(entries: int, minimum: int) -> int:
+    return max(minimum, _next_power_of_two(entries * 2))
+
+
+class _Files:
+    """One generation of the open files; replaced as a whole after a resize or compaction."""
+
+    def __init__(self, data_path: Path, index_path: Path) -> None:
+        # Index first: a compaction renames the data file before the index
+        self.index_file = open(index_path, "r+b", buffering=0)
+        self.index = mmap.mmap(self.index_file.fileno(), 0)
+        self.capacity: int = INDEX_HEADER.unpack_from(self.index, 0)[2]
+        self.data_file = open(data_path, "ab+", buffering=0)
+        self.data = self.map_data()
+
+    def map_data(self) -> mmap.mmap:
+        """Map the data file at its current size (it only grows)."""
+        self.data = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.data
+
+    @property
+    def stale(self) -> bool:
+        return bool(self.index[STALE_OFFSET])
+
+    def close(self) -> None:
+        # Mappings are left to the garbage collector: views handed out by get() may still use them
+        self.index_file.close()
+        self.data_file.close()
+
+
+class EmbeddingStore:
+    def __init__(self, path: str | Path, max_bytes: int, initial_capacity: int = 1 << 16) -> None:
+        self.dir = Path(path)
+        self.max_bytes = max_bytes
+        self.initial_capacity = _next_power_of_two(initial_capacity)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._data_path = self.dir / "vectors.bin"
+        self._index_path = self.dir / "index.bin"
+
+        # Writers: _lock (threads), then the flock (processes). Swapping files: _swap_lock only,
+        # so a reader seeing a stale index never waits for a write in progress
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._lock_fd = os.open(self.dir / "store.lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.compactions = 0
+
+        with self._exclusive():
+            if not self._valid():
+                self._create()
+            self._files = _Files(self._data_path, self._index_path)
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(model.encode("utf-8") + b"\0" + text.encode("utf-8")).digest()[:16]
+
+    def stats(self) -> dict[str, Any]:
+        files = self._files
+        _, _, capacity, entries, live_bytes = INDEX_HEADER.unpack_from(files.index, 0)
+        return {
+            "path": str(self.dir),
+            "entries": entries,
+            "capacity": capacity,
+            "data_bytes": os.fstat(files.data_file.fileno()).st_size,
+            "live_bytes": live_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "compactions": self.compactions,
+        }
+
+    def get(self, key: bytes) -> memoryview[float] | None:
+        """Zero-copy float32 view of the stored vector, or None."""
+        files = self._files
+        if files.stale:
+            files = self._current()
+        offset = self._find(files, key)
+        vector = self._record(files, offset, key) if offset is not None else None
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def put_many(self, items: Iterable[tuple[bytes, Vector]]) -> int:
+        """
+        Append the vectors not stored yet (one write), then index them; returns how many were added.
+
+        Blocking (file I/O, cross-process lock): call it from a worker thread.
+        """
+        with self._exclusive():
+            files = self._current()
+            end = os.fstat(files.data_file.fileno()).st_size
+            records = bytearray()
+            added: dict[bytes, int] = {}
+            for key, vector in items:
+                if key in added or self._find(files, key) is not None:
+                    continue
+                f32 = to_f32(vector)
+                added[key] = end + len(records)
+                records += RECORD_HEADER.pack(key, len(f32))
+                records += f32.tobytes()
+            if not added:
+                return 0
+
+            view = memoryview(records)
+            while view:
+                view = view[os.write(files.data_file.fileno(), view):]
+
+            _, _, capacity, entries, live_bytes = INDEX_HEADER.unpack_from(files.index, 0)
+            if entries + len(added) > capacity * MAX_LOAD:
+                files = self._rebuild(files, self._live_records(files), _capacity_for(entries + len(added), self.initial_capacity), copy_data=False)
+            for key, offset in added.items():
+                self._insert(files.index, files.capacity, key, offset)
+            struct.pack_into("<QQ", files.index, COUNTS_OFFSET, entries + len(added), live_bytes + len(records))
+            self.writes += len(added)
+
+            data_bytes = end + len(records)
+            garbage = data_bytes - HEADER_SIZE - live_bytes - len(records)
+            if data_bytes > self.max_bytes or garbage > max(data_bytes // 2, MIN_GARBAGE_BYTES):
+                self._compact(files, int(self.max_bytes * 0.75))
+            return len(added)
+
+    def compact(self, target_bytes: int | None = None) -> None:
+        """Rewrite the live records (newest first, up to `target_bytes` of data) into fresh files."""
+        with self._exclusive():
+            self._compact(self._current(), target_bytes if target_bytes is not None else self.max_bytes)
+
+    def close(self) -> None:
+        self._files.close()
+        os.close(self._lock_fd)
+
+    # -- reads
+
+    @staticmethod
+    def _find(files: _Files, key: bytes) -> int | None:
+        index, mask = files.index, files.capacity - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        for _ in range(files.capacity):
+            base = HEADER_SIZE + slot * SLOT.size
+            slot_key = index[base + 8:base + SLOT.size]
+            if slot_key == key:
+                return int.from_bytes(index[base:base + 8], "little")
+            if slot_key == EMPTY_KEY:
+                return None
+            slot = (slot + 1) & mask
+        return None
+
+    @staticmethod
+    def _record(files: _Files, offset: int, key: bytes) -> memoryview[float] | None:
+        data = files.data
+        if offset + RECORD_HEADER.size > len(data):
+            # Appended since this process last mapped the file
+            try:
+                data = files.map_data()
+            except (OSError, ValueError):
+                # Files swapped (and closed) by a writer thread meanwhile: a miss
+                return None
+            if offset + RECORD_HEADER.size > len(data):
+                return None
+        record_key, dim = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + 4 * dim
+        if record_key != key or end > len(data):
+            return None
+        return memoryview(data)[start:end].cast("f")
+
+    # -- files
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _valid(self) -> bool:
+        try:
+            with open(self._data_path, "rb") as data, open(self._index_path, "rb") as index:
+                return (
+                    DATA_HEADER.unpack(data.read(DATA_HEADER.size)) == (DATA_MAGIC, BYTE_ORDER)
+                    and INDEX_HEADER.unpack(index.read(INDEX_HEADER.size))[:2] == (INDEX_MAGIC, BYTE_ORDER)
+                )
+        except (OSError, struct.error):
+            return False
+
+    def _create(self) -> None:
+        if self._data_path.exists() or self._index_path.exists():
+            logger.warning("embedding store files unreadable; starting empty", extra={"fields": {"path": str(self.dir)}})
+        self._write_data_file(self._data_path, [])
+        self._write_index_file(self._index_path, self.initial_capacity, [], 0)
+
+    def _current(self) -> _Files:
+        """The open files, reopened first if another process (or thread) replaced them."""
+        with self._swap_lock:
+            if self._files.stale:
+                old, self._files = self._files, _Files(self._data_path, self._index_path)
+                old.close()
+            return self._files
+
+    @staticmethod
+    def _write_data_file(path: Path, records: Iterable[bytes]) -> None:
+        with open(path, "wb") as f:
+            f.write(DATA_HEADER.pack(DATA_MAGIC, BYTE_ORDER).ljust(HEADER_SIZE, b"\0"))
+            for record in records:
+                f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_index_file(self, path: Path, capacity: int, entries: list[tuple[bytes, int]], live_bytes: int) -> None:
+        with open(path, "wb") as f:
+            f.truncate(HEADER_SIZE + capacity * SLOT.size)
+        with open(path, "r+b") as index_file, mmap.mmap(index_file.fileno(), 0) as index:
+            index[:INDEX_HEADER.size] = INDEX_HEADER.pack(INDEX_MAGIC, BYTE_ORDER, capacity, len(entries), live_bytes)
+            for key, offset in entries:
+                self._insert(index, capacity, key, offset)
+            index.flush()
+
+    @staticmethod
+    def _insert(index: mmap.mmap, capacity: int, key: bytes, offset: int) -> None:
+        mask = capacity - 1
+        slot = int.from_bytes(key[:8], "little") & mask
+        while True:
+            base = HEADER_SIZE + slot * SLOT.size
+            slot_key = index[base + 8:base + SLOT.size]
+            if slot_key == EMPTY_KEY or slot_key == key:
+                # Offset before key: a reader matching the key always sees its offset
+                index[base:base + 8] = offset.to_bytes(8, "little")
+                index[base + 8:base + SLOT.size] = key
+                return
+            slot = (slot + 1) & mask
+
+    # -- resize and compaction
+
+    @staticmethod
+    def _live_records(files: _Files) -> list[tuple[int, bytes, int]]:
+        """(offset, key, record size) of every indexed record, oldest first."""
+        data = files.map_data()
+        records = []
+        for slot in range(files.capacity):
+            offset, key = SLOT.unpack_from(files.index, HEADER_SIZE + slot * SLOT.size)
+            if key == EMPTY_KEY or offset + RECORD_HEADER.size > len(data):
+                continue
+            record_key, dim = RECORD_HEADER.unpack_from(data, offset)
+            size = RECORD_HEADER.size + 4 * dim
+            if record_key == key and offset + size <= len(data):
+                records.append((offset, key, size))
+        records.sort()
+        return records
+
+    def _compact(self, files: _Files, target_bytes: int) -> None:
+        start = time.perf_counter()
+        records = self._live_records(files)
+        kept: list[tuple[int, bytes, int]] = []
+        total = HEADER_SIZE
+        for record in reversed(records):
+            if total + record[2] > target_bytes:
+                break
+            kept.append(record)
+            total += record[2]
+        kept.reverse()
+
+        before = len(files.data)
+        self._rebuild(files, kept, _capacity_for(len(kept), self.initial_capacity), copy_data=True)
+        self.compactions += 1
+        logger.info("embedding store compacted", extra={"fields": {
+            "entries": len(kept),
+            "dropped": len(records) - len(kept),
+            "bytes_before": before,
+            "bytes_after": total,
+            "duration_ms": round((time.perf_counter() - start) * 1000.0, 1),
+        }})
+
+    def _rebuild(self, files: _Files, records: list[tuple[int, bytes, int]], capacity: int, copy_data: bool) -> _Files:
+        """New index (and data file when `copy_data`) holding `records`, swapped in for every process."""
+        data_tmp = self._data_path.with_suffix(".tmp")
+        index_tmp = self._index_path.with_suffix(".tmp")
+        if copy_data:
+            offsets = [HEADER_SIZE]
+            for _, _, size in records:
+                offsets.append(offsets[-1] + size)
+            entries = [(key, offset) for (_, key, _), offset in zip(records, offsets, strict=False)]
+            self._write_data_file(data_tmp, (files.data[o:o + size] for o, _, size in records))
+        else:
+            entries = [(key, offset) for offset, key, _ in records]
+        self._write_index_file(index_tmp, capacity, entries, sum(size for _, _, size in records))
+
+        if copy_data:
+            os.replace(data_tmp, self._data_path)
+        os.replace(index_tmp, self._index_path)
+        files.index[STALE_OFFSET] = 1
+        return self._current()
@@ -18,6 +18,19 @@ class AppError(Exception):
     message: str
     retryable: bool = False
     details: dict | None = None
+    # Sent as a Retry-After header when set (seconds)
+    retry_after_s: float | None = None
+
+    def to_payload(self) -> dict:
+        """Public error body, shared by the JSON handler and streaming error frames."""
+        return {
+            "error": {
+                "code": self.code,
+                "message": self.message,
+                "retryable": self.retryable,
+                "details": self.details,
+            }
+        }
 
 
 class UpstreamTimeout(AppError):
@@ -26,8 +39,8 @@ class UpstreamTimeout(AppError):
 
 
 class UpstreamRateLimited(AppError):
-    def __init__(self, message: str = "Upstream provider rate limited the request"):
-        super().__init__(status_code=429, code="UPSTREAM_RATE_LIMITED", message=message, retryable=True)
+    def __init__(self, message: str = "Upstream provider rate limited the request", retry_after_s: float | None = None):
+        super().__init__(status_code=429, code="UPSTREAM_RATE_LIMITED", message=message, retryable=True, retry_after_s=retry_after_s)
 
 
 class UpstreamUnavailable(AppError):
@@ -37,4 +50,44 @@ class UpstreamUnavailable(AppError):
 
 class BadUpstreamResponse(AppError):
     def __init__(self, message: str = "Upstream provider returned an invalid response"):
-        super().__init__(status_code=502, code="BAD_UPSTREAM_RESPONSE", message=message, retryable=True)
\ No newline at end of file
+        super().__init__(status_code=502, code="BAD_UPSTREAM_RESPONSE", message=message, retryable=True)
+
+
+class Overloaded(AppError):
+    """Raised by the gateway itself (not upstream) when it sheds load."""
+    def __init__(self, message: str = "Gateway is overloaded, retry later", retry_after_s: float = 1.0):
+        super().__init__(status_code=503, code="OVERLOADED", message=message, retryable=True, retry_after_s=retry_after_s)
+
+
+class RateLimited(AppError):
+    """Raised by the gateway's own quota limiter before the request reaches the provider."""
+    def __init__(self, message: str = "Provider quota exhausted, retry later", retry_after_s: float = 1.0):
+        super().__init__(status_code=429, code="RATE_LIMITED", message=message, retryable=True, retry_after_s=retry_after_s)
+
+
+class InvalidRequest(AppError):
+    """Request content the gateway can't act on (e.g. a malformed batch line)."""
+    def __init__(self, message: str = "Invalid request", details: dict | None = None):
+        super().__init__(status_code=400, code="INVALID_REQUEST", message=message, details=details)
+
+
+class NotFound(AppError):
+    def __init__(self, message: str = "Resource not found"):
+        super().__init__(status_code=404, code="NOT_FOUND", message=message)
+
+
+class PayloadTooLarge(AppError):
+    def __init__(self, message: str = "Request body too large"):
+        super().__init__(status_code=413, code="PAYLOAD_TOO_LARGE", message=message)
+
+
+class ContextLengthExceeded(AppError):
+    """Prompt + max_output_tokens is over the model's context window (checked before any upstream call)."""
+    def __init__(self, message: str = "Request does not fit the model's context window", details: dict | None = None):
+        super().__init__(status_code=400, code="CONTEXT_LENGTH_EXCEEDED", message=message, details=details)
+
+
+class DeadlineExceeded(AppError):
+    """The request's own deadline (X-Request-Timeout-ms) passed; not an upstream failure."""
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(status_code=504, code="DEADLINE_EXCEEDED", message=message)
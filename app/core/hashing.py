@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import hashlib
+import json
+
+from app.schemas.chat import ChatMessage
+
+
+def _digest(payload: object) -> str:
+    # Compact separators + sorted keys give one byte representation per logical request
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def chat_request_key(messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> str:
+    """
+    Canonical hash of everything that influences a chat completion.
+
+    client_request_id / stream are deliberately excluded: they don't change the answer.
+    """
+    return _digest({
+        "messages": [[m.role, m.content] for m in messages],
+        "model": model,
+        "temperature": float(temperature),
+        "max_output_tokens": max_output_tokens,
+    })
+
+
+def embeddings_request_key(inputs: list[str], model: str) -> str:
+    """Canonical hash of an embeddings call (input order matters: vectors come back in order)."""
+    return _digest({"inputs": inputs, "model": model})
+
+
+def chat_context_key(system_prompts: list[str], model: str, max_output_tokens: int) -> str:
+    """Hash of what, besides the user's question, shapes an answer (the semantic cache partition)."""
+    return _digest({"system": system_prompts, "model": model, "max_output_tokens": max_output_tokens})
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.core.tokens import TOKENS_PER_MESSAGE, TOKENS_PER_REPLY, TokenCounter, longest_prefix
+from app.schemas.chat import ChatMessage, ChatTrimming
+
+# Marks the start of a message whose older part was cut off
+TRUNCATION_MARKER = "[...] "
+
+
+class HistoryTrimmer:
+    """
+    Fits long conversations into a per-model prompt token budget.
+
+    Kept, in priority order:
+    - every system message and the latest message (never trimmed)
+    - the most recent turns, newest first, while they fit
+    - the tail of the turn that crosses the budget, when at least
+      `min_truncated_tokens` of it fit
+
+    Everything older is dropped. The budget is also capped at the model's
+    context window minus max_output_tokens, so trimmed prompts pass the
+    pre-flight context check.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        budget_tokens: int = 8_000,
+        model_budgets: dict[str, int] | None = None,
+        min_truncated_tokens: int = 64,
+    ) -> None:
+        self.counter = counter
+        self.budget_tokens = budget_tokens
+        self.model_budgets = model_budgets or {}
+        self.min_truncated_tokens = min_truncated_tokens
+
+        self.requests_trimmed = 0
+        self.messages_dropped = 0
+        self.messages_truncated = 0
+        self.tokens_removed = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "model_budgets": self.model_budgets,
+            "requests_trimmed": self.requests_trimmed,
+            "messages_dropped": self.messages_dropped,
+            "messages_truncated": self.messages_truncated,
+            "tokens_removed": self.tokens_removed,
+        }
+
+    def budget(self, model: str, max_output_tokens: int) -> int:
+        """Prompt token budget for `model` (longest matching prefix of model_budgets, else budget_tokens)."""
+        prefix = longest_prefix(model, self.model_budgets)
+        budget = self.model_budgets[prefix] if prefix is not None else self.budget_tokens
+        window = self.counter.context_window(model)
+        if window is not None:
+            budget = min(budget, window - max_output_tokens)
+        return budget
+
+    def trim(self, messages: list[ChatMessage], model: str, max_output_tokens: int) -> tuple[list[ChatMessage], ChatTrimming | None]:
+        """The messages to send upstream, and what was removed (None when the prompt already fits)."""
+        before = self.counter.count_chat(messages, model)
+        budget = self.budget(model, max_output_tokens)
+        if before <= budget:
+            return messages, None
+
+        costs = [self.counter.count(m.content, model) + TOKENS_PER_MESSAGE for m in messages]
+        last = len(messages) - 1
+        kept: dict[int, ChatMessage] = {i: m for i, m in enumerate(messages) if m.role == "system" or i == last}
+        used = TOKENS_PER_REPLY + sum(costs[i] for i in kept)
+        truncated = 0
+
+        for i in range(last - 1, -1, -1):
+            if i in kept:
+                continue
+            if used + costs[i] <= budget:
+                kept[i] = messages[i]
+                used += costs[i]
+                continue
+            room = budget - used - TOKENS_PER_MESSAGE
+            if room >= self.min_truncated_tokens:
+                kept[i] = self._truncate(messages[i], room, model)
+                used += self.counter.count(kept[i].content, model) + TOKENS_PER_MESSAGE
+                truncated = 1
+            break
+
+        trimmed = [kept[i] for i in sorted(kept)]
+        report = ChatTrimming(
+            dropped_messages=len(messages) - len(trimmed),
+            truncated_messages=truncated,
+            input_tokens_before=before,
+            input_tokens_after=used,
+        )
+        self.requests_trimmed += 1
+        self.messages_dropped += report.dropped_messages
+        self.messages_truncated += truncated
+        self.tokens_removed += before - used
+        return trimmed, report
+
+    def _truncate(self, message: ChatMessage, max_tokens: int, model: str) -> ChatMessage:
+        """Keep the most recent end of `message`, within `max_tokens` (marker included)."""
+        encoder = self.counter.encoder(model)
+        content = message.content
+        # Proportional first guess, then shrink by 10% until it fits: one or two passes in practice
+        chars = len(content) * max_tokens // max(encoder.count(content), 1)
+        while True:
+            text = TRUNCATION_MARKER + content[len(content) - chars:].lstrip()
+            if chars <= 1 or encoder.count(text) <= max_tokens:
+                return message.model_copy(update={"content": text})
+            chars = chars * 9 // 10
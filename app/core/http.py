@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import ssl
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    # Built from the SDK's own client class (httpx, or its httpx2 fork in newer SDKs):
+    # AsyncOpenAI accepts a client of the other class too, but through a slower compatibility path
+    from openai import DefaultAsyncHttpxClient as UpstreamHttpClient
+    from openai import Timeout
+
+logger = logging.getLogger(__name__)
+
+# The openai SDK (and its HTTP stack) is imported on first use only: it is most of
+# the gateway's import time, and deployments on fake backends never need it.
+
+
+def upstream_timeout(connect_s: float, read_s: float, pool_s: float) -> Timeout:
+    """Connect and pool waits fail fast; read (and write) covers slow generations."""
+    from openai import Timeout
+
+    return Timeout(read_s, connect=connect_s, pool=pool_s)
+
+
+def create_http_client(
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry_s: float = 30.0,
+    http2: bool = False,
+    timeout: Timeout | None = None,
+    verify: ssl.SSLContext | bool = True,
+) -> UpstreamHttpClient:
+    """
+    The one HTTP client every upstream provider shares.
+
+    - one connection pool per origin, shared by chat and embeddings, so both
+      reuse the same warm TLS connections
+    - keep-alive sized for steady traffic; idle connections are closed after
+      `keepalive_expiry_s` (keep it below the upstream's idle timeout)
+    - HTTP/2 multiplexes many calls over one connection; it needs the optional
+      `h2` package (`pip install h2`) and falls back to HTTP/1.1 without it
+    """
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultAsyncHttpxClient, Timeout
+
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+
+    return DefaultAsyncHttpxClient(
+        http2=http2,
+        limits=type(DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_s,
+        ),
+        timeout=timeout if timeout is not None else Timeout(20.0, connect=5.0),
+        verify=verify,
+    )
+
+
+async def prewarm(client: UpstreamHttpClient, urls: list[str], connections: int) -> dict[str, Any]:
+    """
+    Open `connections` keep-alive connections to each url's origin before traffic arrives,
+    so the first requests after a deploy don't pay TCP + TLS handshakes.
+
+    Any HTTP response counts (even 401/404): only the connection matters. Failures are
+    logged, never raised; startup must not depend on the upstream being reachable.
+    """
+    origins = sorted({f"{parts.scheme}://{parts.netloc}/" for parts in map(urlsplit, urls)})
+
+    async def warm(origin: str) -> bool:
+        try:
+            await client.head(origin)
+            return True
+        except Exception as e:
+            logger.warning("connection prewarm failed", extra={"fields": {"origin": origin, "error": type(e).__name__}})
+            return False
+
+    # Concurrent requests to one origin make the pool open separate connections
+    results = await asyncio.gather(*(warm(o) for o in origins for _ in range(connections)))
+    report = {"origins": origins, "opened": sum(results), "failed": len(results) - sum(results)}
+    logger.info("upstream connections prewarmed", extra={"fields": report})
+    return report
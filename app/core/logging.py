@@ -1,14 +1,22 @@
+import atexit
+import copy
 import json
 import logging
 import os
+import queue
 import sys
+import threading
+import time
 from contextvars import ContextVar
-from datetime import UTC, datetime
-from typing import Any
+from logging.handlers import QueueHandler
+from typing import Any, TextIO
 
 # Request-scoped context (set by middleware)
 request_id_ctx: ContextVar[str | None] = ContextVar("request_id", default=None)
 
+# One encoder for all records: json.dumps(..., ensure_ascii=False) builds a new one per call
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
 
 class JsonFormatter(logging.Formatter):
     """
@@ -18,17 +26,36 @@ class JsonFormatter(logging.Formatter):
     - Machine-parseable (CloudWatch, ELK, Datadog)
     - Enables filtering by request_id, level, path, etc.
     - Avoids brittle string parsing
+
+    Hot-path notes:
+    - timestamps come from record.created, with the per-second prefix cached
+    - `static_fields` (env, service, ...) are encoded once, not per record
     """
 
+    def __init__(self, static_fields: dict[str, Any] | None = None) -> None:
+        super().__init__()
+        self._static = _encode(static_fields)[1:-1] if static_fields else ""
+        self._ts_second = -1
+        self._ts_prefix = ""
+
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._ts_second:
+            self._ts_second = second
+            self._ts_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        # Same shape as datetime.isoformat() for an aware UTC datetime
+        return f"{self._ts_prefix}.{int((created - second) * 1_000_000):06d}+00:00"
+
     def format(self, record: logging.LogRecord) -> str:
         payload: dict[str, Any] = {
-            "ts": datetime.now(UTC).isoformat(),
+            "ts": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "msg": record.getMessage(),
         }
 
-        rid = request_id_ctx.get()
+        # Queued records carry the request_id captured where they were logged
+        rid = getattr(record, "request_id", None) or request_id_ctx.get()
         if rid:
             payload["request_id"] = rid
 
@@ -39,10 +66,111 @@ class JsonFormatter(logging.Formatter):
         if isinstance(fields, dict):
             payload.update(fields)
 
-        return json.dumps(payload, ensure_ascii=False)
-    
+        line = _encode(payload)
+        if self._static:
+            line = f"{line[:-1]}, {self._static}}}"
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without ever blocking the caller.
+
+    When the bounded queue is full the record is dropped and counted:
+    losing log lines under overload beats adding latency to requests.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord | None]") -> None:
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Context vars don't cross threads: capture the request_id now.
+        # Formatting itself is left to the writer thread.
+        record = copy.copy(record)
+        record.request_id = request_id_ctx.get()
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter:
+    """
+    Background thread draining the log queue into a stream.
+
+    Records are written in batches with one flush per batch, so a burst of
+    access logs costs a handful of write syscalls instead of one per line.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord | None]", stream: TextIO, formatter: logging.Formatter, max_batch: int = 512) -> None:
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.max_batch = max_batch
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything already queued, then stop."""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [r for r in batch if r is not None]
+            if records:
+                lines = []
+                for record in records:
+                    try:
+                        lines.append(self.formatter.format(record))
+                    except Exception:
+                        lines.append(_encode({"level": "ERROR", "logger": __name__, "msg": "failed to format log record"}))
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if len(records) != len(batch):
+                return
+
+
+_writer: LogWriter | None = None
+_queue_handler: DroppingQueueHandler | None = None
 
-def setup_logging() -> None:
+
+def logging_stats() -> dict[str, int] | None:
+    """Queue depth and dropped-record count for the async logging mode (None when synchronous)."""
+    if _queue_handler is None:
+        return None
+    return {"queued": _queue_handler.log_queue.qsize(), "dropped": _queue_handler.dropped}
+
+
+def _stop_writer() -> None:
+    global _writer, _queue_handler
+    if _writer is not None:
+        _writer.stop()
+    _writer = None
+    _queue_handler = None
+
+
+def setup_logging(async_mode: bool = False, queue_size: int = 10000, static_fields: dict[str, Any] | None = None) -> None:
     """
     Configure root logging once at app startup.
 
@@ -50,13 +178,26 @@ def setup_logging() -> None:
     - Centralized logging config (no ad-hoc print statements)
     - JSON logs for production observability
     - Log level controlled via environment variable (12-factor)
+    - async_mode: records go through a bounded queue to a writer thread,
+      so a slow stdout pipe never stalls the event loop
     """
+    global _writer, _queue_handler
 
     level_str = os.getenv("LOG_LEVEL", "INFO").upper()
     level = getattr(logging, level_str, logging.INFO)
 
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JsonFormatter())
+    formatter = JsonFormatter(static_fields=static_fields)
+
+    _stop_writer()
+    handler: logging.Handler
+    if async_mode:
+        log_queue: queue.Queue[logging.LogRecord | None] = queue.Queue(maxsize=queue_size)
+        _queue_handler = handler = DroppingQueueHandler(log_queue)
+        _writer = LogWriter(log_queue, sys.stdout, formatter)
+        _writer.start()
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(formatter)
 
     root = logging.getLogger()
     root.handlers.clear()
@@ -64,4 +205,7 @@ def setup_logging() -> None:
     root.setLevel(level)
 
     logging.getLogger("uvicorn.error").setLevel(level)
-    logging.getLogger("uvicorn.access").setLevel(level)
\ No newline at end of file
+    logging.getLogger("uvicorn.access").setLevel(level)
+
+
+atexit.register(_stop_writer)
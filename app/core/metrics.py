@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from types import TracebackType
+from typing import Any
+
+from app.core.errors import AppError
+
+Labels = tuple[str, ...]
+
+_INF = 'le="+Inf"'
+_TOKEN_KINDS = (("input_tokens", "input"), ("output_tokens", "output"), ("total_tokens", "total"))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def log_buckets(start: float, factor: float, count: int) -> tuple[float, ...]:
+    """`count` upper bounds growing geometrically from `start` (e.g. 1ms .. ~65s for 0.001, 2, 17)."""
+    return tuple(start * factor**i for i in range(count))
+
+
+class Counter:
+    """Monotonic counter per label set. Recording is one dict update, no lock (single event loop)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in self._values.items()]
+
+    def dump(self) -> list[Any]:
+        return [[list(k), v] for k, v in self._values.items()]
+
+    def load(self, dumped: list[Any]) -> None:
+        """Add another process's dump() to this one."""
+        for labels, value in dumped:
+            self.inc(tuple(labels), value)
+
+
+class Gauge(Counter):
+    """Value that goes up and down (in-flight requests)."""
+
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram:
+    """
+    Fixed log-spaced buckets per label set.
+
+    observe() is a C-level bisect plus two in-place updates; buckets are only
+    made cumulative when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = log_buckets(0.001, 2.0, 17)) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        return sum(self._counts.get(labels, ()))
+
+    def samples(self) -> list[str]:
+        lines: list[str] = []
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts, strict=False):
+                cumulative += n
+                le = f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, labels, le)} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, labels, _INF)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, labels)} {_fmt(self._sums[labels])}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}")
+        return lines
+
+    def dump(self) -> list[Any]:
+        return [[list(k), counts, self._sums[k]] for k, counts in self._counts.items()]
+
+    def load(self, dumped: list[Any]) -> None:
+        """Add another process's dump() to this one (same bucket layout)."""
+        for raw_labels, counts, total in dumped:
+            labels = tuple(raw_labels)
+            mine = self._counts.get(labels)
+            if mine is None:
+                mine = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = 0.0
+            for i, n in enumerate(counts):
+                mine[i] += n
+            self._sums[labels] += total
+
+
+class ProviderCall:
+    """
+    Context manager around one provider call (see GatewayMetrics.provider_call).
+
+    Success -> latency observed; AppError -> error counted by its code;
+    cancellation (client went away) -> neither.
+    """
+
+    __slots__ = ("metrics", "labels", "start")
+
+    def __init__(self, metrics: GatewayMetrics, labels: Labels) -> None:
+        self.metrics = metrics
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> ProviderCall:
+        self.metrics.provider_in_flight.inc(self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        self.metrics.provider_in_flight.dec(self.labels)
+        if exc is None:
+            self.metrics.provider_latency.observe(time.perf_counter() - self.start, self.labels)
+        elif isinstance(exc, AppError):
+            self.metrics.provider_errors.inc((*self.labels, exc.code))
+        elif isinstance(exc, Exception):
+            self.metrics.provider_errors.inc((*self.labels, "INTERNAL_ERROR"))
+
+
+class GatewayMetrics:
+    """
+    In-process metrics for the gateway, rendered in Prometheus text format at /v1/metrics.
+
+    - HTTP layer (middleware): request counts by route/status/error code,
+      end-to-end latency, requests in flight
+    - provider layer (app.providers.metered_provider): upstream call latency, time to
+      first token for streams, token usage, calls in flight, per operation / backend / model
+    - semantic chat cache: lookups by result, embed / search latency
+
+    Routes are labelled by their template ("/v1/chat"), never the raw path,
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self) -> None:
+        self.http_requests = Counter("gateway_http_requests_total", "HTTP requests by route, method, status and error code.", ("route", "method", "status", "code"))
+        self.http_latency = Histogram("gateway_http_request_duration_seconds", "End-to-end HTTP latency, including streamed bodies.", ("route", "method"))
+        self.http_in_flight = Gauge("gateway_http_requests_in_flight", "HTTP requests currently being served.")
+
+        self.provider_latency = Histogram("gateway_provider_request_duration_seconds", "Upstream call latency per backend (cache hits excluded).", ("operation", "provider", "model"))
+        self.provider_ttft = Histogram("gateway_provider_time_to_first_token_seconds", "Time to first streamed token.", ("provider", "model"))
+        self.provider_errors = Counter("gateway_provider_errors_total", "Failed provider calls by error code.", ("operation", "provider", "model", "code"))
+        self.provider_in_flight = Gauge("gateway_provider_requests_in_flight", "Provider calls currently in flight.", ("operation", "provider", "model"))
+        self.tokens = Counter("gateway_tokens_total", "Token usage reported by providers.", ("operation", "provider", "model", "kind"))
+
+        self.semantic_cache_lookups = Counter("gateway_semantic_cache_lookups_total", "Semantic chat cache lookups by result (hit, miss, bypassed, error).", ("model", "result"))
+        self.semantic_cache_latency = Histogram("gateway_semantic_cache_lookup_duration_seconds", "Semantic cache lookup latency by stage (embed, search).", ("stage",), buckets=log_buckets(0.0001, 2.0, 17))
+
+        self.chat_trimmed_tokens = Counter("gateway_chat_trimmed_tokens_total", "Prompt tokens removed by chat history trimming.", ("model",))
+        self.upstream_retries = Counter("gateway_upstream_retries_total", "Upstream retry decisions (retried, or gave up: max_retries, deadline, budget).", ("operation", "outcome"))
+
+        self._metrics: list[Counter | Histogram] = [
+            self.http_requests, self.http_latency, self.http_in_flight,
+            self.provider_latency, self.provider_ttft, self.provider_errors, self.provider_in_flight, self.tokens,
+            self.semantic_cache_lookups, self.semantic_cache_latency,
+            self.chat_trimmed_tokens, self.upstream_retries,
+        ]
+
+    def provider_call(self, operation: str, provider: str, model: str) -> ProviderCall:
+        return ProviderCall(self, (operation, provider, model))
+
+    def record_tokens(self, operation: str, provider: str, model: str, usage: Any) -> None:
+        """Add a provider usage dict or a ChatUsage / EmbeddingsUsage (fields left as None are skipped)."""
+        if usage is None:
+            return
+        for field, kind in _TOKEN_KINDS:
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            if value:
+                self.tokens.inc((operation, provider, model, kind), value)
+
+    def dump(self) -> dict[str, list[Any]]:
+        """JSON-compatible state, for aggregating workers (see app.core.shared_state)."""
+        return {metric.name: metric.dump() for metric in self._metrics}
+
+    @classmethod
+    def merged(cls, dumps: list[dict[str, list[Any]]]) -> GatewayMetrics:
+        """A registry holding the sum of several dump()s: counters and histograms add up, and so do gauges."""
+        total = cls()
+        by_name = {metric.name: metric for metric in total._metrics}
+        for dumped in dumps:
+            for name, values in dumped.items():
+                metric = by_name.get(name)
+                if metric is not None:
+                    metric.load(values)
+        return total
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
@@ -1,63 +1,128 @@
 import logging
+import random
 import time
 import uuid
-from collections.abc import Awaitable, Callable
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.deadline import REQUEST_TIMEOUT_HEADER, deadline_ctx, parse_timeout_ms
 from app.core.logging import request_id_ctx
+from app.core.metrics import GatewayMetrics
 
 logger = logging.getLogger(__name__)
 
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
+class RequestContextMiddleware:
     """
     Adds production-grade request context:
     - request_id: taken from X-Request-ID if provided, else generated
+    - deadline: from X-Request-Timeout-ms (see app.core.deadline), for the services
     - latency_ms: measured end-to-end at the middleware level
     - sets response headers: X-Request-ID, X-Response-Time-ms
+
+    Plain ASGI rather than BaseHTTPMiddleware: no extra task or memory stream
+    per request, and streamed bodies pass straight through (with the request_id
+    still set while they are produced).
     """
-    def __init__(self, app: ASGIApp, request_id_header: str = "X-Request-ID", response_time_header: str = "X-Response-Time-ms") -> None:
-        super().__init__(app)
+    def __init__(
+        self,
+        app: ASGIApp,
+        request_id_header: str = "X-Request-ID",
+        response_time_header: str = "X-Response-Time-ms",
+        access_log_sample_rate: float = 1.0,
+        metrics: GatewayMetrics | None = None,
+        default_timeout_ms: float = 0.0,
+        max_timeout_ms: float = 0.0,
+    ) -> None:
+        self.app = app
         self.request_id_header = request_id_header
         self.response_time_header = response_time_header
+        # Share of successful requests that get an access log line; errors are always logged
+        self.access_log_sample_rate = access_log_sample_rate
+        # HTTP request counts / latency / in-flight, when metrics are enabled
+        self.metrics = metrics
+        # Deadline for requests without a timeout header, and the cap on requested ones (0: none)
+        self.default_timeout_ms = default_timeout_ms
+        self.max_timeout_ms = max_timeout_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
         start = time.perf_counter()
 
         # 1) Request ID: accept upstream ID or generate a new one
-        incoming_rid: str | None = request.headers.get(self.request_id_header)
+        request_headers = Headers(scope=scope)
+        incoming_rid: str | None = request_headers.get(self.request_id_header)
         rid = incoming_rid.strip() if incoming_rid else str(uuid.uuid4())
+        deadline = parse_timeout_ms(request_headers.get(REQUEST_TIMEOUT_HEADER), self.default_timeout_ms, self.max_timeout_ms)
+
+        status_code = 500
+
+        async def send_with_context(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+                # 2) Latency up to the response head; add headers for debugging / client visibility
+                latency_ms = (time.perf_counter() - start) * 1000.0
+                headers = MutableHeaders(scope=message)
+                headers[self.request_id_header] = rid
+                headers[self.response_time_header] = f"{latency_ms:.2f}"
+            await send(message)
+
+        if self.metrics is not None:
+            self.metrics.http_in_flight.inc()
 
         # Store request_id in context var for log enrichment
         token = request_id_ctx.set(rid)
-
+        deadline_token = deadline_ctx.set(deadline)
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_with_context)
         except Exception:
             # Log exception with request_id already attached via ContextVar
-            logger.exception("Unhandled exception while processing request", extra={"fields": {"method": request.method, "path": request.url.path}})
+            logger.exception("Unhandled exception while processing request", extra={"fields": {"method": scope["method"], "path": scope["path"]}})
             raise
+        else:
+            # Structured access log, once the body (including streams) has been sent
+            if status_code >= 400 or self.access_log_sample_rate >= 1.0 or random.random() < self.access_log_sample_rate:
+                logger.info("request completed", extra={"fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status_code": status_code,
+                    "latency_ms": round((time.perf_counter() - start) * 1000.0, 2),
+                }})
         finally:
             # Reset context var to avoid leaking across requests
             request_id_ctx.reset(token)
+            deadline_ctx.reset(deadline_token)
+            if self.metrics is not None:
+                _record_metrics(self.metrics, scope, status_code, time.perf_counter() - start)
+
 
-        # 2) Latency
-        latency_ms = (time.perf_counter() - start) * 1000.0
+def _route_label(scope: Scope) -> str:
+    """
+    Route template for metric labels ("/v1/batches/{batch_id}"), rebuilt from the
+    matched path and its path params; unmatched paths share one label.
+    """
+    if "endpoint" not in scope:
+        return "<unmatched>"
+    path: str = scope["path"]
+    params = scope.get("path_params")
+    if params:
+        names = {str(value): name for name, value in params.items()}
+        path = "/".join(f"{{{names[part]}}}" if part in names else part for part in path.split("/"))
+    return path
 
-        # Add headers for debugging / client visibility
-        response.headers[self.request_id_header] = rid
-        response.headers[self.response_time_header] = f"{latency_ms:.2f}"
 
-        # Structured access log
-        logger.info("request completed", extra={"fields": {
-            "method": request.method,
-            "path": request.url.path,
-            "status_code": response.status_code,
-            "latency_ms": round(latency_ms, 2),
-        }})
+def _record_metrics(metrics: GatewayMetrics, scope: Scope, status_code: int, latency_s: float) -> None:
+    route = _route_label(scope)
+    method = scope["method"]
+    # Set by the AppError handler
+    code = scope.get("state", {}).get("error_code", "")
 
-        return response
\ No newline at end of file
+    metrics.http_in_flight.dec()
+    metrics.http_requests.inc((route, method, str(status_code), code))
+    metrics.http_latency.observe(latency_s, (route, method))
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Mapping
+from typing import Any
+
+from app.core.errors import RateLimited
+
+
+class TokenBucket:
+    """
+    Per-minute quota as a continuously refilling bucket.
+
+    `take()` removes tokens immediately and lets the balance go negative
+    (debt); `wait_for()` says how long until an amount is covered. Callers
+    that take first and then sleep are served in arrival order without a
+    separate queue. A capacity of 0 means "unknown / unlimited".
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` could be taken, without taking it."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        deficit = amount - self.tokens
+        return max(0.0, deficit * 60.0 / self.capacity)
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+    def give_back(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def resize(self, per_minute: int, remaining: int | None = None) -> None:
+        """Adopt the provider's advertised quota; trust its `remaining` when lower than ours."""
+        self._refill()
+        if per_minute > 0 and float(per_minute) != self.capacity:
+            if not self.enabled:
+                self.tokens = float(per_minute)
+            self.capacity = float(per_minute)
+            self.tokens = min(self.tokens, self.capacity)
+        if remaining is not None and self.enabled:
+            self.tokens = min(self.tokens, float(remaining))
+
+    def drain(self) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class ModelRateLimiter:
+    """
+    Requests/min + tokens/min limiter for one upstream (provider, model).
+
+    - callers reserve 1 request and their estimated tokens up front
+    - if both buckets can cover it within `max_wait_s`, the caller sleeps
+      until then (queued); otherwise it is rejected with RateLimited before
+      any upstream round-trip is spent
+    - once the real usage is known, the token estimate is corrected
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_wait_s: float = 5.0) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_wait_s = max_wait_s
+
+        self.queued = 0
+        self.rejected = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "rpm": int(self.requests.capacity),
+            "tpm": int(self.tokens.capacity),
+            "requests_available": round(self.requests.tokens, 1),
+            "tokens_available": round(self.tokens.tokens, 1),
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Take 1 request + the estimate now; returns how long to wait before sending."""
+        wait_s = max(self.requests.wait_for(1), self.tokens.wait_for(estimated_tokens))
+        if wait_s > self.max_wait_s:
+            self.rejected += 1
+            raise RateLimited(retry_after_s=wait_s)
+
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+        return wait_s
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        await self._wait(self.reserve(estimated_tokens), estimated_tokens)
+
+    async def _wait(self, wait_s: float, estimated_tokens: int) -> None:
+        if wait_s > 0:
+            self.queued += 1
+            try:
+                await asyncio.sleep(wait_s)
+            except asyncio.CancelledError:
+                self.refund(estimated_tokens)
+                raise
+            finally:
+                self.queued -= 1
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        if actual_tokens is None:
+            return
+        delta = estimated_tokens - actual_tokens
+        if delta > 0:
+            self.tokens.give_back(delta)
+        elif delta < 0:
+            self.tokens.take(-delta)
+
+    def refund(self, estimated_tokens: int) -> None:
+        """The call never reached the provider (e.g. cancelled while queued)."""
+        self.requests.give_back(1)
+        self.tokens.give_back(estimated_tokens)
+
+    def update_from_headers(self, limits: Mapping[str, int | None]) -> None:
+        limit_requests = limits.get("limit_requests")
+        if limit_requests:
+            self.requests.resize(limit_requests, limits.get("remaining_requests"))
+        limit_tokens = limits.get("limit_tokens")
+        if limit_tokens:
+            self.tokens.resize(limit_tokens, limits.get("remaining_tokens"))
+
+    def on_upstream_rate_limited(self) -> None:
+        # Provider says we're out: stop sending until the buckets refill
+        self.requests.drain()
+        self.tokens.drain()
+
+
+class RateLimiterRegistry:
+    """One ModelRateLimiter per (provider, model), created on first use."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_wait_s: float = 5.0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait_s = max_wait_s
+        self._limiters: dict[tuple[str, str], ModelRateLimiter] = {}
+
+    def get(self, provider: str, model: str) -> ModelRateLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = self._create(provider, model)
+        return limiter
+
+    def _create(self, provider: str, model: str) -> ModelRateLimiter:
+        return ModelRateLimiter(rpm=self.rpm, tpm=self.tpm, max_wait_s=self.max_wait_s)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {f"{provider}/{model}": limiter.snapshot() for (provider, model), limiter in self._limiters.items()}
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> dict[str, int | None] | None:
+    """
+    Extract OpenAI-style `x-ratelimit-*` quota headers.
+
+    Returns None when the response carries none of them.
+    """
+    names = {
+        "limit_requests": "x-ratelimit-limit-requests",
+        "remaining_requests": "x-ratelimit-remaining-requests",
+        "limit_tokens": "x-ratelimit-limit-tokens",
+        "remaining_tokens": "x-ratelimit-remaining-tokens",
+    }
+
+    parsed: dict[str, int | None] = {}
+    for key, header in names.items():
+        raw = headers.get(header)
+        try:
+            parsed[key] = int(raw) if raw is not None else None
+        except ValueError:
+            parsed[key] = None
+
+    if all(v is None for v in parsed.values()):
+        return None
+    return parsed
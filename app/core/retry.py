@@ -0,0 +1,143 @@
+"""
+Gateway-managed upstream retries.
+
+The OpenAI SDK's own retries are off (max_retries=0): they ignore the request
+deadline and multiply load exactly when the provider is struggling. Instead,
+retries happen here, above the backend pool:
+- only for transient upstream failures (timeout, unavailable, rate limited)
+- after a fully jittered exponential backoff, or the provider's Retry-After if longer
+- only if the request deadline leaves room for the backoff
+- only while the global RetryBudget has credit, so retries stay a bounded share of traffic
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from app.core import deadline
+from app.core.errors import UpstreamRateLimited, UpstreamTimeout, UpstreamUnavailable
+from app.core.metrics import GatewayMetrics
+
+# Failures worth another attempt. Overloaded / RateLimited come from the gateway's own
+# limiters, which already queue callers; retrying those would only queue them again.
+RETRYABLE_ERRORS = (UpstreamTimeout, UpstreamUnavailable, UpstreamRateLimited)
+
+T = TypeVar("T")
+
+
+class RetryBudget:
+    """
+    Caps retries (and pool failovers) at a share of requests.
+
+    Each request earns `ratio` of a retry and credit also refills at `min_per_s`, so
+    low-traffic gateways can still retry; credit is capped at `max_burst`. Shared by
+    chat and embeddings: one struggling provider can't turn the gateway into a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_s: float = 10.0, max_burst: float = 10.0) -> None:
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.max_burst = max_burst
+
+        self._credit = max_burst
+        self._refilled_at = time.monotonic()
+
+        self.requests = 0
+        self.spent = 0
+        self.exhausted = 0
+
+    def stats(self) -> dict[str, Any]:
+        self._refill()
+        return {
+            "requests": self.requests,
+            "spent": self.spent,
+            "exhausted": self.exhausted,
+            "credit": round(self._credit, 2),
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._credit = min(self.max_burst, self._credit + (now - self._refilled_at) * self.min_per_s)
+        self._refilled_at = now
+
+    def record_request(self) -> None:
+        self.requests += 1
+        self._credit = min(self.max_burst, self._credit + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._credit < 1.0:
+            self.exhausted += 1
+            return False
+        self._credit -= 1.0
+        self.spent += 1
+        return True
+
+
+def backoff_s(attempt: int, base_s: float, max_s: float, rng: random.Random | None = None) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return (rng or random).uniform(0.0, min(max_s, base_s * (2 ** attempt)))
+
+
+class Retrier:
+    """Runs upstream calls with the retry policy above (see RetryingChatProvider)."""
+
+    def __init__(
+        self,
+        budget: RetryBudget,
+        max_retries: int = 2,
+        backoff_base_s: float = 0.1,
+        backoff_max_s: float = 2.0,
+        metrics: GatewayMetrics | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.budget = budget
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.metrics = metrics
+        self._rng = rng or random.Random()
+
+        self.retries = 0
+        self.gave_up: dict[str, int] = {"max_retries": 0, "deadline": 0, "budget": 0}
+
+    def stats(self) -> dict[str, Any]:
+        return {"retries": self.retries, "gave_up": dict(self.gave_up), "budget": self.budget.stats()}
+
+    def delay_s(self, attempt: int, error: Exception) -> float:
+        delay = backoff_s(attempt, self.backoff_base_s, self.backoff_max_s, self._rng)
+        retry_after = getattr(error, "retry_after_s", None)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _give_up(self, operation: str, reason: str) -> None:
+        self.gave_up[reason] += 1
+        if self.metrics is not None:
+            self.metrics.upstream_retries.inc((operation, reason))
+
+    async def call(self, operation: str, fn: Callable[[], Awaitable[T]]) -> T:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._give_up(operation, "max_retries")
+                    raise
+                delay = self.delay_s(attempt, e)
+                remaining = deadline.remaining_s()
+                if remaining is not None and remaining <= delay:
+                    self._give_up(operation, "deadline")
+                    raise
+                if not self.budget.try_spend():
+                    self._give_up(operation, "budget")
+                    raise
+
+            attempt += 1
+            self.retries += 1
+            if self.metrics is not None:
+                self.metrics.upstream_retries.inc((operation, "retried"))
+            await asyncio.sleep(delay)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from app.core.vectors import Vector
+
+logger = logging.getLogger(__name__)
+
+Matrix = npt.NDArray[np.float32]
+
+KMEANS_ITERATIONS = 6
+KMEANS_SAMPLE_PER_LIST = 32
+ASSIGN_CHUNK_ROWS = 8192
+
+
+def normalized(vector: Vector) -> Matrix | None:
+    """float32 unit vector (cosine similarity becomes a dot product); None for a zero vector."""
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    if v.ndim != 1 or norm == 0.0 or not math.isfinite(norm):
+        return None
+    return v / norm
+
+
+def train_ivf(rows: Matrix) -> tuple[Matrix, npt.NDArray[np.intp]]:
+    """
+    Spherical k-means (~sqrt(n) centroids) on a sample of unit rows, then each
+    row's nearest centroid. Pure NumPy on its arguments: safe to run in a thread.
+    """
+    n = len(rows)
+    k = max(1, int(math.sqrt(n)))
+    rng = np.random.default_rng(n)
+
+    sample = rows[rng.choice(n, size=min(n, k * KMEANS_SAMPLE_PER_LIST), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=k, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = np.argmax(sample @ centroids.T, axis=1)
+        # Per-list sums via one sort + reduceat (np.add.at is an order of magnitude slower)
+        order = np.argsort(assigned, kind="stable")
+        lists, starts = np.unique(assigned[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        centroids[lists] = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+    assignments = np.concatenate([
+        np.argmax(rows[start:start + ASSIGN_CHUNK_ROWS] @ centroids.T, axis=1)
+        for start in range(0, n, ASSIGN_CHUNK_ROWS)
+    ])
+    return centroids, assignments
+
+
+class _Partition:
+    """
+    Unit-normalized prompt vectors of one partition, as rows of one contiguous matrix.
+
+    - exact search: one matrix-vector product over all rows, then argmax
+    - from `ann_min_rows` rows on, an IVF index (k-means centroids, ~sqrt(n) lists)
+      limits the product to the rows of the `nprobe` lists nearest the query;
+      it is retrained each time the partition has doubled since the last training
+    - removal moves the last row into the freed slot, so rows stay dense
+    """
+
+    def __init__(self, dim: int, ann_min_rows: int, nprobe: int) -> None:
+        self.dim = dim
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+
+        self.rows: Matrix = np.empty((16, dim), dtype=np.float32)
+        self.lists = np.zeros(16, dtype=np.intp)
+        self.ids: list[int] = []
+
+        self.centroids: Matrix | None = None
+        self.trained_at = 0
+        self.training = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, entry_id: int, vector: Matrix) -> int:
+        slot = len(self.ids)
+        if slot == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty_like(self.rows)])
+            self.lists = np.concatenate([self.lists, np.zeros_like(self.lists)])
+
+        self.rows[slot] = vector
+        self.ids.append(entry_id)
+        if self.centroids is not None:
+            self.lists[slot] = int(np.argmax(self.centroids @ vector))
+        return slot
+
+    def remove(self, slot: int) -> int | None:
+        """Drop one row; returns the id of the entry moved into `slot`, if any."""
+        last = len(self.ids) - 1
+        moved = None
+        if slot != last:
+            self.rows[slot] = self.rows[last]
+            self.lists[slot] = self.lists[last]
+            moved = self.ids[slot] = self.ids[last]
+        self.ids.pop()
+        return moved
+
+    def search(self, query: Matrix) -> tuple[int, float] | None:
+        """(slot, cosine similarity) of the nearest row, if any."""
+        n = len(self.ids)
+        if n == 0:
+            return None
+
+        rows = self.rows[:n]
+        if self.centroids is None:
+            scores = rows @ query
+            best = int(np.argmax(scores))
+            return best, float(scores[best])
+
+        closeness = self.centroids @ query
+        probes = np.argsort(-closeness)[: self.nprobe]
+        candidates = np.flatnonzero(np.isin(self.lists[:n], probes))
+        if len(candidates) == 0:
+            return None
+        scores = rows[candidates] @ query
+        best = int(np.argmax(scores))
+        return int(candidates[best]), float(scores[best])
+
+    def needs_training(self) -> bool:
+        return not self.training and len(self.ids) >= max(self.ann_min_rows, 2 * self.trained_at)
+
+    def snapshot(self) -> tuple[list[int], Matrix]:
+        """Copy of the current rows (and their ids) to train on while this partition keeps serving."""
+        self.training = True
+        return list(self.ids), self.rows[:len(self.ids)].copy()
+
+    def install(self, ids: list[int], centroids: Matrix, assignments: npt.NDArray[np.intp]) -> None:
+        """Adopt centroids trained on snapshot `ids`; rows added since are assigned here."""
+        by_id = dict(zip(ids, assignments.tolist(), strict=True))
+        n = len(self.ids)
+        lists = np.fromiter((by_id.get(entry_id, -1) for entry_id in self.ids), dtype=np.intp, count=n)
+        added = np.flatnonzero(lists < 0)
+        if len(added):
+            lists[added] = np.argmax(self.rows[added] @ centroids.T, axis=1)
+
+        self.lists[:n] = lists
+        self.centroids = centroids
+        self.trained_at = len(ids)
+        self.training = False
+
+
+@dataclass
+class _Entry:
+    partition: str
+    slot: int
+    value: dict[str, Any]
+    size: int
+    expires_at: float | None
+
+
+class SemanticIndex:
+    """
+    Memory-capped nearest-neighbour store: prompt vectors -> cached answers.
+
+    - one independent index per partition (the semantic cache partitions by
+      model, system prompt and output cap), so unrelated prompts never match
+    - size is tracked in bytes (vector + answer text + bookkeeping); the least
+      recently used entries are evicted past `max_bytes`, expired ones on read
+    - the first vector of a partition fixes its dimension; others are ignored
+    - IVF training runs in a worker thread on a snapshot; the partition keeps
+      answering with exact scans (or the previous IVF lists) until it is done
+    """
+
+    # Rough per-entry bookkeeping cost (entry object, dicts, id list slot)
+    ENTRY_OVERHEAD_BYTES = 512
+
+    def __init__(self, max_bytes: int, ttl_s: float | None = None, ann_min_rows: int = 10_000, nprobe: int = 8) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+
+        self.size_bytes = 0
+        self.evictions = 0
+        self._partitions: dict[str, _Partition] = {}
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._ids = itertools.count()
+        self._training: set[asyncio.Future[tuple[Matrix, npt.NDArray[np.intp]]]] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "partitions": len(self._partitions),
+            "approximate_partitions": sum(1 for p in self._partitions.values() if p.centroids is not None),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def search(self, partition: str, vector: Matrix, threshold: float) -> tuple[dict[str, Any], float] | None:
+        """Best (value, similarity) at or above `threshold` for a unit vector, if any."""
+        index = self._partitions.get(partition)
+        if index is None or index.dim != len(vector):
+            return None
+
+        found = index.search(vector)
+        if found is None or found[1] < threshold:
+            return None
+
+        entry_id = index.ids[found[0]]
+        entry = self._entries[entry_id]
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self._remove(entry_id)
+            return None
+
+        self._entries.move_to_end(entry_id)
+        return entry.value, found[1]
+
+    def add(self, partition: str, vector: Matrix, value: dict[str, Any]) -> None:
+        index = self._partitions.get(partition)
+        if index is None:
+            index = self._partitions[partition] = _Partition(len(vector), self.ann_min_rows, self.nprobe)
+        if index.dim != len(vector):
+            return
+
+        entry_id = next(self._ids)
+        size = vector.nbytes + len(str(value.get("text", ""))) + self.ENTRY_OVERHEAD_BYTES
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+        self._entries[entry_id] = _Entry(partition, index.add(entry_id, vector), value, size, expires_at)
+        self.size_bytes += size
+
+        while self.size_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+        if index.needs_training():
+            self._train(partition, index)
+
+    def _train(self, partition: str, index: _Partition) -> None:
+        ids, rows = index.snapshot()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to keep responsive (offline use, benchmarks)
+            index.install(ids, *train_ivf(rows))
+            return
+
+        # k-means over 10k rows of 1536 dims takes ~0.5 s of CPU: keep it off the event loop
+        training = loop.run_in_executor(None, train_ivf, rows)
+        self._training.add(training)
+
+        def done(future: asyncio.Future[tuple[Matrix, npt.NDArray[np.intp]]]) -> None:
+            self._training.discard(future)
+            if future.cancelled() or future.exception() is not None:
+                logger.warning(
+                    "semantic index training failed",
+                    exc_info=None if future.cancelled() else future.exception(),
+                    extra={"fields": {"partition": partition, "rows": len(ids)}},
+                )
+                index.training = False
+                return
+            index.install(ids, *future.result())
+
+        training.add_done_callback(done)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self.size_bytes -= entry.size
+
+        index = self._partitions[entry.partition]
+        moved = index.remove(entry.slot)
+        if moved is not None:
+            self._entries[moved].slot = entry.slot
+        if not len(index):
+            del self._partitions[entry.partition]
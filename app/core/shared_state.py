@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections.abc import Mapping
+from typing import Any
+
+from app.core.cache import CacheBackend, InMemoryCache
+from app.core.errors import RateLimited
+from app.core.metrics import GatewayMetrics
+from app.core.rate_limit import ModelRateLimiter, RateLimiterRegistry
+
+logger = logging.getLogger(__name__)
+
+# Long enough for a cache value (a full chat completion) on one line
+_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class SharedStateUnavailable(Exception):
+    """The state server can't be reached; callers fall back to per-process state."""
+
+
+class SharedStateServer:
+    """
+    State every worker must agree on, served over a local Unix socket by one process.
+
+    - the chat response cache, so a response cached by one worker is a hit in all
+    - the rate limiter buckets, so RPM/TPM quotas hold for the deployment, not per worker
+    - each worker's latest metrics dump, merged when any worker renders /v1/metrics
+
+    Protocol: one JSON object per line. {"id": n, "op": ..., ...} is answered with
+    {"id": n, "result": ...} or {"id": n, "error": ...}; a request without "id" is
+    fire-and-forget. Ops run on one event loop, so each is atomic.
+    """
+
+    def __init__(self, path: str, cache: InMemoryCache, rate_limiters: RateLimiterRegistry) -> None:
+        self.path = path
+        self.cache = cache
+        self.rate_limiters = rate_limiters
+        self.metrics: dict[str, dict[str, Any]] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=_LINE_LIMIT)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        server = self._server
+        if server is not None:
+            async with server:
+                await server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                try:
+                    response = {"result": await self._dispatch(request)}
+                except RateLimited as e:
+                    response = {"rate_limited": e.retry_after_s}
+                except Exception as e:
+                    logger.exception("shared state op failed", extra={"fields": {"op": request.get("op")}})
+                    response = {"error": f"{type(e).__name__}: {e}"}
+                if "id" in request:
+                    writer.write(json.dumps({"id": request["id"], **response}).encode("utf-8") + b"\n")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: dict[str, Any]) -> Any:
+        op = request["op"]
+        if op == "ping":
+            return "pong"
+        if op == "cache_get":
+            return await self.cache.get(request["key"])
+        if op == "cache_set":
+            await self.cache.set(request["key"], request["value"], request.get("ttl_s"))
+            return None
+        if op == "metrics_push":
+            self.metrics[str(request["worker"])] = request["metrics"]
+            return None
+        if op == "metrics_pull":
+            return list(self.metrics.values())
+        if op.startswith("rl_"):
+            limiter = self.rate_limiters.get(request["provider"], request["model"])
+            if op == "rl_reserve":
+                return limiter.reserve(request["tokens"])
+            if op == "rl_reconcile":
+                return limiter.reconcile(request["estimated"], request["actual"])
+            if op == "rl_refund":
+                return limiter.refund(request["estimated"])
+            if op == "rl_headers":
+                return limiter.update_from_headers(request["limits"])
+            if op == "rl_drain":
+                return limiter.on_upstream_rate_limited()
+        raise ValueError(f"unknown op {op!r}")
+
+
+class SharedStateClient:
+    """
+    One multiplexed connection from a worker to the SharedStateServer.
+
+    call() waits for the answer (at most `timeout_s`); send() is fire-and-forget.
+    While the server is unreachable, call() raises SharedStateUnavailable at once
+    (reconnecting at most every `retry_s`) and send() drops; every shared structure
+    then falls back to its per-process equivalent, so the worker keeps serving.
+    """
+
+    def __init__(self, path: str, timeout_s: float = 1.0, retry_s: float = 1.0) -> None:
+        self.path = path
+        self.timeout_s = timeout_s
+        self.retry_s = retry_s
+
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future[Any]] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._failed_at = float("-inf")
+        self._lock: asyncio.Lock | None = None
+        self._lock_loop: asyncio.AbstractEventLoop | None = None
+
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._live_writer() is not None
+
+    def _live_writer(self) -> asyncio.StreamWriter | None:
+        # A connection made on another event loop (tests, a previous app instance) is unusable
+        return self._writer if self._loop is asyncio.get_running_loop() else None
+
+    def stats(self) -> dict[str, Any]:
+        return {"connected": self._writer is not None, "failures": self.failures, "dropped": self.dropped}
+
+    async def call(self, op: str, **args: Any) -> Any:
+        writer = await self._connect()
+        request_id = next(self._ids)
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            writer.write(json.dumps({"id": request_id, "op": op, **args}).encode("utf-8") + b"\n")
+            response = await asyncio.wait_for(future, self.timeout_s)
+        except (TimeoutError, ConnectionError) as e:
+            self.failures += 1
+            raise SharedStateUnavailable(f"shared state {op} failed: {type(e).__name__}") from e
+        finally:
+            self._pending.pop(request_id, None)
+
+        if "rate_limited" in response:
+            raise RateLimited(retry_after_s=response["rate_limited"])
+        if "error" in response:
+            raise SharedStateUnavailable(response["error"])
+        return response["result"]
+
+    def send(self, op: str, **args: Any) -> None:
+        writer = self._live_writer()
+        if writer is None:
+            self.dropped += 1
+            return
+        writer.write(json.dumps({"op": op, **args}).encode("utf-8") + b"\n")
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        self._disconnect(SharedStateUnavailable("client closed"))
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        writer = self._live_writer()
+        if writer is not None:
+            return writer
+
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            writer = self._live_writer()
+            if writer is not None:
+                return writer
+            self._disconnect(SharedStateUnavailable("event loop changed"))
+            if time.monotonic() - self._failed_at < self.retry_s:
+                raise SharedStateUnavailable("shared state server unreachable")
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=_LINE_LIMIT)
+            except OSError as e:
+                self._failed_at = time.monotonic()
+                self.failures += 1
+                logger.warning("shared state server unreachable; using per-process state", extra={"fields": {"path": self.path}})
+                raise SharedStateUnavailable(str(e)) from e
+
+            self._writer = writer
+            self._loop = loop
+            self._reader_task = asyncio.create_task(self._read(reader))
+            return writer
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self._pending.get(response["id"])
+                if future is not None and not future.done():
+                    future.set_result(response)
+            error: Exception = ConnectionError("shared state server closed the connection")
+        except (OSError, ValueError) as e:
+            error = e
+        self._failed_at = time.monotonic()
+        self._disconnect(error)
+
+    def _disconnect(self, error: Exception) -> None:
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except RuntimeError:
+                pass  # its event loop is already closed
+        self._writer = None
+        self._loop = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done() and not future.get_loop().is_closed():
+                future.set_exception(ConnectionError(str(error)))
+
+
+class SharedCache(CacheBackend):
+    """Chat response cache held by the state server; `fallback` serves while it is unreachable."""
+
+    def __init__(self, client: SharedStateClient, fallback: CacheBackend) -> None:
+        self.client = client
+        self.fallback = fallback
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        try:
+            value: dict[str, Any] | None = await self.client.call("cache_get", key=key)
+            return value
+        except SharedStateUnavailable:
+            return await self.fallback.get(key)
+
+    async def set(self, key: str, value: dict[str, Any], ttl_s: float | None = None) -> None:
+        if self.client.connected:
+            self.client.send("cache_set", key=key, value=value, ttl_s=ttl_s)
+        else:
+            await self.fallback.set(key, value, ttl_s)
+
+
+class SharedModelRateLimiter(ModelRateLimiter):
+    """
+    Reservations and corrections go to the state server's buckets for this
+    (provider, model); the local buckets take over while it is unreachable.
+
+    `queued` / `rejected` in snapshot() count this worker's callers only.
+    """
+
+    def __init__(self, client: SharedStateClient, provider: str, model: str, rpm: int = 0, tpm: int = 0, max_wait_s: float = 5.0) -> None:
+        super().__init__(rpm=rpm, tpm=tpm, max_wait_s=max_wait_s)
+        self.client = client
+        self.key = {"provider": provider, "model": model}
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        if not self.requests.enabled and not self.tokens.enabled:
+            return  # no quota configured or learned yet: skip the round-trip
+        try:
+            wait_s = await self.client.call("rl_reserve", tokens=estimated_tokens, **self.key)
+        except RateLimited:
+            self.rejected += 1
+            raise
+        except SharedStateUnavailable:
+            wait_s = self.reserve(estimated_tokens)
+        await self._wait(wait_s, estimated_tokens)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        if actual_tokens is None:
+            return
+        if self.client.connected:
+            self.client.send("rl_reconcile", estimated=estimated_tokens, actual=actual_tokens, **self.key)
+        else:
+            super().reconcile(estimated_tokens, actual_tokens)
+
+    def refund(self, estimated_tokens: int) -> None:
+        if self.client.connected:
+            self.client.send("rl_refund", estimated=estimated_tokens, **self.key)
+        else:
+            super().refund(estimated_tokens)
+
+    def update_from_headers(self, limits: Mapping[str, int | None]) -> None:
+        # Applied locally too: the local capacities decide whether acquire() needs the server
+        super().update_from_headers(limits)
+        if self.client.connected:
+            self.client.send("rl_headers", limits=dict(limits), **self.key)
+
+    def on_upstream_rate_limited(self) -> None:
+        if self.client.connected:
+            self.client.send("rl_drain", **self.key)
+        else:
+            super().on_upstream_rate_limited()
+
+
+class SharedRateLimiterRegistry(RateLimiterRegistry):
+    def __init__(self, client: SharedStateClient, rpm: int = 0, tpm: int = 0, max_wait_s: float = 5.0) -> None:
+        super().__init__(rpm=rpm, tpm=tpm, max_wait_s=max_wait_s)
+        self.client = client
+
+    def _create(self, provider: str, model: str) -> ModelRateLimiter:
+        return SharedModelRateLimiter(self.client, provider, model, rpm=self.rpm, tpm=self.tpm, max_wait_s=self.max_wait_s)
+
+
+class MetricsPublisher:
+    """
+    Pushes this worker's metrics dump to the state server every `interval_s`;
+    render() merges every worker's latest dump (this worker's pushed fresh first).
+
+    Counters and histograms of a worker that exited stay in the totals, as they
+    should for Prometheus counters.
+    """
+
+    def __init__(self, client: SharedStateClient, metrics: GatewayMetrics, interval_s: float = 1.0) -> None:
+        self.client = client
+        self.metrics = metrics
+        self.interval_s = interval_s
+        self.worker = f"{os.getpid()}"
+
+    async def push(self) -> None:
+        await self.client.call("metrics_push", worker=self.worker, metrics=self.metrics.dump())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.push()
+            except SharedStateUnavailable:
+                pass
+
+    async def render(self) -> str:
+        try:
+            await self.push()
+            dumps = await self.client.call("metrics_pull")
+        except SharedStateUnavailable:
+            return self.metrics.render()
+        return GatewayMetrics.merged(dumps).render()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Hashable
+from typing import Any, Generic, TypeVar
+
+from app.core import deadline
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "waiters", "deadline")
+
+    def __init__(self, task: asyncio.Task[T], shared_deadline: deadline.SharedDeadline) -> None:
+        self.task = task
+        self.waiters = 0
+        self.deadline = shared_deadline
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapses concurrent calls with the same key into one.
+
+    The first caller's `fn()` runs as its own task; callers arriving while it is
+    in flight await the same task and get its result or exception. Nothing is
+    remembered once it finishes (that is the caches' job).
+
+    The shared call runs under the latest deadline among its callers (a
+    deadline.SharedDeadline, pushed back when a later caller joins); each caller
+    still stops waiting at its own deadline.
+
+    Cancellation:
+    - a waiter going away (client disconnect, timeout) never cancels the shared
+      call for the others: each waiter awaits it through asyncio.shield
+    - when the last waiter goes away the shared call is cancelled, so nobody
+      pays for an answer nobody is waiting for
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call[T]] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+    async def do(self, key: Hashable, fn: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            self.leaders += 1
+            shared_deadline = deadline.SharedDeadline()
+            shared_deadline.join()
+            task = asyncio.get_running_loop().create_task(fn(), context=deadline.shared(shared_deadline))
+            call = self._calls[key] = _Call(task, shared_deadline)
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+            call.deadline.join()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Only reachable when the last waiter was cancelled
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call[T]) -> None:
+        # A newer call may already own the key if this one was abandoned
+        if self._calls.get(key) is call:
+            del self._calls[key]
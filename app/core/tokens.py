@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from app.core.errors import ContextLengthExceeded
+from app.schemas.chat import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+
+    Only used for sizing decisions (batching, chunking); never for billing.
+    """
+    return len(text) // 4 + 1
+
+
+def estimate_chat_tokens(messages: list[ChatMessage], model: str, max_output_tokens: int, counter: TokenCounter | None = None) -> int:
+    """
+    Upper-bound-ish cost of a chat call: counted prompt tokens + the output cap.
+    """
+    return (counter or default_counter).count_chat(messages, model) + max_output_tokens
+
+
+# Chat framing (OpenAI chat format): each message costs its content plus ~4 tokens
+# for role and separators; every reply is primed with 3 more
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# (model prefix, BPE encoding); the longest matching prefix wins
+MODEL_ENCODINGS: dict[str, str] = {
+    "gpt-3.5": "cl100k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-4o": "o200k_base",
+    "gpt-4.1": "o200k_base",
+    "gpt-4.5": "o200k_base",
+    "gpt-5": "o200k_base",
+    "o1": "o200k_base",
+    "o3": "o200k_base",
+    "o4": "o200k_base",
+    "text-embedding-": "cl100k_base",
+}
+DEFAULT_ENCODING = "o200k_base"
+
+# Context window in tokens (prompt + output), by model prefix; the longest matching prefix wins
+CONTEXT_WINDOWS: dict[str, int] = {
+    "gpt-3.5-turbo": 16_385,
+    "gpt-4": 8_192,
+    "gpt-4-turbo": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o1-mini": 128_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+}
+
+
+def longest_prefix(model: str, prefixes: dict[str, Any]) -> str | None:
+    """The longest key of `prefixes` that `model` starts with (per-model tables by prefix)."""
+    matches = [p for p in prefixes if model.startswith(p)]
+    return max(matches, key=len) if matches else None
+
+
+class Encoder(Protocol):
+    name: str
+    # False for the built-in estimate: pre-flight checks then leave a margin
+    exact: bool
+
+    def count(self, text: str) -> int: ...
+
+
+class _TiktokenEncoder:
+    exact = True
+
+    def __init__(self, encoding: Any) -> None:
+        self.name = encoding.name
+        self._encoding = encoding
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class ApproximateEncoder:
+    """
+    Dependency-free stand-in for a BPE encoder.
+
+    Splits text the way GPT pre-tokenizers do (words with their leading space,
+    digit groups of up to 3, punctuation runs, whitespace) and counts one token
+    per piece, plus extra tokens for long words; runs of CJK-range characters
+    count one token per character instead. About 15 us for a 300-character
+    message; TokenCounter memoizes repeats.
+    """
+
+    exact = False
+
+    _PIECE = re.compile(r"'(?:[sdmt]|ll|ve|re)\b| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+    _WIDE = re.compile(r"[\u2e80-\uffff]")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def count(self, text: str) -> int:
+        pieces = self._PIECE.findall(text)
+        if text.isascii():
+            # Long words split into several BPE tokens (common ones up to ~9 letters are single tokens)
+            return len(pieces) + sum((len(p) - 2) // 8 for p in pieces if len(p) > 9)
+
+        tokens = 0
+        for piece in pieces:
+            wide = len(self._WIDE.findall(piece)) if not piece.isascii() else 0
+            if wide:
+                tokens += wide
+            else:
+                tokens += 1 + ((len(piece) - 2) // 8 if len(piece) > 9 else 0)
+        return tokens
+
+
+def load_encoder(encoding: str) -> Encoder:
+    """
+    The real BPE encoder when the optional `tiktoken` package is installed
+    (`pip install tiktoken`), otherwise ApproximateEncoder.
+    """
+    if importlib.util.find_spec("tiktoken") is not None:
+        try:
+            import tiktoken
+
+            return _TiktokenEncoder(tiktoken.get_encoding(encoding))
+        except Exception:
+            # e.g. the encoding file can't be downloaded (offline deployments)
+            logger.warning("tiktoken encoding unavailable; estimating token counts", exc_info=True, extra={"fields": {"encoding": encoding}})
+    return ApproximateEncoder(encoding)
+
+
+class TokenCounter:
+    """
+    In-process token accounting for chat requests.
+
+    - one encoder per BPE encoding, loaded on first use and shared by all models using it
+    - counts are memoized by (encoding, text): repeated system prompts and few-shot
+      examples are counted once, then cost a dict lookup
+    - the memo key is the text's hash and length, so cached counts never pin prompt text in memory
+    """
+
+    def __init__(self, context_windows: dict[str, int] | None = None, memo_size: int = 16_384) -> None:
+        self.context_windows = {**CONTEXT_WINDOWS, **(context_windows or {})}
+        self.memo_size = memo_size
+
+        self._encoders: dict[str, Encoder] = {}
+        self._encoding_by_model: dict[str, str] = {}
+        self._memo: OrderedDict[tuple[str, int, int], int] = OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "encoders": {name: "exact" if e.exact else "approximate" for name, e in self._encoders.items()},
+            "memo_entries": len(self._memo),
+            "memo_hits": self.memo_hits,
+            "memo_misses": self.memo_misses,
+        }
+
+    def encoding_for(self, model: str) -> str:
+        encoding = self._encoding_by_model.get(model)
+        if encoding is None:
+            prefix = longest_prefix(model, MODEL_ENCODINGS)
+            encoding = self._encoding_by_model[model] = MODEL_ENCODINGS[prefix] if prefix else DEFAULT_ENCODING
+        return encoding
+
+    def encoder(self, model: str) -> Encoder:
+        encoding = self.encoding_for(model)
+        encoder = self._encoders.get(encoding)
+        if encoder is None:
+            encoder = self._encoders[encoding] = load_encoder(encoding)
+        return encoder
+
+    def count(self, text: str, model: str) -> int:
+        encoder = self.encoder(model)
+        key = (encoder.name, hash(text), len(text))
+        tokens = self._memo.get(key)
+        if tokens is not None:
+            self.memo_hits += 1
+            self._memo.move_to_end(key)
+            return tokens
+
+        self.memo_misses += 1
+        tokens = self._memo[key] = encoder.count(text)
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return tokens
+
+    def count_chat(self, messages: list[ChatMessage], model: str) -> int:
+        """Prompt tokens of a chat request, framing included."""
+        return sum(self.count(m.content, model) + TOKENS_PER_MESSAGE for m in messages) + TOKENS_PER_REPLY
+
+    def context_window(self, model: str) -> int | None:
+        """None for models not in the table (no pre-flight check)."""
+        prefix = longest_prefix(model, self.context_windows)
+        return self.context_windows[prefix] if prefix is not None else None
+
+    def check_context(self, messages: list[ChatMessage], model: str, max_output_tokens: int) -> int:
+        """
+        Prompt tokens, after checking prompt + max_output_tokens against the context window.
+
+        Estimated counts can run high, so with ApproximateEncoder only 90% of the
+        estimate is held against the window, and only for ASCII prompts: there is
+        no safe margin for estimates of other scripts, so those are logged and left
+        to the upstream, which enforces the exact limit either way.
+        """
+        prompt_tokens = self.count_chat(messages, model)
+        window = self.context_window(model)
+        if window is None:
+            return prompt_tokens
+
+        exact = self.encoder(model).exact
+        checked = prompt_tokens if exact else int(prompt_tokens * 0.9)
+        if checked + max_output_tokens > window:
+            if not exact and not all(m.content.isascii() for m in messages):
+                logger.info("estimated prompt may exceed the context window; left to the upstream", extra={"fields": {
+                    "model": model, "estimated_prompt_tokens": prompt_tokens, "max_output_tokens": max_output_tokens, "context_window": window,
+                }})
+                return prompt_tokens
+            raise ContextLengthExceeded(
+                f"Prompt ({prompt_tokens} tokens) plus max_output_tokens ({max_output_tokens}) exceeds the {window}-token context window of {model}",
+                details={"prompt_tokens": prompt_tokens, "max_output_tokens": max_output_tokens, "context_window": window},
+            )
+        return prompt_tokens
+
+
+# Shared counter for code without an injected one (local providers' usage, quota estimates)
+default_counter = TokenCounter()
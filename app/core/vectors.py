@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+from collections.abc import Sequence
+
+# Providers may hand back either Python float lists or float32 arrays;
+# the wire encoders below accept both and avoid per-float objects for array input.
+Vector = Sequence[float]
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def to_f32(vector: Vector) -> array[float]:
+    if isinstance(vector, array) and vector.typecode == "f":
+        return vector
+    if isinstance(vector, memoryview) and vector.format == "f":
+        # Views into the embedding store: one copy, no per-float objects
+        f32 = array("f")
+        f32.frombytes(vector)
+        return f32
+    return array("f", vector)
+
+
+def f32_from_bytes(raw: bytes) -> array[float]:
+    """Decode little-endian float32 bytes (OpenAI's base64 layout) without touching each float."""
+    vector = array("f")
+    vector.frombytes(raw)
+    if not _LITTLE_ENDIAN:
+        vector.byteswap()
+    return vector
+
+
+def _le_bytes(vector: Vector) -> bytes:
+    f32 = to_f32(vector)
+    if _LITTLE_ENDIAN:
+        return f32.tobytes()
+    swapped = array("f", f32)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def to_float_list(vector: Vector) -> list[float]:
+    if isinstance(vector, list):
+        return vector
+    if isinstance(vector, array):
+        return vector.tolist()
+    return list(vector)
+
+
+def to_base64(vector: Vector) -> str:
+    """Same layout as OpenAI's `encoding_format=base64`: little-endian float32."""
+    return base64.b64encode(_le_bytes(vector)).decode("ascii")
+
+
+def to_npy(vectors: Sequence[Vector]) -> bytes:
+    """
+    Encode vectors as one `.npy` (format v1.0) float32 matrix.
+
+    Readable with `numpy.load(io.BytesIO(body))` or by skipping the header and
+    reading rows of little-endian float32 directly.
+    """
+    dim = len(vectors[0]) if vectors else 0
+    if any(len(v) != dim for v in vectors):
+        raise ValueError("all vectors must have the same dimension")
+
+    header = f"{{'descr': '<f4', 'fortran_order': False, 'shape': ({len(vectors)}, {dim}), }}"
+    # magic(6) + version(2) + header_len(2) + header + "\n", padded to a multiple of 64
+    pad = 64 - (10 + len(header) + 1) % 64
+    header_bytes = (header + " " * (pad % 64) + "\n").encode("latin1")
+
+    parts = [b"\x93NUMPY\x01\x00", len(header_bytes).to_bytes(2, "little"), header_bytes]
+    parts.extend(_le_bytes(v) for v in vectors)
+    return b"".join(parts)
@@ -1,62 +1,388 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
+from app.api.routers.batches import router as batches_router
 from app.api.routers.chat import router as chat_router
 from app.api.routers.embeddings import router as embedding_router
 from app.api.routers.heath import router as health_router
-from app.core.config import settings
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.status import router as status_router
+from app.core.cache import CacheBackend, EmbeddingCache, InMemoryCache
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.concurrency import ConcurrencyLimiterRegistry
+from app.core.config import BackendConfig, settings
+from app.core.embedding_store import EmbeddingStore
 from app.core.errors import AppError
+from app.core.history import HistoryTrimmer
+from app.core.http import create_http_client, prewarm, upstream_timeout
 from app.core.logging import setup_logging
+from app.core.metrics import GatewayMetrics
 from app.core.middleware import RequestContextMiddleware
+from app.core.rate_limit import RateLimiterRegistry
+from app.core.retry import Retrier, RetryBudget
+from app.core.shared_state import (
+    MetricsPublisher,
+    SharedCache,
+    SharedRateLimiterRegistry,
+    SharedStateClient,
+)
+from app.core.tokens import TokenCounter
 from app.providers.base import ChatProvider
+from app.providers.batching_embeddings_provider import BatchingEmbeddingsProvider
+from app.providers.cached_embeddings_provider import CachingEmbeddingsProvider
+from app.providers.cached_provider import CachingChatProvider
+from app.providers.coalescing_provider import CoalescingChatProvider, CoalescingEmbeddingsProvider
 from app.providers.embeddings_base import EmbeddingsProvider
-from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
-from app.providers.fake_provider import FakeChatProvider
-from app.providers.openai_embeddings_provider import OpenAIEmbeddingsProvider
-from app.providers.openai_provider import OpenAIChatProvider
+from app.providers.hedging_provider import HedgingChatProvider
+from app.providers.limited_provider import (
+    ConcurrencyLimitedChatProvider,
+    ConcurrencyLimitedEmbeddingsProvider,
+    RateLimitedChatProvider,
+    RateLimitedEmbeddingsProvider,
+)
+from app.providers.metered_provider import MeteredChatProvider, MeteredEmbeddingsProvider
+from app.providers.registry import create_providers
+from app.providers.retrying_provider import RetryingChatProvider, RetryingEmbeddingsProvider
+from app.providers.routing import (
+    Backend,
+    BackendPool,
+    RoutingChatProvider,
+    RoutingEmbeddingsProvider,
+)
+from app.providers.stored_embeddings_provider import StoredEmbeddingsProvider
+from app.services.batch_service import BatchRunner, BatchService
 from app.services.chat_service import ChatService
 from app.services.embed_service import EmbeddingsService
 
+if TYPE_CHECKING:
+    from app.core.http import UpstreamHttpClient
+
+
+def _upstream_backends(http_client: Callable[[], UpstreamHttpClient]) -> list[tuple[str, ChatProvider, EmbeddingsProvider]]:
+    """
+    Raw vendor providers, one (name, chat, embeddings) triple per upstream backend.
 
-def create_app() -> FastAPI:
-    setup_logging()
+    PROVIDER_BACKENDS wins; otherwise a single OpenAI backend when OPENAI_API_KEY
+    is set, or the deterministic fakes. Vendor providers share `http_client()`.
+    """
+    configs = settings.provider_backends
+    if not configs:
+        if settings.openai_api_key:
+            configs = [BackendConfig(name="openai", kind="openai", api_key=settings.openai_api_key)]
+        else:
+            configs = [BackendConfig(name="fake", kind="fake")]
+    return [(cfg.name, *create_providers(cfg, http_client)) for cfg in configs]
+
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout_s=settings.breaker_reset_timeout_s,
+    )
+
+
+def create_app(
+    upstreams: list[tuple[str, ChatProvider, EmbeddingsProvider]] | None = None,
+    resume_batches: bool = True,
+) -> FastAPI:
+    """
+    `upstreams` replaces the configured raw providers (name, chat, embeddings);
+    the load-test harness uses it to inject simulated backends. Everything
+    layered on top (limits, routing, caches, ...) is built the same way.
+
+    `resume_batches=False` leaves interrupted /v1/batches jobs alone at startup:
+    the batch CLI runs the lifespan for its setup and shutdown, not to serve jobs.
+    """
+    setup_logging(
+        async_mode=settings.log_async,
+        queue_size=settings.log_queue_size,
+        static_fields={"env": settings.app_env},
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if app.state.http_client is not None and app.state.prewarm_urls and settings.http_prewarm_connections > 0:
+            await prewarm(app.state.http_client, app.state.prewarm_urls, settings.http_prewarm_connections)
+        # Loads the BPE tables (when tiktoken is installed) before the first request needs them
+        await asyncio.to_thread(app.state.tokens.encoder, settings.default_chat_model)
+        publishing = None
+        if app.state.metrics_publisher is not None:
+            publishing = asyncio.create_task(app.state.metrics_publisher.run())
+        # Batch jobs interrupted by a restart continue from their last checkpoint
+        if resume_batches:
+            app.state.batch_service.resume_pending()
+        yield
+        await app.state.batch_service.shutdown()
+        if app.state.embed_store is not None:
+            await app.state.embed_store.flush()
+            app.state.embed_store.store.close()
+        if app.state.http_client is not None:
+            await app.state.http_client.aclose()
+        if publishing is not None:
+            publishing.cancel()
+        if app.state.shared_state is not None:
+            await app.state.shared_state.close()
 
     app = FastAPI(
         title="LLM Inference Gateway",
         version="1.0.0",
+        lifespan=lifespan,
     )
 
-    app.add_middleware(RequestContextMiddleware)
+    metrics = GatewayMetrics() if settings.metrics_enabled else None
+    app.state.metrics = metrics
+
+    # Multi-worker mode: chat cache, rate limits and metrics go through the state server
+    shared = None
+    if settings.shared_state_socket:
+        shared = SharedStateClient(settings.shared_state_socket, timeout_s=settings.shared_state_timeout_s)
+    app.state.shared_state = shared
+    app.state.metrics_publisher = None
+    if shared is not None and metrics is not None:
+        app.state.metrics_publisher = MetricsPublisher(shared, metrics, interval_s=settings.metrics_push_interval_s)
+
+    app.add_middleware(
+        RequestContextMiddleware,
+        access_log_sample_rate=settings.access_log_sample_rate,
+        metrics=metrics,
+        default_timeout_ms=settings.request_default_timeout_ms,
+        max_timeout_ms=settings.request_max_timeout_ms,
+    )
 
     chat_provider: ChatProvider
     embeddings_provider: EmbeddingsProvider
 
-    if settings.openai_api_key:
-        chat_provider = OpenAIChatProvider()
-        embeddings_provider = OpenAIEmbeddingsProvider()
+    limiters = ConcurrencyLimiterRegistry(
+        initial_limit=settings.concurrency_initial_limit,
+        min_limit=settings.concurrency_min_limit,
+        max_limit=settings.concurrency_max_limit,
+        max_queue=settings.concurrency_max_queue,
+        latency_tolerance=settings.concurrency_latency_tolerance,
+    )
+    rate_limiters = RateLimiterRegistry(
+        rpm=settings.rate_limit_rpm,
+        tpm=settings.rate_limit_tpm,
+        max_wait_s=settings.rate_limit_max_wait_s,
+    )
+    if shared is not None:
+        rate_limiters = SharedRateLimiterRegistry(
+            shared,
+            rpm=settings.rate_limit_rpm,
+            tpm=settings.rate_limit_tpm,
+            max_wait_s=settings.rate_limit_max_wait_s,
+        )
+    app.state.limiters = limiters
+    app.state.rate_limiters = rate_limiters
+
+    # One counter (and memo) for context checks and quota estimates
+    tokens = app.state.tokens = TokenCounter(context_windows=settings.model_context_windows)
+
+    chat_backends: list[Backend[ChatProvider]] = []
+    embeddings_backends: list[Backend[EmbeddingsProvider]] = []
+
+    # Built on first use: with only fake backends the HTTP stack is never imported
+    app.state.http_client = None
+
+    def http_client() -> UpstreamHttpClient:
+        client: UpstreamHttpClient | None = app.state.http_client
+        if client is None:
+            client = app.state.http_client = create_http_client(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry_s=settings.http_keepalive_expiry_s,
+                http2=settings.http2_enabled,
+                timeout=upstream_timeout(settings.http_connect_timeout_s, settings.http_read_timeout_s, settings.http_pool_timeout_s),
+            )
+        return client
+
+    upstreams = upstreams or _upstream_backends(http_client)
+    app.state.prewarm_urls = [
+        provider.upstream_url
+        for _, chat, embeddings in upstreams
+        for provider in (chat, embeddings)
+        if provider.upstream_url is not None
+    ]
+
+    for name, chat_provider, embeddings_provider in upstreams:
+        # Provider metrics per backend, on real upstream calls only
+        if metrics is not None:
+            chat_provider = MeteredChatProvider(inner=chat_provider, metrics=metrics, backend=name)
+            embeddings_provider = MeteredEmbeddingsProvider(inner=embeddings_provider, metrics=metrics, backend=name)
+
+        # Limits apply to real upstream calls, after caching/batching
+        if settings.concurrency_limit_enabled:
+            chat_provider = ConcurrencyLimitedChatProvider(inner=chat_provider, limiters=limiters)
+            embeddings_provider = ConcurrencyLimitedEmbeddingsProvider(inner=embeddings_provider, limiters=limiters)
+
+        # Quota check wraps the concurrency limit so queued callers don't hold a slot while waiting
+        if settings.rate_limit_enabled:
+            chat_provider = RateLimitedChatProvider(inner=chat_provider, limiters=rate_limiters, tokens=tokens)
+            embeddings_provider = RateLimitedEmbeddingsProvider(inner=embeddings_provider, limiters=rate_limiters)
+
+        chat_backends.append(Backend(name, chat_provider, _breaker()))
+        embeddings_backends.append(Backend(name, embeddings_provider, _breaker()))
+
+    # One budget for chat and embeddings retries and pool failovers
+    retry_budget = RetryBudget(ratio=settings.retry_budget_ratio, min_per_s=settings.retry_min_per_s)
+
+    app.state.backend_pools = {}
+    if len(chat_backends) == 1:
+        chat_provider = chat_backends[0].provider
+        embeddings_provider = embeddings_backends[0].provider
     else:
-        chat_provider = FakeChatProvider()
-        embeddings_provider = FakeEmbeddingsProvider()
+        chat_pool = BackendPool(chat_backends, retry_budget=retry_budget)
+        embeddings_pool = BackendPool(embeddings_backends, retry_budget=retry_budget)
+        app.state.backend_pools = {"chat": chat_pool, "embeddings": embeddings_pool}
+        chat_provider = RoutingChatProvider(chat_pool)
+        embeddings_provider = RoutingEmbeddingsProvider(embeddings_pool)
+
+    # Retries wrap routing, so a retry after backoff can land on any healthy backend
+    app.state.retrier = None
+    if settings.upstream_max_retries > 0:
+        retrier = app.state.retrier = Retrier(
+            retry_budget,
+            max_retries=settings.upstream_max_retries,
+            backoff_base_s=settings.retry_backoff_base_ms / 1000.0,
+            backoff_max_s=settings.retry_backoff_max_ms / 1000.0,
+            metrics=metrics,
+        )
+        chat_provider = RetryingChatProvider(inner=chat_provider, retrier=retrier)
+        embeddings_provider = RetryingEmbeddingsProvider(inner=embeddings_provider, retrier=retrier)
+
+    # Hedges go through routing so a duplicate can land on another backend
+    app.state.hedging = None
+    if settings.chat_hedge_enabled:
+        chat_provider = app.state.hedging = HedgingChatProvider(
+            inner=chat_provider,
+            percentile=settings.chat_hedge_percentile,
+            max_hedge_ratio=settings.chat_hedge_max_ratio,
+            min_samples=settings.chat_hedge_min_samples,
+        )
 
-    app.state.chat_service = ChatService(provider=chat_provider)
-    app.state.embeddings_service = EmbeddingsService(provider=embeddings_provider)
+    # Inside the caches: identical concurrent misses go upstream once
+    app.state.coalescing = {}
+    if settings.coalesce_enabled:
+        chat_provider = app.state.coalescing["chat"] = CoalescingChatProvider(inner=chat_provider)
+
+    app.state.embed_batching = None
+    if settings.embed_batch_enabled:
+        embeddings_provider = app.state.embed_batching = BatchingEmbeddingsProvider(
+            inner=embeddings_provider,
+            window_ms=settings.embed_batch_window_ms,
+            max_batch_size=settings.embed_batch_max_size,
+            max_batch_tokens=settings.embed_batch_max_tokens,
+        )
+
+    if settings.coalesce_enabled:
+        embeddings_provider = app.state.coalescing["embeddings"] = CoalescingEmbeddingsProvider(inner=embeddings_provider)
+
+    # Disk store under the in-memory cache: vectors survive restarts and are shared by workers
+    app.state.embed_store = None
+    if settings.embed_store_dir:
+        embeddings_provider = app.state.embed_store = StoredEmbeddingsProvider(
+            inner=embeddings_provider,
+            store=EmbeddingStore(settings.embed_store_dir, max_bytes=settings.embed_store_max_mb * 1024 * 1024),
+        )
+
+    # Cache sits outside the batcher so only misses are batched upstream
+    app.state.embed_cache = None
+    if settings.embed_cache_enabled:
+        embeddings_provider = app.state.embed_cache = CachingEmbeddingsProvider(
+            inner=embeddings_provider,
+            cache=EmbeddingCache(max_bytes=settings.embed_cache_max_mb * 1024 * 1024),
+        )
+
+    # Prompts are embedded through the full embeddings chain (cache, batching, routing)
+    app.state.semantic_cache = None
+    if settings.semantic_cache_enabled:
+        # NumPy is only imported when the semantic cache is on
+        from app.core.semantic_index import SemanticIndex
+        from app.providers.semantic_cache_provider import SemanticCachingChatProvider
+
+        chat_provider = app.state.semantic_cache = SemanticCachingChatProvider(
+            inner=chat_provider,
+            embeddings=embeddings_provider,
+            index=SemanticIndex(
+                max_bytes=settings.semantic_cache_max_mb * 1024 * 1024,
+                ttl_s=settings.semantic_cache_ttl_s,
+                ann_min_rows=settings.semantic_cache_ann_min_entries,
+                nprobe=settings.semantic_cache_ann_nprobe,
+            ),
+            embed_model=settings.semantic_cache_embed_model or settings.default_embed_model,
+            threshold=settings.semantic_cache_threshold,
+            deterministic_only=settings.chat_cache_deterministic_only,
+            metrics=metrics,
+        )
+
+    app.state.response_cache = None
+    if settings.chat_cache_enabled:
+        cache_backend: CacheBackend = InMemoryCache(max_entries=settings.chat_cache_max_entries, ttl_s=settings.chat_cache_ttl_s)
+        if shared is not None:
+            cache_backend = SharedCache(shared, fallback=cache_backend)
+        chat_provider = app.state.response_cache = CachingChatProvider(
+            inner=chat_provider,
+            backend=cache_backend,
+            deterministic_only=settings.chat_cache_deterministic_only,
+        )
+
+    app.state.history_trimmer = HistoryTrimmer(
+        tokens,
+        budget_tokens=settings.chat_history_budget_tokens,
+        model_budgets=settings.chat_history_model_budgets,
+        min_truncated_tokens=settings.chat_history_min_truncated_tokens,
+    ) if settings.chat_history_trim_enabled else None
+    app.state.chat_service = ChatService(
+        provider=chat_provider,
+        metrics=metrics,
+        tokens=tokens if settings.context_check_enabled else None,
+        trimmer=app.state.history_trimmer,
+    )
+    app.state.embeddings_service = EmbeddingsService(
+        provider=embeddings_provider,
+        max_chunk_size=settings.embed_max_chunk_size,
+        max_chunk_tokens=settings.embed_max_chunk_tokens,
+        chunk_concurrency=settings.embed_chunk_concurrency,
+    )
+    app.state.batch_service = BatchService(
+        runner=BatchRunner(
+            chat_service=app.state.chat_service,
+            embeddings_service=app.state.embeddings_service,
+            concurrency=settings.batch_concurrency,
+            checkpoint_every=settings.batch_checkpoint_every,
+        ),
+        root=Path(settings.batch_dir),
+        max_input_bytes=settings.batch_max_input_mb * 1024 * 1024,
+    )
 
     app.include_router(health_router, prefix="/v1")
     app.include_router(chat_router, prefix="/v1")
     app.include_router(embedding_router, prefix="/v1")
+    app.include_router(status_router, prefix="/v1")
+    app.include_router(metrics_router, prefix="/v1")
+    app.include_router(batches_router, prefix="/v1")
 
     @app.exception_handler(AppError)
     async def app_error_handler(request: Request, exc: AppError) -> JSONResponse:
+        # Picked up by the middleware as the `code` label of the request counter
+        request.state.error_code = exc.code
+
+        headers = None
+        if exc.retry_after_s is not None:
+            headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after_s)))}
+
         return JSONResponse(
             status_code=exc.status_code,
-            content={
-                "error": {
-                    "code": exc.code,
-                    "message": exc.message,
-                    "retryable": exc.retryable,
-                    "details": exc.details,
-                }
-            },
+            content=exc.to_payload(),
+            headers=headers,
         )
     
     return app
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
 from app.schemas.chat import ChatMessage
 
@@ -16,6 +17,12 @@ class ChatProvider(ABC):
     - Clean separation of concerns (service != vendor client)
     """
 
+    # Short identifier for monitoring and per-upstream state (e.g. "openai")
+    name: str = "unknown"
+
+    # Base URL of the remote API, for vendor providers on the shared HTTP client (prewarmed at startup)
+    upstream_url: str | None = None
+
     @abstractmethod
     async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
         """
@@ -31,4 +38,15 @@ class ChatProvider(ABC):
         }
         """
         raise NotImplementedError
-    
\ No newline at end of file
+
+    @abstractmethod
+    def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict]:
+        """
+        Async generator yielding incremental chunks:
+        {
+            "text": str,                # newly generated text (may be "")
+            "model": str,               # optional
+            "usage": {...} | None,      # optional, same shape as generate(); usually on the last chunk
+        }
+        """
+        raise NotImplementedError
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core import deadline
+from app.core.errors import (
+    BadUpstreamResponse,
+    UpstreamRateLimited,
+    UpstreamTimeout,
+    UpstreamUnavailable,
+)
+from app.core.tokens import estimate_tokens
+from app.providers.embeddings_base import EmbeddingsProvider
+
+logger = logging.getLogger(__name__)
+
+
+# Failures that say nothing about the inputs; splitting the batch would only add load
+_UPSTREAM_CAPACITY_ERRORS = (UpstreamTimeout, UpstreamRateLimited, UpstreamUnavailable)
+
+
+@dataclass
+class _Waiter:
+    inputs: list[str]
+    future: asyncio.Future[dict[str, Any]]
+
+
+@dataclass
+class _Batch:
+    waiters: list[_Waiter] = field(default_factory=list)
+    size: int = 0
+    tokens: int = 0
+    timer: asyncio.TimerHandle | None = None
+    # The latest deadline among the batch's requests
+    shared_deadline: deadline.SharedDeadline = field(default_factory=deadline.SharedDeadline)
+
+
+class BatchingEmbeddingsProvider(EmbeddingsProvider):
+    """
+    Cross-request micro-batching in front of another EmbeddingsProvider.
+
+    Concurrent requests for the same model are collected for up to `window_ms`
+    (or until `max_batch_size` inputs / `max_batch_tokens` estimated tokens),
+    sent upstream as one call, and the vectors are fanned back out to each waiter.
+
+    Error handling is per waiter:
+    - an upstream capacity failure (timeout, rate limit, 5xx) is delivered to every waiter
+    - any other failure of a multi-request batch is retried per waiter,
+      so one bad input does not fail unrelated requests
+    - cancelled waiters are skipped; the shared call continues for the others
+    """
+
+    def __init__(self, inner: EmbeddingsProvider, window_ms: float = 5.0, max_batch_size: int = 256, max_batch_tokens: int = 100_000) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.window_s = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        self._batches: dict[str, _Batch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        self.upstream_calls = 0
+        self.batched_requests = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"upstream_calls": self.upstream_calls, "batched_requests": self.batched_requests}
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        # Requests that already fill a batch gain nothing from waiting
+        if len(inputs) >= self.max_batch_size:
+            self.upstream_calls += 1
+            return await self.inner.embed(inputs=inputs, model=model)
+
+        tokens = sum(estimate_tokens(t) for t in inputs)
+
+        batch = self._batches.get(model)
+        if batch is not None and (
+            batch.size + len(inputs) > self.max_batch_size or batch.tokens + tokens > self.max_batch_tokens
+        ):
+            self._flush(model)
+            batch = None
+
+        if batch is None:
+            batch = _Batch()
+            batch.timer = asyncio.get_running_loop().call_later(self.window_s, self._flush, model)
+            self._batches[model] = batch
+
+        waiter = _Waiter(inputs=inputs, future=asyncio.get_running_loop().create_future())
+        batch.waiters.append(waiter)
+        batch.shared_deadline.join()
+        batch.size += len(inputs)
+        batch.tokens += tokens
+        self.batched_requests += 1
+
+        if batch.size >= self.max_batch_size or batch.tokens >= self.max_batch_tokens:
+            self._flush(model)
+
+        return await waiter.future
+
+    def _flush(self, model: str) -> None:
+        batch = self._batches.pop(model, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        # The batch serves several requests: it runs until the latest of their deadlines
+        task = asyncio.get_running_loop().create_task(self._run(batch.waiters, model), context=deadline.shared(batch.shared_deadline))
+        # Keep a strong reference until done (the loop only holds weak ones)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, waiters: list[_Waiter], model: str) -> None:
+        waiters = [w for w in waiters if not w.future.done()]
+        if not waiters:
+            return
+
+        texts = [t for w in waiters for t in w.inputs]
+        self.upstream_calls += 1
+        try:
+            result = await self.inner.embed(inputs=texts, model=model)
+            vectors = result.get("embeddings", [])
+            if len(vectors) != len(texts):
+                raise BadUpstreamResponse("Malformed upstream response: embeddings count mismatch")
+        except asyncio.CancelledError:
+            for w in waiters:
+                w.future.cancel()
+            raise
+        except Exception as e:
+            if len(waiters) > 1 and not isinstance(e, _UPSTREAM_CAPACITY_ERRORS):
+                logger.warning("batched embeddings call failed; retrying per request", extra={"fields": {"model": model, "requests": len(waiters)}})
+                await asyncio.gather(*(self._run([w], model) for w in waiters))
+                return
+            for w in waiters:
+                if not w.future.done():
+                    w.future.set_exception(e)
+            return
+
+        total_tokens = (result.get("usage") or {}).get("total_tokens")
+        total_chars = sum(len(t) for t in texts) or 1
+
+        offset = 0
+        for w in waiters:
+            n = len(w.inputs)
+            if not w.future.done():
+                w.future.set_result({
+                    "embeddings": vectors[offset:offset + n],
+                    "model": result.get("model", model),
+                    "usage": {"total_tokens": self._share(total_tokens, w.inputs, total_chars, len(waiters))},
+                })
+            offset += n
+
+    @staticmethod
+    def _share(total_tokens: int | None, inputs: list[str], total_chars: int, n_waiters: int) -> int | None:
+        # Upstream bills the batch as a whole; apportion by input length
+        if total_tokens is None or n_waiters == 1:
+            return total_tokens
+        return round(total_tokens * sum(len(t) for t in inputs) / total_chars)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.core.cache import EmbeddingCache
+from app.core.errors import BadUpstreamResponse
+from app.core.vectors import Vector, to_f32
+from app.providers.embeddings_base import EmbeddingsProvider
+
+
+class CachingEmbeddingsProvider(EmbeddingsProvider):
+    """
+    Per-text embedding cache in front of another EmbeddingsProvider.
+
+    - cache hits are served locally
+    - only the misses (deduplicated) go upstream, in a single call
+    - vectors are reassembled in the caller's original order
+    - usage reflects what was actually billed upstream (0 tokens on a full hit)
+    """
+
+    def __init__(self, inner: EmbeddingsProvider, cache: EmbeddingCache) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.cache = cache
+
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.size_bytes,
+        }
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        vectors: list[Vector | None] = [None] * len(inputs)
+
+        # key -> positions in `inputs` waiting for that text
+        missing: dict[tuple[str, bytes], list[int]] = {}
+        miss_texts: list[str] = []
+
+        for i, text in enumerate(inputs):
+            key = self.cache.key(model, text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                vectors[i] = cached
+                continue
+
+            self.misses += 1
+            positions = missing.get(key)
+            if positions is None:
+                missing[key] = [i]
+                miss_texts.append(text)
+            else:
+                positions.append(i)
+
+        if not missing:
+            return {"embeddings": vectors, "model": model, "usage": {"total_tokens": 0}}
+
+        result = await self.inner.embed(inputs=miss_texts, model=model)
+        fresh = result.get("embeddings", [])
+        if len(fresh) != len(miss_texts):
+            raise BadUpstreamResponse("Malformed upstream response: embeddings count mismatch")
+
+        for (key, positions), vector in zip(missing.items(), fresh, strict=True):
+            self.cache.put(key, to_f32(vector))
+            for i in positions:
+                vectors[i] = vector
+
+        return {
+            "embeddings": vectors,
+            "model": result.get("model", model),
+            "usage": result.get("usage"),
+        }
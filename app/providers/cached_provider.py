@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.cache import CacheBackend
+from app.core.hashing import chat_request_key
+from app.providers.base import ChatProvider
+from app.schemas.chat import ChatMessage
+
+
+class CachingChatProvider(ChatProvider):
+    """
+    Exact-match response cache in front of another ChatProvider.
+
+    Why:
+    - identical prompts at temperature=0 are billed once, then served locally
+    - sampling requests (temperature > 0) bypass the cache by default,
+      so callers asking for variety still get it
+    """
+
+    def __init__(self, inner: ChatProvider, backend: CacheBackend, deterministic_only: bool = True) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.backend = backend
+        self.deterministic_only = deterministic_only
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+    def _key(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> str | None:
+        if self.deterministic_only and temperature != 0:
+            self.bypassed += 1
+            return None
+        return chat_request_key(messages, model, temperature, max_output_tokens)
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        key = self._key(messages, model, temperature, max_output_tokens)
+        if key is None:
+            return await self.inner.generate(messages, model, temperature, max_output_tokens)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return {**cached, "cached": True}
+
+        self.misses += 1
+        result = await self.inner.generate(messages, model, temperature, max_output_tokens)
+        await self.backend.set(key, {
+            "text": result.get("text", ""),
+            "model": result.get("model", model),
+            "usage": result.get("usage"),
+        })
+        return result
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        key = self._key(messages, model, temperature, max_output_tokens)
+        if key is None:
+            async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+                yield chunk
+            return
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            yield {**cached, "cached": True}
+            return
+
+        self.misses += 1
+        parts: list[str] = []
+        final: dict[str, Any] = {"model": model, "usage": None}
+        async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+            parts.append(str(chunk.get("text") or ""))
+            if chunk.get("model"):
+                final["model"] = chunk["model"]
+            if chunk.get("usage") is not None:
+                final["usage"] = chunk["usage"]
+            yield chunk
+
+        # Only completed streams are cached; an abandoned one never reaches this line
+        await self.backend.set(key, {"text": "".join(parts), **final})
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.hashing import chat_request_key, embeddings_request_key
+from app.core.singleflight import SingleFlight
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+
+class CoalescingChatProvider(ChatProvider):
+    """
+    Single-flight for chat: identical generate() calls in flight at the same
+    time share one upstream call (see SingleFlight).
+
+    Keyed on the canonical request hash, so it also covers sampling requests
+    (temperature > 0) that the response cache bypasses; concurrent identical
+    sampled requests get the same sample. Streams pass through untouched.
+    """
+
+    def __init__(self, inner: ChatProvider) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.flight: SingleFlight[dict[str, Any]] = SingleFlight()
+
+    def stats(self) -> dict[str, int]:
+        return self.flight.stats()
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        key = chat_request_key(messages, model, temperature, max_output_tokens)
+        result = await self.flight.do(key, lambda: self.inner.generate(messages, model, temperature, max_output_tokens))
+        # Each waiter gets its own dict; layers above may add keys (e.g. "cached")
+        return dict(result)
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+            yield chunk
+
+
+class CoalescingEmbeddingsProvider(EmbeddingsProvider):
+    """Single-flight for embeddings: identical concurrent embed() calls share one upstream call."""
+
+    def __init__(self, inner: EmbeddingsProvider) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.flight: SingleFlight[dict[str, Any]] = SingleFlight()
+
+    def stats(self) -> dict[str, int]:
+        return self.flight.stats()
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        key = embeddings_request_key(inputs, model)
+        result = await self.flight.do(key, lambda: self.inner.embed(inputs=inputs, model=model))
+        return {**result, "embeddings": list(result.get("embeddings", []))}
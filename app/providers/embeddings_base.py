@@ -12,12 +12,18 @@ class EmbeddingsProvider(ABC):
     - keeps service layer vendor-agnostic
     """
 
+    # Short identifier for monitoring and per-upstream state (e.g. "openai")
+    name: str = "unknown"
+
+    # Base URL of the remote API, for vendor providers on the shared HTTP client (prewarmed at startup)
+    upstream_url: str | None = None
+
     @abstractmethod
     async def embed(self, inputs: list[str], model: str) -> dict:
         """
         Must return dict like:
         {
-          "embeddings": List[List[float]],
+          "embeddings": List[List[float]] | List[array("f")],  # float32 arrays skip per-float objects
           "model": str,
           "usage": {"total_tokens": int | None} | None
         }
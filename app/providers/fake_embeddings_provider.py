@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from app.providers.embeddings_base import EmbeddingsProvider
 
 
@@ -8,9 +10,18 @@ class FakeEmbeddingsProvider(EmbeddingsProvider):
     Deterministic fake embeddings provider for tests.
 
     Returns a fixed-size vector per input (no external calls).
+    `latency_s` simulates upstream round-trip time for benchmarks.
     """
 
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+
     async def embed(self, inputs: list[str], model: str) -> dict:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
         embeddings: list[list[float]] = []
         for s in inputs:
             n = float(len(s))
@@ -20,4 +31,4 @@ class FakeEmbeddingsProvider(EmbeddingsProvider):
             "embeddings": embeddings,
             "model": model,
             "usage": {"total_tokens": None},
-        }
\ No newline at end of file
+        }
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator
+
+from app.core.tokens import default_counter
 from app.providers.base import ChatProvider
 from app.schemas.chat import ChatMessage
 
@@ -12,18 +16,50 @@ class FakeChatProvider(ChatProvider):
     - keeps tests offline and fast
     - avoids API key dependency in CI
     - allows strict TDD flow before integrating a real vendor SDK
+
+    `latency_s` simulates upstream generation time for load tests.
+    Usage is filled in from the local token counter, like a real provider's billing.
     """
 
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+
     async def generate(self, messages: list[ChatMessage], model: str, temperature:float, max_output_tokens: int) -> dict:
-        last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
-        text = f"echo: {last_user}" if last_user else "echo:"
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+        text = self._echo(messages)
 
         return {
             "text": text,
             "model": model,
-            "usage": {
-                "input_tokens": None,
-                "output_tokens": None,
-                "total_tokens": None,
-            }
-        }
\ No newline at end of file
+            "usage": self._usage(messages, model, text),
+        }
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict]:
+        # One chunk per word (keeping separators) so clients see several frames
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+        words = self._echo(messages).split(" ")
+        for i, word in enumerate(words):
+            yield {"text": word if i == 0 else f" {word}"}
+
+        yield {
+            "text": "",
+            "model": model,
+            "usage": self._usage(messages, model, " ".join(words)),
+        }
+
+    @staticmethod
+    def _usage(messages: list[ChatMessage], model: str, text: str) -> dict[str, int]:
+        prompt = default_counter.count_chat(messages, model)
+        completion = default_counter.count(text, model)
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    @staticmethod
+    def _echo(messages: list[ChatMessage]) -> str:
+        last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        return f"echo: {last_user}" if last_user else "echo:"
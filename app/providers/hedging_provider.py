@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.providers.base import ChatProvider
+from app.schemas.chat import ChatMessage
+
+
+class _LatencyWindow:
+    """Most recent successful latencies for one model; percentile over that window."""
+
+    def __init__(self, size: int) -> None:
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, latency_s: float) -> None:
+        self.samples.append(latency_s)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgingChatProvider(ChatProvider):
+    """
+    Hedged `generate` calls to cut the latency tail.
+
+    - if the first call hasn't returned by the model's observed p95 (configurable),
+      a duplicate is sent; the first success wins and the other call is cancelled
+    - hedges are budgeted: each request earns `max_hedge_ratio` of a hedge, so
+      duplicates never exceed that share of traffic (small burst allowed)
+    - no hedging until `min_samples` latencies are known for the model
+    - streams are passed through: once tokens reach the client a duplicate can't help
+
+    With a routing provider underneath, the duplicate usually lands on another
+    backend, since the pool penalises the one already holding the slow call.
+    """
+
+    def __init__(
+        self,
+        inner: ChatProvider,
+        percentile: float = 0.95,
+        max_hedge_ratio: float = 0.05,
+        min_samples: int = 20,
+        window_size: int = 200,
+        max_burst: float = 10.0,
+    ) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_burst = max_burst
+
+        self._windows: dict[str, _LatencyWindow] = {}
+        self._credit = 0.0
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.budget_exhausted,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "thresholds_ms": {
+                model: round(self._threshold(model) * 1000.0, 2)
+                for model in self._windows
+                if len(self._windows[model].samples) >= self.min_samples
+            },
+        }
+
+    def _threshold(self, model: str) -> float:
+        return self._windows[model].percentile(self.percentile)
+
+    def _window(self, model: str) -> _LatencyWindow:
+        window = self._windows.get(model)
+        if window is None:
+            window = _LatencyWindow(self.window_size)
+            self._windows[model] = window
+        return window
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        window = self._window(model)
+        threshold = self._threshold(model) if len(window.samples) >= self.min_samples else None
+
+        self.requests += 1
+        self._credit = min(self.max_burst, self._credit + self.max_hedge_ratio)
+
+        start = time.perf_counter()
+        primary = asyncio.create_task(self.inner.generate(messages, model, temperature, max_output_tokens))
+        pending = {primary}
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(pending, timeout=threshold)
+                if not done:
+                    if self._credit >= 1.0:
+                        self._credit -= 1.0
+                        self.hedges += 1
+                        pending.add(asyncio.create_task(self.inner.generate(messages, model, temperature, max_output_tokens)))
+                    else:
+                        self.budget_exhausted += 1
+
+            # First success wins; a failure only counts once no other call is left
+            errors: list[BaseException] = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        # Lower bound of the primary's latency when the hedge won: keeps the tail visible
+                        window.add(time.perf_counter() - start)
+                        return task.result()
+                    # Report the primary's failure in preference to the hedge's
+                    errors.insert(0 if task is primary else len(errors), error)
+
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+            yield chunk
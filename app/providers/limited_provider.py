@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.concurrency import ConcurrencyLimiterRegistry
+from app.core.errors import UpstreamRateLimited, UpstreamTimeout, UpstreamUnavailable
+from app.core.rate_limit import ModelRateLimiter, RateLimiterRegistry
+from app.core.tokens import TokenCounter, estimate_chat_tokens, estimate_tokens
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+# Upstream failures that mean "slow down", as opposed to a bad request
+_OVERLOAD_ERRORS = (UpstreamTimeout, UpstreamRateLimited, UpstreamUnavailable)
+
+
+class ConcurrencyLimitedChatProvider(ChatProvider):
+    """
+    Bounds in-flight calls per (provider, model) with an adaptive limiter.
+
+    Streams hold their slot until the stream ends; the limiter learns from
+    time-to-first-chunk, since total stream time mostly reflects output length.
+    """
+
+    def __init__(self, inner: ChatProvider, limiters: ConcurrencyLimiterRegistry) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.limiters = limiters
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        limiter = self.limiters.get(self.name, model)
+        await limiter.acquire()
+
+        start = time.perf_counter()
+        try:
+            result = await self.inner.generate(messages, model, temperature, max_output_tokens)
+        except _OVERLOAD_ERRORS:
+            limiter.release(None, overloaded=True)
+            raise
+        except BaseException:
+            limiter.release(None)
+            raise
+
+        limiter.release(time.perf_counter() - start)
+        return result
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        limiter = self.limiters.get(self.name, model)
+        await limiter.acquire()
+
+        start = time.perf_counter()
+        first_chunk_s: float | None = None
+        try:
+            async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+                if first_chunk_s is None:
+                    first_chunk_s = time.perf_counter() - start
+                yield chunk
+        except _OVERLOAD_ERRORS:
+            limiter.release(None, overloaded=True)
+            raise
+        except BaseException:
+            limiter.release(None)
+            raise
+
+        limiter.release(first_chunk_s if first_chunk_s is not None else time.perf_counter() - start)
+
+
+class ConcurrencyLimitedEmbeddingsProvider(EmbeddingsProvider):
+    """Embeddings counterpart of ConcurrencyLimitedChatProvider."""
+
+    def __init__(self, inner: EmbeddingsProvider, limiters: ConcurrencyLimiterRegistry) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.limiters = limiters
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        limiter = self.limiters.get(self.name, model)
+        await limiter.acquire()
+
+        start = time.perf_counter()
+        try:
+            result = await self.inner.embed(inputs=inputs, model=model)
+        except _OVERLOAD_ERRORS:
+            limiter.release(None, overloaded=True)
+            raise
+        except BaseException:
+            limiter.release(None)
+            raise
+
+        limiter.release(time.perf_counter() - start)
+        return result
+
+
+def _total_tokens(result: dict[str, Any]) -> int | None:
+    usage = result.get("usage")
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return None
+
+
+class RateLimitedChatProvider(ChatProvider):
+    """
+    Client-side RPM/TPM quota per (provider, model), enforced before the call.
+
+    - reserves 1 request + estimated tokens (counted prompt + max_output_tokens)
+    - corrects the reservation from the real usage afterwards
+    - adopts quotas advertised by the provider's x-ratelimit-* headers
+    - an upstream 429 drains the local buckets so followers queue instead of hammering
+    """
+
+    def __init__(self, inner: ChatProvider, limiters: RateLimiterRegistry, tokens: TokenCounter | None = None) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.limiters = limiters
+        # The service's counter, so prompts it already counted are memo hits here
+        self.tokens = tokens
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        limiter = self.limiters.get(self.name, model)
+        estimate = estimate_chat_tokens(messages, model, max_output_tokens, self.tokens)
+        await limiter.acquire(estimate)
+
+        try:
+            result = await self.inner.generate(messages, model, temperature, max_output_tokens)
+        except UpstreamRateLimited:
+            limiter.on_upstream_rate_limited()
+            raise
+
+        self._learn(limiter, estimate, result)
+        return result
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        limiter = self.limiters.get(self.name, model)
+        estimate = estimate_chat_tokens(messages, model, max_output_tokens, self.tokens)
+        await limiter.acquire(estimate)
+
+        try:
+            async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+                self._learn(limiter, estimate, chunk)
+                yield chunk
+        except UpstreamRateLimited:
+            limiter.on_upstream_rate_limited()
+            raise
+
+    @staticmethod
+    def _learn(limiter: ModelRateLimiter, estimate: int, result: dict[str, Any]) -> None:
+        rate_limits = result.get("rate_limits")
+        if isinstance(rate_limits, dict):
+            limiter.update_from_headers(rate_limits)
+        limiter.reconcile(estimate, _total_tokens(result))
+
+
+class RateLimitedEmbeddingsProvider(EmbeddingsProvider):
+    """Embeddings counterpart of RateLimitedChatProvider (one request + input tokens per call)."""
+
+    def __init__(self, inner: EmbeddingsProvider, limiters: RateLimiterRegistry) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.limiters = limiters
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        limiter = self.limiters.get(self.name, model)
+        estimate = sum(estimate_tokens(t) for t in inputs)
+        await limiter.acquire(estimate)
+
+        try:
+            result = await self.inner.embed(inputs=inputs, model=model)
+        except UpstreamRateLimited:
+            limiter.on_upstream_rate_limited()
+            raise
+
+        rate_limits = result.get("rate_limits")
+        if isinstance(rate_limits, dict):
+            limiter.update_from_headers(rate_limits)
+        limiter.reconcile(estimate, _total_tokens(result))
+        return result
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.metrics import GatewayMetrics
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+
+class MeteredChatProvider(ChatProvider):
+    """
+    Records provider metrics for one upstream backend, labelled with the backend's name.
+
+    Innermost layer: only real upstream calls are measured. Cache hits, coalesced
+    waiters and limiter queueing never reach it, and each retry or failover
+    attempt is one call of the backend that served it.
+    """
+
+    def __init__(self, inner: ChatProvider, metrics: GatewayMetrics, backend: str) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.metrics = metrics
+        self.backend = backend
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        with self.metrics.provider_call("chat", self.backend, model):
+            result = await self.inner.generate(messages, model, temperature, max_output_tokens)
+        self.metrics.record_tokens("chat", self.backend, model, result.get("usage"))
+        return result
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        start = time.perf_counter()
+        first_token = True
+        usage = None
+        with self.metrics.provider_call("chat_stream", self.backend, model):
+            async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+                if first_token and chunk.get("text"):
+                    first_token = False
+                    self.metrics.provider_ttft.observe(time.perf_counter() - start, (self.backend, model))
+                usage = chunk.get("usage") or usage
+                yield chunk
+        self.metrics.record_tokens("chat_stream", self.backend, model, usage)
+
+
+class MeteredEmbeddingsProvider(EmbeddingsProvider):
+    """Embeddings counterpart of MeteredChatProvider."""
+
+    def __init__(self, inner: EmbeddingsProvider, metrics: GatewayMetrics, backend: str) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.metrics = metrics
+        self.backend = backend
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        with self.metrics.provider_call("embeddings", self.backend, model):
+            result = await self.inner.embed(inputs=inputs, model=model)
+        self.metrics.record_tokens("embeddings", self.backend, model, result.get("usage"))
+        return result
@@ -0,0 +1,63 @@
+"""
+Helpers shared by the OpenAI chat and embeddings providers.
+"""
+import logging
+import math
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError, Timeout
+
+from app.core import deadline
+from app.core.errors import (
+    AppError,
+    BadUpstreamResponse,
+    DeadlineExceeded,
+    UpstreamRateLimited,
+    UpstreamTimeout,
+    UpstreamUnavailable,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_after_s(e: APIStatusError) -> float | None:
+    try:
+        raw = e.response.headers.get("retry-after")
+        return float(raw) if raw is not None else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def deadline_timeout(timeout: Timeout) -> Timeout:
+    """The client's timeout, with each phase shortened to the time left before the request deadline."""
+    if deadline.remaining_s() is None:
+        return timeout
+
+    def clamp(phase_s: float | None) -> float:
+        return deadline.clamp(phase_s if phase_s is not None else math.inf)
+
+    return Timeout(connect=clamp(timeout.connect), read=clamp(timeout.read), write=clamp(timeout.write), pool=clamp(timeout.pool))
+
+
+def map_upstream_error(e: Exception) -> AppError:
+    """
+    Translate OpenAI SDK exceptions into gateway AppErrors.
+
+    Order matters: APITimeoutError is a subclass of APIConnectionError.
+    """
+    if isinstance(e, AppError):
+        return e
+    if isinstance(e, APITimeoutError):
+        # A timeout clamped to the request deadline is the caller's limit, not a slow upstream
+        return DeadlineExceeded() if deadline.expired() else UpstreamTimeout()
+    if isinstance(e, RateLimitError):
+        return UpstreamRateLimited(retry_after_s=_retry_after_s(e))
+    if isinstance(e, APIConnectionError):
+        return UpstreamUnavailable("Upstream provider connection error")
+    if isinstance(e, APIStatusError):
+        status = getattr(e, "status_code", None)
+        if status in (500, 502, 503, 504):
+            return UpstreamUnavailable(f"Upstream provider error (status {status})")
+        return BadUpstreamResponse(f"Upstream provider error (status {status})")
+
+    logger.exception("Unexpected Error Calling OpenAI")
+    return BadUpstreamResponse("Unexpected upstream error")
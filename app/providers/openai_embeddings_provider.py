@@ -1,54 +1,70 @@
+from __future__ import annotations
+
+import base64
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, RateLimitError
+from openai import AsyncOpenAI
 
 from app.core.config import settings
-from app.core.errors import (
-    BadUpstreamResponse,
-    UpstreamRateLimited,
-    UpstreamTimeout,
-    UpstreamUnavailable,
-)
+from app.core.errors import BadUpstreamResponse
+from app.core.http import upstream_timeout
+from app.core.rate_limit import parse_rate_limit_headers
+from app.core.vectors import f32_from_bytes
 from app.providers.embeddings_base import EmbeddingsProvider
+from app.providers.openai_common import deadline_timeout, map_upstream_error
+
+if TYPE_CHECKING:
+    from app.core.http import UpstreamHttpClient
 
 logger = logging.getLogger(__name__)
 
 
+def _decode(embedding: Any) -> Any:
+    # The SDK passes base64 strings through untouched when encoding_format="base64"
+    if isinstance(embedding, str):
+        return f32_from_bytes(base64.b64decode(embedding))
+    return embedding
+
+
 class OpenAIEmbeddingsProvider(EmbeddingsProvider):
-    def __init__(self) -> None:
-        if not settings.openai_api_key:
+    name = "openai"
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None, name: str = "openai", http_client: UpstreamHttpClient | None = None) -> None:
+        # Defaults come from settings; explicit values are used for multi-backend pools.
+        # http_client is the app-wide shared pool (see app.core.http); without it the SDK builds its own.
+        api_key = api_key if api_key is not None else settings.openai_api_key
+        self.name = name
+
+        if not api_key:
             logger.warning("OPENAI_API_KEY is not set; OpenAIEmbeddingsProvider will fail if called.")
 
+        self.timeout = upstream_timeout(settings.http_connect_timeout_s, settings.http_read_timeout_s, settings.http_pool_timeout_s)
         self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            timeout=settings.openai_timeout_s,
-            max_retries=settings.openai_max_retries,
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.timeout,
+            # Retries are the gateway's (app.core.retry): deadline-aware and budgeted
+            max_retries=0,
+            http_client=http_client,
         )
+        self.upstream_url = str(self.client.base_url)
 
     async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
         try:
-            resp = await self.client.embeddings.create(
+            # base64 keeps vectors as raw float32 bytes end to end (no per-float Python objects)
+            raw = await self.client.embeddings.with_raw_response.create(
                 model=model,
                 input=inputs,
+                encoding_format="base64",
+                timeout=deadline_timeout(self.timeout),
             )
-        except APITimeoutError as e:
-            raise UpstreamTimeout() from e
-        except RateLimitError as e:
-            raise UpstreamRateLimited() from e
-        except APIConnectionError as e:
-            raise UpstreamUnavailable("Upstream provider connection error") from e
-        except APIStatusError as e:
-            status = getattr(e, "status_code", None)
-            if status in (500, 502, 503, 504):
-                raise UpstreamUnavailable(f"Upstream provider error (status {status})") from e
-            raise BadUpstreamResponse(f"Upstream provider error (status {status})") from e
+            resp = raw.parse()
         except Exception as e:
-            logger.exception("Unexpected error calling OpenAI embeddings")
-            raise BadUpstreamResponse("Unexpected upstream error") from e
+            raise map_upstream_error(e) from e
 
         try:
-            vectors = [d.embedding for d in resp.data]
+            vectors = [_decode(d.embedding) for d in resp.data]
         except Exception as e:
             raise BadUpstreamResponse("Malformed upstream response: missing embeddings") from e
 
@@ -60,4 +76,5 @@ class OpenAIEmbeddingsProvider(EmbeddingsProvider):
             "embeddings": vectors,
             "model": model,
             "usage": usage,
+            "rate_limits": parse_rate_limit_headers(raw.headers),
         }
\ No newline at end of file
@@ -1,40 +1,67 @@
+from __future__ import annotations
+
 import logging
-from typing import Any
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING, Any
 
-from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, RateLimitError
+from openai import AsyncOpenAI
 
 from app.core.config import settings
-from app.core.errors import (
-    BadUpstreamResponse,
-    UpstreamRateLimited,
-    UpstreamTimeout,
-    UpstreamUnavailable,
-)
+from app.core.errors import BadUpstreamResponse
+from app.core.http import upstream_timeout
+from app.core.rate_limit import parse_rate_limit_headers
 from app.providers.base import ChatProvider
+from app.providers.openai_common import deadline_timeout, map_upstream_error
 from app.schemas.chat import ChatMessage
 
+if TYPE_CHECKING:
+    from app.core.http import UpstreamHttpClient
+
 logger = logging.getLogger(__name__)
 
 
+def _usage_dict(usage: Any) -> dict[str, Any] | None:
+    if not usage:
+        return None
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", None),
+        "output_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+    }
+
+
 class OpenAIChatProvider(ChatProvider):
     """
     OpenAI implementation of ChatProvider.
 
     Design goals (production signal):
     - single client reused (connection pooling via httpx under the hood)
-    - timeout + retries configured via env (12-factor)
+    - timeouts configured via env (12-factor), clamped to the request deadline;
+      retries are left to the gateway (app.core.retry)
     - returns a stable dict shape consumed by ChatService
     """
 
-    def __init__(self) -> None:
-        if not settings.openai_api_key:
+    name = "openai"
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None, name: str = "openai", http_client: UpstreamHttpClient | None = None) -> None:
+        # Defaults come from settings; explicit values are used for multi-backend pools.
+        # http_client is the app-wide shared pool (see app.core.http); without it the SDK builds its own.
+        api_key = api_key if api_key is not None else settings.openai_api_key
+        self.name = name
+
+        if not api_key:
             logger.warning("OPENAI_API_KEY is not set; OpenAIChatProvider will fail if called.")
 
+        self.timeout = upstream_timeout(settings.http_connect_timeout_s, settings.http_read_timeout_s, settings.http_pool_timeout_s)
         self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            timeout=settings.openai_timeout_s,
-            max_retries=settings.openai_max_retries,
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.timeout,
+            # Retries are the gateway's (app.core.retry): deadline-aware and budgeted
+            max_retries=0,
+            http_client=http_client,
         )
+        self.upstream_url = str(self.client.base_url)
 
     async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
         # Convert Pydantic models -> OpenAI message dicts
@@ -42,42 +69,63 @@ class OpenAIChatProvider(ChatProvider):
 
         # Chat Completions API (supported long-term by OpenAI Python SDK)
         try:
-            resp = await self.client.chat.completions.create(
+            # Raw response exposes the x-ratelimit-* quota headers
+            raw = await self.client.chat.completions.with_raw_response.create(
                 model=model,
                 messages=oai_messages, # type: ignore[arg-type]
                 temperature=temperature,
                 max_tokens=max_output_tokens,
+                timeout=deadline_timeout(self.timeout),
             )
-        except APITimeoutError as e:
-            raise UpstreamTimeout() from e
-        except RateLimitError as e:
-            raise UpstreamRateLimited() from e
-        except APIConnectionError as e:
-            raise UpstreamUnavailable("Upstream provider connection error") from e
-        except APIStatusError as e:
-            status = getattr(e, "status_code", None)
-            if status in (500, 502, 503, 504):
-                raise UpstreamUnavailable(f"Upstream provider error (status {status})") from e
-            raise BadUpstreamResponse(f"Upstream provider error (status {status})") from e
+            resp = raw.parse()
         except Exception as e:
-            logger.exception("Unexpected Error Calling OpenAI")
-            raise BadUpstreamResponse("Unexpected upstream error") from e
+            raise map_upstream_error(e) from e
 
         try:
             text = resp.choices[0].message.content or ""
         except Exception as e:
             raise BadUpstreamResponse("Malformed upstream response: missing text") from e
 
-        usage = None
-        if resp.usage:
-            usage = {
-                "input_tokens": getattr(resp.usage, "prompt_tokens", None),
-                "output_tokens": getattr(resp.usage, "completion_tokens", None),
-                "total_tokens": getattr(resp.usage, "total_tokens", None),
-            }
-
         return {
             "text": text,
             "model": model,
-            "usage": usage,
-        }
\ No newline at end of file
+            "usage": _usage_dict(resp.usage),
+            "rate_limits": parse_rate_limit_headers(raw.headers),
+        }
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        oai_messages: list[dict[str, Any]] = [{"role": m.role, "content": m.content} for m in messages]
+
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(  # type: ignore[call-overload]
+                model=model,
+                messages=oai_messages,
+                temperature=temperature,
+                max_tokens=max_output_tokens,
+                timeout=deadline_timeout(self.timeout),
+                stream=True,
+                # Usage arrives on a final chunk with empty `choices`
+                stream_options={"include_usage": True},
+            )
+            resp = raw.parse()
+        except Exception as e:
+            raise map_upstream_error(e) from e
+
+        rate_limits = parse_rate_limit_headers(raw.headers)
+
+        try:
+            async for chunk in resp:
+                text = ""
+                if chunk.choices:
+                    text = chunk.choices[0].delta.content or ""
+
+                usage = _usage_dict(chunk.usage)
+                if usage is not None:
+                    yield {"text": text, "model": model, "usage": usage, "rate_limits": rate_limits}
+                elif text:
+                    yield {"text": text}
+        except Exception as e:
+            raise map_upstream_error(e) from e
+        finally:
+            # Release the upstream connection if the client went away mid-stream
+            await resp.close()
@@ -0,0 +1,60 @@
+"""
+Upstream provider kinds by name (the `kind` of a PROVIDER_BACKENDS entry).
+
+Each factory imports its provider modules when it is called, so only the kinds a
+deployment actually configures are loaded: the openai SDK alone is about half of
+the gateway's import time, and the fake backends never need it.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from app.core.config import BackendConfig
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+
+if TYPE_CHECKING:
+    from app.core.http import UpstreamHttpClient
+
+# (backend config, shared HTTP client built on first call) -> raw chat and embeddings providers
+ProviderFactory = Callable[[BackendConfig, Callable[[], "UpstreamHttpClient"]], tuple[ChatProvider, EmbeddingsProvider]]
+
+_FACTORIES: dict[str, ProviderFactory] = {}
+
+
+def register_provider(kind: str) -> Callable[[ProviderFactory], ProviderFactory]:
+    def decorator(factory: ProviderFactory) -> ProviderFactory:
+        _FACTORIES[kind] = factory
+        return factory
+    return decorator
+
+
+def create_providers(cfg: BackendConfig, http_client: Callable[[], UpstreamHttpClient]) -> tuple[ChatProvider, EmbeddingsProvider]:
+    factory = _FACTORIES.get(cfg.kind)
+    if factory is None:
+        raise ValueError(f"unknown provider kind {cfg.kind!r} (known: {', '.join(sorted(_FACTORIES))})")
+    return factory(cfg, http_client)
+
+
+@register_provider("openai")
+def _openai(cfg: BackendConfig, http_client: Callable[[], UpstreamHttpClient]) -> tuple[ChatProvider, EmbeddingsProvider]:
+    from app.providers.openai_embeddings_provider import OpenAIEmbeddingsProvider
+    from app.providers.openai_provider import OpenAIChatProvider
+
+    client = http_client()
+    return (
+        OpenAIChatProvider(api_key=cfg.api_key, base_url=cfg.base_url, name=cfg.name, http_client=client),
+        OpenAIEmbeddingsProvider(api_key=cfg.api_key, base_url=cfg.base_url, name=cfg.name, http_client=client),
+    )
+
+
+@register_provider("fake")
+def _fake(cfg: BackendConfig, http_client: Callable[[], UpstreamHttpClient]) -> tuple[ChatProvider, EmbeddingsProvider]:
+    from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+    from app.providers.fake_provider import FakeChatProvider
+
+    chat = FakeChatProvider(latency_s=cfg.latency_ms / 1000.0)
+    embeddings = FakeEmbeddingsProvider(latency_s=cfg.latency_ms / 1000.0)
+    chat.name = embeddings.name = cfg.name
+    return chat, embeddings
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.retry import Retrier
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+
+class RetryingChatProvider(ChatProvider):
+    """
+    Retries transient upstream failures with backoff, within the request deadline
+    and the global retry budget (see app.core.retry).
+
+    Streams are retried only until the first chunk: once text has reached the
+    client, a new attempt would repeat it.
+    """
+
+    def __init__(self, inner: ChatProvider, retrier: Retrier) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.retrier = retrier
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        return await self.retrier.call("chat", lambda: self.inner.generate(messages, model, temperature, max_output_tokens))
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        async def open_stream() -> tuple[AsyncIterator[dict[str, Any]], dict[str, Any] | None]:
+            it = self.inner.stream(messages, model, temperature, max_output_tokens)
+            try:
+                return it, await anext(it)
+            except StopAsyncIteration:
+                return it, None
+
+        it, first = await self.retrier.call("chat_stream", open_stream)
+        if first is None:
+            return
+        yield first
+        async for chunk in it:
+            yield chunk
+
+
+class RetryingEmbeddingsProvider(EmbeddingsProvider):
+    """Embeddings counterpart of RetryingChatProvider."""
+
+    def __init__(self, inner: EmbeddingsProvider, retrier: Retrier) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.retrier = retrier
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        return await self.retrier.call("embeddings", lambda: self.inner.embed(inputs=inputs, model=model))
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, Generic, TypeVar
+
+from app.core import deadline
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.errors import (
+    DeadlineExceeded,
+    Overloaded,
+    RateLimited,
+    UpstreamRateLimited,
+    UpstreamTimeout,
+    UpstreamUnavailable,
+)
+from app.core.retry import RetryBudget
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+# Errors that say "this backend can't serve you right now" -> try another one.
+# Overloaded / RateLimited come from the per-backend limiters, so they are backend-specific too.
+FAILOVER_ERRORS = (UpstreamTimeout, UpstreamUnavailable, UpstreamRateLimited, Overloaded, RateLimited)
+# The gateway's own load shedding: fail over, but it says nothing about the backend's health
+LOCAL_SHEDDING_ERRORS = (Overloaded, RateLimited)
+
+P = TypeVar("P")
+T = TypeVar("T")
+
+
+class Backend(Generic[P]):
+    """
+    One upstream (deployment / key / region) plus the stats used to pick it.
+
+    EWMA latency and error rate react within ~10 calls (alpha=0.1 / 0.2) while
+    smoothing out single outliers.
+    """
+
+    def __init__(self, name: str, provider: P, breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.provider = provider
+        self.breaker = breaker
+
+        self.ewma_latency_s: float | None = None
+        self.ewma_error = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    def score(self) -> float:
+        # Lower is better: expected latency, inflated by queueing and recent errors.
+        # Unmeasured backends score 0 so they get explored first.
+        latency = self.ewma_latency_s if self.ewma_latency_s is not None else 0.0
+        return latency * (1 + self.in_flight) / max(0.05, 1.0 - self.ewma_error)
+
+    def record(self, latency_s: float | None, failed: bool) -> None:
+        if latency_s is not None:
+            self.ewma_latency_s = latency_s if self.ewma_latency_s is None else 0.9 * self.ewma_latency_s + 0.1 * latency_s
+        self.ewma_error = 0.8 * self.ewma_error + (0.2 if failed else 0.0)
+
+        if failed:
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "ewma_latency_ms": round(self.ewma_latency_s * 1000.0, 2) if self.ewma_latency_s is not None else None,
+            "error_rate": round(self.ewma_error, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            **self.breaker.snapshot(),
+        }
+
+
+class BackendPool(Generic[P]):
+    """
+    Power-of-two-choices selection with circuit breaking and failover.
+
+    Each attempt samples two healthy backends not yet tried and uses the one
+    with the lower score; a FAILOVER_ERRORS failure moves on to the next pick.
+    Other errors (bad request, malformed response) are returned to the caller as-is.
+    A failover is a retry: it needs time left before the request deadline and
+    credit in the retry budget, if one is given.
+    """
+
+    def __init__(self, backends: list[Backend[P]], rng: random.Random | None = None, retry_budget: RetryBudget | None = None) -> None:
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.backends = backends
+        self._rng = rng or random.Random()
+        self.retry_budget = retry_budget
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {b.name: b.snapshot() for b in self.backends}
+
+    def pick(self, exclude: set[str]) -> Backend[P] | None:
+        candidates = [b for b in self.backends if b.name not in exclude and b.breaker.available()]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            chosen = candidates[0]
+        else:
+            a, b = self._rng.sample(candidates, 2)
+            chosen = a if a.score() <= b.score() else b
+        return chosen if chosen.breaker.allow() else None
+
+    async def call(self, fn: Callable[[P], Awaitable[T]]) -> T:
+        tried: set[str] = set()
+        last_error: Exception | None = None
+
+        while len(tried) < len(self.backends):
+            if last_error is not None and (deadline.expired() or (self.retry_budget is not None and not self.retry_budget.try_spend())):
+                break
+            backend = self.pick(tried)
+            if backend is None:
+                break
+            tried.add(backend.name)
+
+            backend.in_flight += 1
+            backend.requests += 1
+            start = time.perf_counter()
+            try:
+                result = await fn(backend.provider)
+            except LOCAL_SHEDDING_ERRORS as e:
+                backend.breaker.abandon()
+                last_error = e
+                continue
+            except FAILOVER_ERRORS as e:
+                backend.record(None, failed=True)
+                last_error = e
+                continue
+            except DeadlineExceeded:
+                # Out of time: says nothing about the backend's health
+                backend.breaker.abandon()
+                raise
+            except Exception:
+                backend.record(None, failed=False)
+                raise
+            except BaseException:
+                backend.breaker.abandon()
+                raise
+            finally:
+                backend.in_flight -= 1
+
+            backend.record(time.perf_counter() - start, failed=False)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise UpstreamUnavailable("No healthy upstream backend available")
+
+
+class RoutingChatProvider(ChatProvider):
+    """ChatProvider over a pool of backends (see BackendPool)."""
+
+    name = "router"
+
+    def __init__(self, pool: BackendPool[ChatProvider]) -> None:
+        self.pool = pool
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        return await self.pool.call(lambda p: p.generate(messages, model, temperature, max_output_tokens))
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        # Failover is only possible until the first chunk reaches the client:
+        # the opening chunk is fetched inside the pool call, the rest is relayed as-is.
+        async def open_stream(p: ChatProvider) -> tuple[AsyncIterator[dict[str, Any]], dict[str, Any] | None]:
+            it = p.stream(messages, model, temperature, max_output_tokens)
+            try:
+                return it, await anext(it)
+            except StopAsyncIteration:
+                return it, None
+
+        it, first = await self.pool.call(open_stream)
+        if first is None:
+            return
+        yield first
+        async for chunk in it:
+            yield chunk
+
+
+class RoutingEmbeddingsProvider(EmbeddingsProvider):
+    """EmbeddingsProvider over a pool of backends (see BackendPool)."""
+
+    name = "router"
+
+    def __init__(self, pool: BackendPool[EmbeddingsProvider]) -> None:
+        self.pool = pool
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        return await self.pool.call(lambda p: p.embed(inputs=inputs, model=model))
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.hashing import chat_context_key
+from app.core.metrics import GatewayMetrics
+from app.core.semantic_index import Matrix, SemanticIndex, normalized
+from app.providers.base import ChatProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Lookup:
+    partition: str
+    vector: Matrix
+    hit: dict[str, Any] | None
+
+
+class SemanticCachingChatProvider(ChatProvider):
+    """
+    Similarity cache: a prompt that means the same as a recently answered one gets that answer.
+
+    - the final user message is embedded with `embeddings` and compared (cosine) with
+      earlier prompts for the same model, system prompt and max_output_tokens;
+      the closest one at or above `threshold` is served (`"cached": true`)
+    - only single-turn requests (system messages + one user message) are eligible:
+      further into a dialogue, the last message alone does not determine the answer
+    - sampling requests (temperature > 0) bypass it when `deterministic_only`
+    - an embedding failure is a miss, never a failed chat call
+
+    Sits inside the exact-match cache, so byte-identical repeats skip the embedding call.
+    """
+
+    def __init__(
+        self,
+        inner: ChatProvider,
+        embeddings: EmbeddingsProvider,
+        index: SemanticIndex,
+        embed_model: str,
+        threshold: float = 0.92,
+        deterministic_only: bool = True,
+        metrics: GatewayMetrics | None = None,
+        window_size: int = 1000,
+    ) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.embeddings = embeddings
+        self.index = index
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.deterministic_only = deterministic_only
+        self.metrics = metrics
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+        self._lookup_s: deque[float] = deque(maxlen=window_size)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        ordered = sorted(self._lookup_s)
+
+        def percentile_ms(q: float) -> float | None:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0, 3) if ordered else None
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "lookup_ms_p50": percentile_ms(0.5),
+            "lookup_ms_p99": percentile_ms(0.99),
+            "index": self.index.stats(),
+        }
+
+    def _record(self, model: str, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.semantic_cache_lookups.inc((model, result))
+
+    async def _lookup(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> _Lookup | None:
+        """None when the request is not eligible or its prompt could not be embedded."""
+        users = [m for m in messages if m.role == "user"]
+        if (self.deterministic_only and temperature != 0) or len(users) != 1 or messages[-1].role != "user":
+            self.bypassed += 1
+            self._record(model, "bypassed")
+            return None
+
+        start = time.perf_counter()
+        try:
+            result = await self.embeddings.embed([users[0].content], self.embed_model)
+            vector = normalized(result["embeddings"][0])
+        except Exception:
+            logger.warning("semantic cache embedding failed", exc_info=True, extra={"fields": {"model": self.embed_model}})
+            self.errors += 1
+            self._record(model, "error")
+            return None
+        embedded = time.perf_counter()
+        if vector is None:
+            self.errors += 1
+            self._record(model, "error")
+            return None
+
+        partition = chat_context_key([m.content for m in messages if m.role == "system"], model, max_output_tokens)
+        found = self.index.search(partition, vector, self.threshold)
+        done = time.perf_counter()
+
+        self._lookup_s.append(done - start)
+        if self.metrics is not None:
+            self.metrics.semantic_cache_latency.observe(embedded - start, ("embed",))
+            self.metrics.semantic_cache_latency.observe(done - embedded, ("search",))
+
+        if found is None:
+            self.misses += 1
+            self._record(model, "miss")
+            return _Lookup(partition, vector, None)
+
+        self.hits += 1
+        self._record(model, "hit")
+        return _Lookup(partition, vector, {**found[0], "cached": True})
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict[str, Any]:
+        lookup = await self._lookup(messages, model, temperature, max_output_tokens)
+        if lookup is not None and lookup.hit is not None:
+            return lookup.hit
+
+        result = await self.inner.generate(messages, model, temperature, max_output_tokens)
+        if lookup is not None:
+            self.index.add(lookup.partition, lookup.vector, {
+                "text": result.get("text", ""),
+                "model": result.get("model", model),
+                "usage": result.get("usage"),
+            })
+        return result
+
+    async def stream(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> AsyncIterator[dict[str, Any]]:
+        lookup = await self._lookup(messages, model, temperature, max_output_tokens)
+        if lookup is not None and lookup.hit is not None:
+            yield lookup.hit
+            return
+
+        parts: list[str] = []
+        final: dict[str, Any] = {"model": model, "usage": None}
+        async for chunk in self.inner.stream(messages, model, temperature, max_output_tokens):
+            parts.append(str(chunk.get("text") or ""))
+            if chunk.get("model"):
+                final["model"] = chunk["model"]
+            if chunk.get("usage") is not None:
+                final["usage"] = chunk["usage"]
+            yield chunk
+
+        # Only completed streams are cached; an abandoned one never reaches this line
+        if lookup is not None:
+            self.index.add(lookup.partition, lookup.vector, {"text": "".join(parts), **final})
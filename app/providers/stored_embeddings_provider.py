@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from app.core.embedding_store import EmbeddingStore
+from app.core.errors import BadUpstreamResponse
+from app.core.vectors import Vector
+from app.providers.embeddings_base import EmbeddingsProvider
+
+logger = logging.getLogger(__name__)
+
+
+class StoredEmbeddingsProvider(EmbeddingsProvider):
+    """
+    Persistent embedding store (EmbeddingStore) in front of another EmbeddingsProvider.
+
+    - stored vectors are served from the memory-mapped file, as zero-copy float32 views
+    - only the misses (deduplicated) go upstream, in a single call
+    - new vectors are queued and written by one background flush at a time, in a
+      worker thread: each flush is a single append of everything queued meanwhile
+    - a failed write is logged and dropped; the request already has its vectors
+    """
+
+    def __init__(self, inner: EmbeddingsProvider, store: EmbeddingStore) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.store = store
+
+        self._pending: list[tuple[bytes, Vector]] = []
+        self._flushing: asyncio.Task[None] | None = None
+
+        self.write_errors = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.store.stats(), "pending_writes": len(self._pending), "write_errors": self.write_errors}
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        vectors: list[Vector | None] = [None] * len(inputs)
+
+        # key -> positions in `inputs` waiting for that text
+        missing: dict[bytes, list[int]] = {}
+        miss_texts: list[str] = []
+
+        for i, text in enumerate(inputs):
+            key = self.store.key(model, text)
+            stored = self.store.get(key)
+            if stored is not None:
+                vectors[i] = stored
+                continue
+
+            positions = missing.get(key)
+            if positions is None:
+                missing[key] = [i]
+                miss_texts.append(text)
+            else:
+                positions.append(i)
+
+        if not missing:
+            return {"embeddings": vectors, "model": model, "usage": {"total_tokens": 0}}
+
+        result = await self.inner.embed(inputs=miss_texts, model=model)
+        fresh = result.get("embeddings", [])
+        if len(fresh) != len(miss_texts):
+            raise BadUpstreamResponse("Malformed upstream response: embeddings count mismatch")
+
+        for (key, positions), vector in zip(missing.items(), fresh, strict=True):
+            self._pending.append((key, vector))
+            for i in positions:
+                vectors[i] = vector
+        if self._flushing is None:
+            self._flushing = asyncio.get_running_loop().create_task(self._flush())
+
+        return {
+            "embeddings": vectors,
+            "model": result.get("model", model),
+            "usage": result.get("usage"),
+        }
+
+    async def flush(self) -> None:
+        """Wait until every queued vector is written (shutdown)."""
+        if self._flushing is not None:
+            await self._flushing
+
+    async def _flush(self) -> None:
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    await asyncio.to_thread(self.store.put_many, batch)
+                except OSError:
+                    self.write_errors += 1
+                    logger.warning("embedding store write failed", exc_info=True, extra={"fields": {"vectors": len(batch)}})
+        finally:
+            self._flushing = None
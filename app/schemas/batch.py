@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict
+
+BatchEndpoint = Literal["chat", "embeddings"]
+BatchStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+
+
+class BatchJob(BaseModel):
+    """
+    State of one /v1/batches job, polled by clients and persisted next to its files.
+
+    - lines_total is None until the whole input has been read
+    - lines_failed counts lines whose output carries an `error` (the job itself still completes)
+    - error is set only when the job as a whole failed (e.g. unreadable input)
+    """
+    id: str
+    endpoint: BatchEndpoint
+    status: BatchStatus = "queued"
+
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    lines_total: int | None = None
+    lines_done: int = 0
+    lines_succeeded: int = 0
+    lines_failed: int = 0
+
+    error: dict[str, Any] | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class BatchLineResult(BaseModel):
+    """
+    One output JSONL line: `response` (the usual ChatResponse / EmbeddingsResponse body)
+    or `error` (the usual AppError body), keyed by the 1-based input line number.
+    """
+    line: int
+    custom_id: str | None = None
+    status_code: int
+    response: dict[str, Any] | None = None
+    error: dict[str, Any] | None = None
+
+    model_config = ConfigDict(extra="forbid")
@@ -34,6 +34,9 @@ class ChatRequest(BaseModel):
 
     client_request_id: str | None = Field(default=None, max_length=200)
 
+    # When true, tokens are relayed as Server-Sent Events instead of one ChatResponse
+    stream: bool = False
+
     model_config = ConfigDict(extra="forbid")
 
 
@@ -45,6 +48,20 @@ class ChatUsage(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
 
+class ChatTrimming(BaseModel):
+    """
+    What history trimming removed to fit the model's prompt budget.
+
+    Token counts are the gateway's own (exact with tiktoken, estimated otherwise).
+    """
+    dropped_messages: int
+    truncated_messages: int
+    input_tokens_before: int
+    input_tokens_after: int
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class ChatResponse(BaseModel):
     text: str
     model: str
@@ -54,4 +71,39 @@ class ChatResponse(BaseModel):
 
     usage: ChatUsage | None = None
 
-    model_config = ConfigDict(extra="forbid")
\ No newline at end of file
+    # True when served from the gateway's response cache (no upstream call)
+    cached: bool = False
+
+    # Set when older turns were dropped or truncated before the upstream call
+    trimmed: ChatTrimming | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class ChatStreamDelta(BaseModel):
+    """
+    One SSE `data:` frame carrying newly generated text.
+    """
+    text: str
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class ChatStreamEnd(BaseModel):
+    """
+    Final SSE frame (`event: done`) of a streamed completion.
+
+    - ttft_ms: time to first token, measured from the provider call
+    - latency_ms: total generation time, same meaning as ChatResponse.latency_ms
+    """
+    model: str
+
+    latency_ms: float
+    ttft_ms: float | None = None
+    request_id: str
+
+    usage: ChatUsage | None = None
+    cached: bool = False
+    trimmed: ChatTrimming | None = None
+
+    model_config = ConfigDict(extra="forbid")
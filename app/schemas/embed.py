@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
+# float: JSON number arrays; base64: little-endian float32 per vector (OpenAI-compatible);
+# binary: application/octet-stream body holding one .npy float32 matrix
+EncodingFormat = Literal["float", "base64", "binary"]
+
 
 class EmbeddingsRequest(BaseModel):
     """
@@ -18,6 +24,7 @@ class EmbeddingsRequest(BaseModel):
 
     input: str | list[str] = Field(...)
     model: str = Field(default="text-embedding-3-small", min_length=1, max_length=100)
+    encoding_format: EncodingFormat = "float"
 
     model_config = ConfigDict(extra="forbid")
 
@@ -28,7 +35,8 @@ class EmbeddingsUsage(BaseModel):
 
 
 class EmbeddingsResponse(BaseModel):
-    embeddings: list[list[float]]
+    # list[list[float]] for encoding_format=float, list[str] (base64) for encoding_format=base64
+    embeddings: list[list[float]] | list[str]
     model: str
     latency_ms: float
     request_id: str
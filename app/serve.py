@@ -0,0 +1,88 @@
+"""
+Production entrypoint: N uvicorn worker processes behind one listening socket.
+
+    python -m app.serve --host 0.0.0.0 --port 8000 --workers 4
+
+--workers defaults to WEB_CONCURRENCY (1). With more than one worker, a state
+server process is started first and its Unix socket is handed to the workers in
+SHARED_STATE_SOCKET, so the chat response cache, RPM/TPM rate limits and
+/v1/metrics are shared by all workers instead of being per process. Per-process
+by design: the adaptive concurrency limiters, hedging and routing statistics,
+embeddings micro-batches and the embedding vector cache.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import uvicorn
+
+from app.core.cache import InMemoryCache
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.core.rate_limit import RateLimiterRegistry
+from app.core.shared_state import SharedStateServer
+
+
+def run_state_server(path: str) -> None:
+    setup_logging(static_fields={"env": settings.app_env, "role": "state"})
+    server = SharedStateServer(
+        path,
+        cache=InMemoryCache(max_entries=settings.chat_cache_max_entries, ttl_s=settings.chat_cache_ttl_s),
+        rate_limiters=RateLimiterRegistry(
+            rpm=settings.rate_limit_rpm,
+            tpm=settings.rate_limit_tpm,
+            max_wait_s=settings.rate_limit_max_wait_s,
+        ),
+    )
+    asyncio.run(server.serve_forever())
+
+
+def _wait_for_socket(path: str, timeout_s: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX) as s:
+                s.connect(path)
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"state server did not come up on {path}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.workers, help="worker processes (default: WEB_CONCURRENCY or 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.workers <= 1:
+        uvicorn.run("app.main:app", factory=True, host=args.host, port=args.port)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="gateway-") as tmp:
+        path = settings.shared_state_socket or str(Path(tmp) / "state.sock")
+        state = multiprocessing.get_context("spawn").Process(target=run_state_server, args=(path,), name="gateway-state", daemon=True)
+        state.start()
+        try:
+            _wait_for_socket(path)
+            # Workers are spawned fresh and read their settings from the environment
+            os.environ["SHARED_STATE_SOCKET"] = path
+            uvicorn.run("app.main:app", factory=True, host=args.host, port=args.port, workers=args.workers)
+        finally:
+            state.terminate()
+            state.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.core import deadline
+from app.core.errors import AppError, InvalidRequest, NotFound, PayloadTooLarge
+from app.core.logging import request_id_ctx
+from app.schemas.batch import BatchEndpoint, BatchJob, BatchLineResult
+from app.schemas.chat import ChatRequest
+from app.schemas.embed import EmbeddingsRequest
+from app.services.chat_service import ChatService
+from app.services.embed_service import EmbeddingsService
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r"batch_[0-9a-f]{16}")
+
+
+@dataclass
+class BatchCheckpoint:
+    """
+    Resume point: every input line up to `line` (ending at byte `offset`) has its result
+    in the output file. Lines after it may be done too; those are found in the output.
+    """
+    line: int = 0
+    offset: int = 0
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path: Path) -> BatchCheckpoint:
+    try:
+        return BatchCheckpoint(**json.loads(path.read_text()))
+    except FileNotFoundError:
+        return BatchCheckpoint()
+
+
+def _scan_output(path: Path, after_line: int, job: BatchJob) -> set[int]:
+    """
+    Count results already in the output and return the line numbers past the checkpoint.
+
+    A torn last line (crash mid-write) is cut off so it gets redone.
+    """
+    done: set[int] = set()
+    job.lines_done = job.lines_succeeded = job.lines_failed = 0
+    if not path.exists():
+        return done
+
+    good_bytes = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            good_bytes += len(raw)
+            record = json.loads(raw)
+            job.lines_done += 1
+            if record.get("error") is None:
+                job.lines_succeeded += 1
+            else:
+                job.lines_failed += 1
+            if record["line"] > after_line:
+                done.add(record["line"])
+
+    if good_bytes != path.stat().st_size:
+        with open(path, "r+b") as f:
+            f.truncate(good_bytes)
+    return done
+
+
+class BatchRunner:
+    """
+    Runs a JSONL file of ChatRequest / EmbeddingsRequest lines through the services.
+
+    - input is read line by line; at most `concurrency` lines are in flight, so
+      memory stays flat regardless of file size
+    - results are appended to the output JSONL as they finish (not in input order)
+    - a checkpoint (contiguous done prefix) is saved every `checkpoint_every`
+      results, after flushing the output; rerunning the same files resumes
+    - each line may be a bare request body or {"custom_id": ..., "body": {...}};
+      failures are captured per line using the AppError body shape
+    """
+
+    def __init__(self, chat_service: ChatService, embeddings_service: EmbeddingsService, concurrency: int = 8, checkpoint_every: int = 100) -> None:
+        self.chat_service = chat_service
+        self.embeddings_service = embeddings_service
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+
+    async def run(
+        self,
+        job: BatchJob,
+        input_path: Path,
+        output_path: Path,
+        checkpoint_path: Path,
+        on_progress: Callable[[], None] | None = None,
+    ) -> None:
+        checkpoint = _load_checkpoint(checkpoint_path)
+        completed = _scan_output(output_path, checkpoint.line, job)
+        # Byte offset where each not-yet-checkpointed line ends
+        line_ends: dict[int, int] = {}
+        since_checkpoint = 0
+
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task[None]] = set()
+
+        with open(input_path, "rb") as inp, open(output_path, "ab") as out:
+
+            def save_checkpoint() -> None:
+                out.flush()
+                _write_json_atomic(checkpoint_path, asdict(checkpoint))
+                if on_progress is not None:
+                    on_progress()
+
+            def finish(line_no: int, result: BatchLineResult | None) -> None:
+                nonlocal since_checkpoint
+                if result is not None:
+                    out.write(result.model_dump_json(exclude_none=True).encode("utf-8") + b"\n")
+                    job.lines_done += 1
+                    if result.error is None:
+                        job.lines_succeeded += 1
+                    else:
+                        job.lines_failed += 1
+
+                completed.add(line_no)
+                # Only over lines already read: results found in the output may lie ahead of the reader
+                while checkpoint.line + 1 in completed and checkpoint.line + 1 in line_ends:
+                    checkpoint.line += 1
+                    completed.discard(checkpoint.line)
+                    checkpoint.offset = line_ends.pop(checkpoint.line)
+
+                since_checkpoint += 1
+                if since_checkpoint >= self.checkpoint_every:
+                    since_checkpoint = 0
+                    save_checkpoint()
+
+            async def run_line(line_no: int, raw: bytes) -> None:
+                try:
+                    request_id_ctx.set(f"{job.id}-{line_no}")
+                    finish(line_no, await self._process(job.endpoint, line_no, raw))
+                finally:
+                    sem.release()
+
+            try:
+                inp.seek(checkpoint.offset)
+                line_no = checkpoint.line
+                offset = checkpoint.offset
+                for raw in inp:
+                    line_no += 1
+                    offset += len(raw)
+                    line_ends[line_no] = offset
+
+                    if line_no in completed or not raw.strip():
+                        # Done before a restart (or blank): only the watermark needs to move past it
+                        finish(line_no, None)
+                        continue
+
+                    await sem.acquire()
+                    task = asyncio.create_task(run_line(line_no, raw))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                if tasks:
+                    await asyncio.gather(*tasks)
+                job.lines_total = job.lines_done
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                save_checkpoint()
+
+    async def _process(self, endpoint: BatchEndpoint, line_no: int, raw: bytes) -> BatchLineResult:
+        custom_id: str | None = None
+        try:
+            try:
+                data = json.loads(raw)
+            except json.JSONDecodeError as e:
+                raise InvalidRequest(f"Line is not valid JSON: {e.msg}") from e
+
+            if isinstance(data, dict) and "body" in data:
+                custom_id = str(data["custom_id"]) if data.get("custom_id") is not None else None
+                data = data["body"]
+
+            response: dict[str, Any]
+            if endpoint == "chat":
+                chat_request = ChatRequest.model_validate(data)
+                if chat_request.stream:
+                    raise InvalidRequest("stream=true is not supported in batches")
+                response = (await self.chat_service.chat(chat_request)).model_dump(mode="json")
+            else:
+                embed_request = EmbeddingsRequest.model_validate(data)
+                if embed_request.encoding_format == "binary":
+                    raise InvalidRequest("encoding_format=binary is not supported in batches")
+                response = (await self.embeddings_service.embed(embed_request)).model_dump(mode="json")
+
+        except ValidationError as e:
+            error = InvalidRequest("Line does not match the request schema", details={"errors": e.errors(include_url=False, include_context=False, include_input=False)})
+            return BatchLineResult(line=line_no, custom_id=custom_id, status_code=error.status_code, error=error.to_payload()["error"])
+        except AppError as e:
+            return BatchLineResult(line=line_no, custom_id=custom_id, status_code=e.status_code, error=e.to_payload()["error"])
+        except Exception:
+            logger.exception("batch line failed", extra={"fields": {"line": line_no}})
+            internal = AppError(status_code=500, code="INTERNAL_ERROR", message="Unexpected error while processing the line")
+            return BatchLineResult(line=line_no, custom_id=custom_id, status_code=500, error=internal.to_payload()["error"])
+
+        return BatchLineResult(line=line_no, custom_id=custom_id, status_code=200, response=response)
+
+
+class BatchService:
+    """
+    /v1/batches jobs: one directory per job under `root` holding
+
+        input.jsonl  output.jsonl  checkpoint.json  job.json  lock
+
+    Jobs run as background tasks in this process. Jobs left queued/running by a
+    previous process are picked up again by resume_pending() (called at startup).
+
+    Several workers may share `root` (python -m app.serve): a job runs in the
+    worker holding the flock on its `lock` file, other workers read its state
+    from job.json, and a cancel received elsewhere is passed on as a `cancel` file.
+    """
+
+    def __init__(self, runner: BatchRunner, root: Path, max_input_bytes: int) -> None:
+        self.runner = runner
+        self.root = root
+        self.max_input_bytes = max_input_bytes
+        self._jobs: dict[str, BatchJob] = {}
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._closing = False
+
+    def _dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def _save(self, job: BatchJob) -> None:
+        _write_json_atomic(self._dir(job.id) / "job.json", job.model_dump(mode="json"))
+
+    async def create(self, endpoint: BatchEndpoint, body: AsyncIterator[bytes]) -> BatchJob:
+        job = BatchJob(id=f"batch_{uuid.uuid4().hex[:16]}", endpoint=endpoint, created_at=time.time())
+        job_dir = self._dir(job.id)
+        job_dir.mkdir(parents=True)
+
+        # Spool the upload to disk chunk by chunk; the file is never held in memory
+        size = 0
+        try:
+            with open(job_dir / "input.jsonl", "wb") as f:
+                async for chunk in body:
+                    size += len(chunk)
+                    if size > self.max_input_bytes:
+                        raise PayloadTooLarge(f"Batch input exceeds {self.max_input_bytes} bytes")
+                    f.write(chunk)
+        except BaseException:
+            for path in job_dir.iterdir():
+                path.unlink()
+            job_dir.rmdir()
+            raise
+
+        self._jobs[job.id] = job
+        self._save(job)
+        self._start(job)
+        return job
+
+    def get(self, job_id: str) -> BatchJob:
+        if job_id in self._tasks and not self._tasks[job_id].done():
+            return self._jobs[job_id]
+        # Not running here: job.json is the latest state (possibly written by another worker)
+        job = self._load(job_id) if _JOB_ID.fullmatch(job_id) else None
+        if job is None:
+            raise NotFound(f"Batch {job_id!r} not found")
+        return job
+
+    def list(self) -> list[BatchJob]:
+        jobs = [self.get(path.parent.name) for path in self.root.glob("*/job.json")] if self.root.exists() else []
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def output_path(self, job_id: str) -> Path:
+        self.get(job_id)
+        return self._dir(job_id) / "output.jsonl"
+
+    async def cancel(self, job_id: str) -> BatchJob:
+        job = self.get(job_id)
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        elif job.status in ("queued", "running"):
+            # Running in another worker: it checks for this file at each checkpoint
+            (self._dir(job_id) / "cancel").touch()
+        return job
+
+    def _load(self, job_id: str) -> BatchJob | None:
+        try:
+            job = BatchJob.model_validate_json((self._dir(job_id) / "job.json").read_text())
+        except (OSError, ValidationError):
+            return None
+        self._jobs[job_id] = job
+        return job
+
+    def resume_pending(self) -> None:
+        if not self.root.exists():
+            return
+        for job_file in self.root.glob("*/job.json"):
+            job = self._load(job_file.parent.name)
+            if job is None:
+                logger.warning("skipping unreadable batch job", extra={"fields": {"path": str(job_file)}})
+                continue
+            if job.status in ("queued", "running"):
+                self._start(job)
+
+    async def shutdown(self) -> None:
+        """Stop running jobs at a checkpoint; they stay `running` on disk and resume on next start."""
+        self._closing = True
+        tasks = [t for t in self._tasks.values() if not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, job: BatchJob) -> None:
+        # Jobs outlive the request that created them, and its deadline
+        self._tasks[job.id] = asyncio.create_task(self._run(job), context=deadline.detached())
+
+    async def _run(self, job: BatchJob) -> None:
+        job_dir = self._dir(job.id)
+        with open(job_dir / "lock", "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # another worker is running it
+
+            # It may have finished elsewhere between our read of job.json and taking the lock
+            if job.status != "queued":
+                latest = self._load(job.id)
+                if latest is None or latest.status not in ("queued", "running"):
+                    return
+                job = latest
+                logger.info("resuming batch job", extra={"fields": {"batch_id": job.id}})
+            await self._run_locked(job, job_dir)
+
+    async def _run_locked(self, job: BatchJob, job_dir: Path) -> None:
+        def on_progress() -> None:
+            self._save(job)
+            if (job_dir / "cancel").exists():
+                self._tasks[job.id].cancel()
+
+        job.status = "running"
+        job.started_at = job.started_at or time.time()
+        self._save(job)
+
+        try:
+            await self.runner.run(
+                job,
+                input_path=job_dir / "input.jsonl",
+                output_path=job_dir / "output.jsonl",
+                checkpoint_path=job_dir / "checkpoint.json",
+                on_progress=on_progress,
+            )
+        except asyncio.CancelledError:
+            # Explicit cancel -> cancelled; process shutdown -> left running for resume
+            if not self._closing:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            self._save(job)
+            raise
+        except Exception as e:
+            logger.exception("batch job failed", extra={"fields": {"batch_id": job.id}})
+            job.status = "failed"
+            job.error = {"code": "BATCH_FAILED", "message": str(e)}
+        else:
+            job.status = "completed"
+        job.finished_at = time.time()
+        self._save(job)
@@ -1,8 +1,33 @@
+import logging
 import time
+from collections.abc import AsyncIterator
 
+from app.core import deadline
+from app.core.history import HistoryTrimmer
 from app.core.logging import request_id_ctx
+from app.core.metrics import GatewayMetrics
+from app.core.tokens import TokenCounter
 from app.providers.base import ChatProvider
-from app.schemas.chat import ChatRequest, ChatResponse, ChatUsage
+from app.schemas.chat import (
+    ChatRequest,
+    ChatResponse,
+    ChatStreamDelta,
+    ChatStreamEnd,
+    ChatTrimming,
+    ChatUsage,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _usage_from(raw_usage: object) -> ChatUsage | None:
+    if not isinstance(raw_usage, dict):
+        return None
+    return ChatUsage(
+        input_tokens=raw_usage.get("input_tokens"),
+        output_tokens=raw_usage.get("output_tokens"),
+        total_tokens=raw_usage.get("total_tokens"),
+    )
 
 
 class ChatService:
@@ -10,34 +35,59 @@ class ChatService:
     Orchestrates chat requests.
 
     Responsibilities:
+    - reject requests whose deadline has passed, and bound the provider call by it
+    - trim long histories to the model's prompt budget (when a trimmer is configured)
+    - reject prompts that can't fit the model's context window (before any upstream call)
     - call provider
-    - measure provider latency (inference latency)
+    - measure request latency (inference latency; cache hits included)
     - shape provider output into a stable API response
+    - record trimmed prompt tokens (when metrics are enabled); upstream latency and
+      token usage are recorded per backend (app.providers.metered_provider)
     """
 
-    def __init__(self, provider: ChatProvider):
+    def __init__(
+        self,
+        provider: ChatProvider,
+        metrics: GatewayMetrics | None = None,
+        tokens: TokenCounter | None = None,
+        trimmer: HistoryTrimmer | None = None,
+    ):
         self.provider = provider
+        self.metrics = metrics
+        self.tokens = tokens
+        self.trimmer = trimmer
+
+    def _prepare(self, request: ChatRequest) -> tuple[ChatRequest, ChatTrimming | None]:
+        """Trim the history, then check what is left against the context window."""
+        deadline.check()
+        trimmed: ChatTrimming | None = None
+        if self.trimmer is not None:
+            messages, trimmed = self.trimmer.trim(request.messages, request.model, request.max_output_tokens)
+            if trimmed is not None:
+                request = request.model_copy(update={"messages": messages})
+                if self.metrics is not None:
+                    self.metrics.chat_trimmed_tokens.inc((request.model,), trimmed.input_tokens_before - trimmed.input_tokens_after)
+                logger.info("chat history trimmed", extra={"fields": trimmed.model_dump()})
+
+        if self.tokens is not None:
+            self.tokens.check_context(request.messages, request.model, request.max_output_tokens)
+        return request, trimmed
 
     async def chat(self, request: ChatRequest) -> ChatResponse:
+        request, trimmed = self._prepare(request)
         start = time.perf_counter()
 
-        provider_result = await self.provider.generate(
-            messages = request.messages,
-            model = request.model,
-            temperature= request.temperature,
-            max_output_tokens= request.max_output_tokens,
-        )
+        async with deadline.bounded():
+            provider_result = await self.provider.generate(
+                messages = request.messages,
+                model = request.model,
+                temperature= request.temperature,
+                max_output_tokens= request.max_output_tokens,
+            )
 
         latency_ms = (time.perf_counter() - start) * 1000.0
 
-        usage: ChatUsage | None = None
-        raw_usage = provider_result.get("usage")
-        if isinstance(raw_usage, dict):
-            usage = ChatUsage(
-                input_tokens=raw_usage.get("input_tokens"),
-                output_tokens=raw_usage.get("output_tokens"),
-                total_tokens=raw_usage.get("total_tokens"),
-            )
+        usage = _usage_from(provider_result.get("usage"))
 
         request_id = request_id_ctx.get() or "unknown"
 
@@ -47,4 +97,67 @@ class ChatService:
             latency_ms=round(latency_ms, 2),
             request_id=request_id,
             usage=usage,
-        )
\ No newline at end of file
+            cached=bool(provider_result.get("cached", False)),
+            trimmed=trimmed,
+        )
+
+    async def stream(self, request: ChatRequest) -> AsyncIterator[ChatStreamDelta | ChatStreamEnd]:
+        """
+        Relay provider chunks as deltas, then one ChatStreamEnd.
+
+        Time-to-first-token is recorded separately from total latency:
+        for streaming clients it is the latency that users actually perceive.
+        """
+        request, trimmed = self._prepare(request)
+        start = time.perf_counter()
+        ttft_ms: float | None = None
+        model = request.model
+        usage: ChatUsage | None = None
+        cached = False
+
+        # Captured up front: the generator may be resumed after the middleware resets the ContextVars
+        request_id = request_id_ctx.get() or "unknown"
+        until = deadline.current()
+
+        chunks = self.provider.stream(
+            messages=request.messages,
+            model=request.model,
+            temperature=request.temperature,
+            max_output_tokens=request.max_output_tokens,
+        )
+        while True:
+            # Each wait for a chunk is bounded, never the yield to the client
+            async with deadline.bounded(until):
+                try:
+                    chunk = await anext(chunks)
+                except StopAsyncIteration:
+                    break
+
+            text = chunk.get("text")
+            if text:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000.0
+                yield ChatStreamDelta(text=str(text))
+
+            if chunk.get("model"):
+                model = str(chunk["model"])
+            usage = _usage_from(chunk.get("usage")) or usage
+            cached = cached or bool(chunk.get("cached", False))
+
+        latency_ms = (time.perf_counter() - start) * 1000.0
+
+        logger.info("chat stream completed", extra={"fields": {
+            "model": model,
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "latency_ms": round(latency_ms, 2),
+        }})
+
+        yield ChatStreamEnd(
+            model=model,
+            latency_ms=round(latency_ms, 2),
+            ttft_ms=round(ttft_ms, 2) if ttft_ms is not None else None,
+            request_id=request_id,
+            usage=usage,
+            cached=cached,
+            trimmed=trimmed,
+        )
@@ -1,23 +1,119 @@
+import asyncio
 import time
+from dataclasses import dataclass
+from typing import Any
 
+from app.core import deadline
+from app.core.errors import BadUpstreamResponse
 from app.core.logging import request_id_ctx
+from app.core.serialization import dumps
+from app.core.tokens import estimate_tokens
+from app.core.vectors import to_base64, to_float_list, to_npy
 from app.providers.embeddings_base import EmbeddingsProvider
 from app.schemas.embed import EmbeddingsRequest, EmbeddingsResponse, EmbeddingsUsage
 
 
+def _usage_from(raw_usage: object) -> EmbeddingsUsage | None:
+    if not isinstance(raw_usage, dict):
+        return None
+    return EmbeddingsUsage(total_tokens=raw_usage.get("total_tokens"))
+
+
+@dataclass
+class EmbeddingsBinary:
+    """Result of EmbeddingsService.embed_binary(); metadata travels in response headers."""
+    body: bytes
+    model: str
+    latency_ms: float
+    request_id: str
+    usage: EmbeddingsUsage | None
+
+
 class EmbeddingsService:
     """
     Orchestrates embedding requests:
+    - rejects requests whose deadline has passed, and bounds the provider calls by it
     - normalizes input into a list[str]
+    - splits oversized batches into provider-sized chunks, run concurrently
     - calls provider
-    - measures provider latency (inference latency)
+    - encodes vectors as floats, base64 float32 or a binary .npy frame
+    - measures request latency (inference latency; cache hits included)
     - returns stable response schema
     """
 
-    def __init__(self, provider: EmbeddingsProvider):
+    def __init__(
+        self,
+        provider: EmbeddingsProvider,
+        max_chunk_size: int = 2048,
+        max_chunk_tokens: int = 300_000,
+        chunk_concurrency: int = 4,
+    ):
         self.provider = provider
+        self.max_chunk_size = max_chunk_size
+        self.max_chunk_tokens = max_chunk_tokens
+        self.chunk_concurrency = chunk_concurrency
 
     async def embed(self, request: EmbeddingsRequest) -> EmbeddingsResponse:
+        provider_result, latency_ms = await self._run(request)
+        vectors = provider_result.get("embeddings", [])
+
+        embeddings: list[list[float]] | list[str]
+        if request.encoding_format == "base64":
+            embeddings = [to_base64(v) for v in vectors]
+        else:
+            embeddings = [to_float_list(v) for v in vectors]
+
+        return EmbeddingsResponse(
+            embeddings=embeddings,
+            model=str(provider_result.get("model", request.model)),
+            latency_ms=round(latency_ms, 2),
+            request_id=request_id_ctx.get() or "unknown",
+            usage=_usage_from(provider_result.get("usage")),
+        )
+
+    async def embed_json(self, request: EmbeddingsRequest) -> bytes:
+        """
+        Same call as embed(), encoded straight to the JSON response body.
+
+        Same document as EmbeddingsResponse, without building (and validating) the
+        model: provider float32 arrays go to the encoder as they are (see app.core.serialization).
+        """
+        provider_result, latency_ms = await self._run(request)
+        vectors = provider_result.get("embeddings", [])
+        usage = _usage_from(provider_result.get("usage"))
+
+        return dumps({
+            "embeddings": [to_base64(v) for v in vectors] if request.encoding_format == "base64" else vectors,
+            "model": str(provider_result.get("model", request.model)),
+            "latency_ms": round(latency_ms, 2),
+            "request_id": request_id_ctx.get() or "unknown",
+            "usage": usage.model_dump() if usage is not None else None,
+        })
+
+    async def embed_binary(self, request: EmbeddingsRequest) -> EmbeddingsBinary:
+        """
+        Same call as embed(), encoded as one float32 .npy matrix.
+
+        Provider float32 arrays are copied straight into the body; no JSON, no per-float objects.
+        """
+        provider_result, latency_ms = await self._run(request)
+
+        try:
+            body = to_npy(provider_result.get("embeddings", []))
+        except ValueError as e:
+            raise BadUpstreamResponse("Malformed upstream response: inconsistent embedding dimensions") from e
+
+        return EmbeddingsBinary(
+            body=body,
+            model=str(provider_result.get("model", request.model)),
+            latency_ms=round(latency_ms, 2),
+            request_id=request_id_ctx.get() or "unknown",
+            usage=_usage_from(provider_result.get("usage")),
+        )
+
+    async def _run(self, request: EmbeddingsRequest) -> tuple[dict[str, Any], float]:
+        deadline.check()
+
         inputs: list[str]
         if isinstance(request.input, str):
             inputs = [request.input]
@@ -25,20 +121,59 @@ class EmbeddingsService:
             inputs = request.input
 
         start = time.perf_counter()
-        provider_result = await self.provider.embed(inputs=inputs, model=request.model)
+        async with deadline.bounded():
+            provider_result = await self._embed_chunked(inputs=inputs, model=request.model)
         latency_ms = (time.perf_counter() - start) * 1000.0
 
-        usage: EmbeddingsUsage | None = None
-        raw_usage = provider_result.get("usage")
-        if isinstance(raw_usage, dict):
-            usage = EmbeddingsUsage(total_tokens=raw_usage.get("total_tokens"))
+        return provider_result, latency_ms
 
-        request_id = request_id_ctx.get() or "unknown"
+    def _chunks(self, inputs: list[str]) -> list[list[str]]:
+        chunks: list[list[str]] = []
+        current: list[str] = []
+        current_tokens = 0
 
-        return EmbeddingsResponse(
-            embeddings=provider_result.get("embeddings", []),
-            model=str(provider_result.get("model", request.model)),
-            latency_ms=round(latency_ms, 2),
-            request_id=request_id,
-            usage=usage,
-        )
\ No newline at end of file
+        for text in inputs:
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.max_chunk_size or current_tokens + tokens > self.max_chunk_tokens):
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _embed_chunked(self, inputs: list[str], model: str) -> dict[str, Any]:
+        chunks = self._chunks(inputs)
+        if len(chunks) <= 1:
+            return await self.provider.embed(inputs=inputs, model=model)
+
+        sem = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def run(chunk: list[str]) -> dict[str, Any]:
+            async with sem:
+                return await self.provider.embed(inputs=chunk, model=model)
+
+        tasks = [asyncio.create_task(run(c)) for c in chunks]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed chunk fails the request; don't keep paying for the rest
+            for t in tasks:
+                t.cancel()
+            raise
+
+        embeddings: list[Any] = []
+        total_tokens: int | None = None
+        for result in results:
+            embeddings.extend(result.get("embeddings", []))
+            chunk_tokens = (result.get("usage") or {}).get("total_tokens")
+            if chunk_tokens is not None:
+                total_tokens = (total_tokens or 0) + chunk_tokens
+
+        return {
+            "embeddings": embeddings,
+            "model": results[0].get("model", model),
+            "usage": {"total_tokens": total_tokens},
+        }
@@ -0,0 +1,86 @@
+"""
+Micro-batching benchmark for embeddings (fully offline).
+
+Fires N concurrent single-string requests at FakeEmbeddingsProvider with
+injected latency, with and without BatchingEmbeddingsProvider in front.
+The fake upstream only admits a few calls at once, like a rate-limited API.
+
+    python -m benchmarks.bench_embed_batching --requests 2000 --latency-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.providers.batching_embeddings_provider import BatchingEmbeddingsProvider
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+
+
+class ThrottledUpstream(FakeEmbeddingsProvider):
+    """Fake upstream with a fixed number of concurrent connections."""
+
+    def __init__(self, latency_s: float, max_concurrency: int) -> None:
+        super().__init__(latency_s=latency_s)
+        self.calls = 0
+        self._sem = asyncio.Semaphore(max_concurrency)
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        async with self._sem:
+            self.calls += 1
+            return await super().embed(inputs, model)
+
+
+def _pct(sorted_ms: list[float], q: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+
+async def _run(provider: EmbeddingsProvider, n_requests: int) -> dict[str, float]:
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        start = time.perf_counter()
+        await provider.embed([f"chunk number {i}"], model="bench-model")
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(n_requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(_pct(latencies, 0.99), 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-concurrency", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    report: dict[str, dict[str, float]] = {}
+
+    direct = ThrottledUpstream(args.latency_ms / 1000.0, args.upstream_concurrency)
+    report["direct"] = await _run(direct, args.requests)
+    report["direct"]["upstream_calls"] = direct.calls
+
+    upstream = ThrottledUpstream(args.latency_ms / 1000.0, args.upstream_concurrency)
+    batched = BatchingEmbeddingsProvider(inner=upstream, window_ms=args.window_ms, max_batch_size=args.max_batch_size)
+    report["batched"] = await _run(batched, args.requests)
+    report["batched"]["upstream_calls"] = upstream.calls
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
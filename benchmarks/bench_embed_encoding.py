@@ -0,0 +1,73 @@
+"""
+Embeddings response encoding benchmark (fully offline).
+
+Compares response size and serialization time for encoding_format
+float / base64 / binary on a batch of float32 vectors, starting from the
+array("f") vectors the OpenAI provider now returns.
+
+    python -m benchmarks.bench_embed_encoding --vectors 1000 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from array import array
+from typing import Any
+
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.embed import EmbeddingsRequest
+from app.services.embed_service import EmbeddingsService
+
+
+class StaticEmbeddingsProvider(EmbeddingsProvider):
+    def __init__(self, vectors: list[array[float]]) -> None:
+        self.vectors = vectors
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        return {"embeddings": self.vectors[:len(inputs)], "model": model, "usage": {"total_tokens": None}}
+
+
+async def _encode(service: EmbeddingsService, request: EmbeddingsRequest) -> bytes:
+    if request.encoding_format == "binary":
+        return (await service.embed_binary(request)).body
+    response = await service.embed(request)
+    # Mirrors FastAPI's default path: Pydantic -> jsonable data -> stdlib json
+    return json.dumps(response.model_dump(mode="json")).encode("utf-8")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vectors = [array("f", (rng.uniform(-1, 1) for _ in range(args.dim))) for _ in range(args.vectors)]
+    service = EmbeddingsService(provider=StaticEmbeddingsProvider(vectors), max_chunk_size=args.vectors)
+    inputs = [f"text {i}" for i in range(args.vectors)]
+
+    report: dict[str, dict[str, float]] = {}
+    for fmt in ("float", "base64", "binary"):
+        request = EmbeddingsRequest(input=inputs, model="bench-model", encoding_format=fmt)
+        best = float("inf")
+        size = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            body = await _encode(service, request)
+            best = min(best, time.perf_counter() - start)
+            size = len(body)
+        report[fmt] = {"bytes": size, "best_ms": round(best * 1000.0, 2)}
+
+    raw_bytes = args.vectors * args.dim * 4
+    for entry in report.values():
+        entry["x_raw_size"] = round(entry["bytes"] / raw_bytes, 2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
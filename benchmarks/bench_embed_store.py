@@ -0,0 +1,99 @@
+"""
+Persistent embedding store benchmark (fully offline, in a temporary directory).
+
+Fills an EmbeddingStore with `--vectors` float32 vectors in batches of
+`--batch` (one put_many each, as the provider flushes), then reports:
+- write: vectors/sec and MB/sec
+- open: time to reopen the store (a restart) and the resident memory it adds
+- read: microseconds per lookup (zero-copy view), hot (mapped pages) and for
+  a 1000-input request
+- compaction: time to rewrite the store down to half its size
+
+    python -m benchmarks.bench_embed_store --vectors 20000 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+from app.core.embedding_store import EmbeddingStore
+
+MODEL = "text-embedding-3-small"
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = array("f", (rng.gauss(0.0, 0.05) for _ in range(args.dim)))
+    texts = [f"chunk {i} of the corpus" for i in range(args.vectors)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        store = EmbeddingStore(path, max_bytes=1 << 40)
+
+        start = time.perf_counter()
+        for i in range(0, args.vectors, args.batch):
+            store.put_many([(store.key(MODEL, t), base) for t in texts[i:i + args.batch]])
+        write_s = time.perf_counter() - start
+        data_mb = store.stats()["data_bytes"] / (1024 * 1024)
+        store.close()
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        store = EmbeddingStore(path, max_bytes=1 << 40)
+        open_ms = (time.perf_counter() - start) * 1000.0
+        rss_after_open = _rss_mb()
+
+        sample = rng.sample(texts, min(1000, len(texts)))
+        keys = [store.key(MODEL, t) for t in sample]
+        for key in keys:  # fault the pages in
+            store.get(key)
+        lookups = []
+        for key in keys:
+            t0 = time.perf_counter_ns()
+            store.get(key)
+            lookups.append((time.perf_counter_ns() - t0) / 1000.0)
+
+        start = time.perf_counter()
+        found = sum(store.get(store.key(MODEL, t)) is not None for t in sample)
+        request_ms = (time.perf_counter() - start) * 1000.0
+
+        start = time.perf_counter()
+        store.compact(int(store.stats()["data_bytes"] / 2))
+        compact_ms = (time.perf_counter() - start) * 1000.0
+        entries_after = store.stats()["entries"]
+        store.close()
+
+    print(json.dumps({
+        "params": vars(args),
+        "data_mb": round(data_mb, 1),
+        "write": {"vectors_per_s": round(args.vectors / write_s), "mb_per_s": round(data_mb / write_s, 1)},
+        "open": {"ms": round(open_ms, 2), "rss_added_mb": round(rss_after_open - rss_before, 1)},
+        "read": {
+            "lookup_us_p50": round(statistics.median(lookups), 2),
+            "lookup_us_p99": round(sorted(lookups)[int(0.99 * (len(lookups) - 1))], 2),
+            "request_1000_inputs_ms": round(request_ms, 2),
+            "found": found,
+        },
+        "compaction": {"ms": round(compact_ms, 1), "entries_after": entries_after},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Chat history trimming: prompt size sent upstream and trimming cost per request (fully offline).
+
+Simulates a chat client resending its whole conversation every turn (a system
+prompt plus alternating user / assistant messages of ~`--turn-chars` characters),
+up to the 50-message request limit. For each budget it reports, summed over the
+conversation's requests, the prompt tokens sent upstream with and without
+trimming, and the microseconds per request spent trimming.
+
+    python -m benchmarks.bench_history_trimming --budgets 2000 4000 8000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from app.core.history import HistoryTrimmer
+from app.core.tokens import TokenCounter
+from app.schemas.chat import ChatMessage
+
+MODEL = "gpt-4o-mini"
+WORDS = "the refund policy customer order shipping account password reset invoice delivery status please help thanks".split()
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    words: list[str] = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--turn-chars", type=int, default=1_500)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[2_000, 4_000, 8_000])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    history = [ChatMessage(role="system", content=_text(rng, 1_000))]
+    requests: list[list[ChatMessage]] = []
+    for i in range(args.messages - 1):
+        history.append(ChatMessage(role="user" if i % 2 == 0 else "assistant", content=_text(rng, args.turn_chars)))
+        if history[-1].role == "user":
+            requests.append(list(history))
+
+    counter = TokenCounter()
+    untrimmed = sum(counter.count_chat(messages, MODEL) for messages in requests)
+
+    results = {}
+    for budget in args.budgets:
+        trimmer = HistoryTrimmer(counter, budget_tokens=budget)
+        start = time.perf_counter_ns()
+        sent = 0
+        for messages in requests:
+            trimmed, _ = trimmer.trim(messages, MODEL, 256)
+            sent += counter.count_chat(trimmed, MODEL)
+        elapsed_us = (time.perf_counter_ns() - start) / 1000.0
+        results[str(budget)] = {
+            "prompt_tokens_sent": sent,
+            "reduction": round(1.0 - sent / untrimmed, 3),
+            "us_per_request": round(elapsed_us / len(requests), 1),
+            "requests_trimmed": trimmer.requests_trimmed,
+        }
+
+    print(json.dumps({
+        "params": vars(args),
+        "requests": len(requests),
+        "prompt_tokens_untrimmed": untrimmed,
+        "budgets": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Upstream HTTP client benchmark against the local stub upstream (fully offline).
+
+Runs the real OpenAI providers against benchmarks.stub_upstream (started as a
+separate process, so it doesn't compete with the client for the event loop) in
+three setups:
+
+- separate: chat and embeddings each with the SDK's own default client (two pools)
+- shared: both on one client from app.core.http.create_http_client
+- shared_prewarmed: the same, with connections opened before the first request
+
+For each: latency of a cold burst of concurrent requests right after startup
+(where handshakes show up), steady-state p50/p99 and requests/sec, and the number
+of TCP connections the stub saw.
+
+    python -m benchmarks.bench_http_pool --tls --burst 32 --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+from app.core.http import create_http_client, prewarm
+from app.providers.openai_embeddings_provider import OpenAIEmbeddingsProvider
+from app.providers.openai_provider import OpenAIChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hello")]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def _ms(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[int(q * (len(ordered) - 1))] * 1000.0, 3)
+
+
+async def _timed(call: Callable[[], Awaitable[Any]]) -> float:
+    start = time.perf_counter()
+    await call()
+    return time.perf_counter() - start
+
+
+async def _scenario(mode: str, base_url: str, verify: ssl.SSLContext | bool, args: argparse.Namespace) -> dict[str, Any]:
+    clients: list[httpx.AsyncClient]
+    if mode == "separate":
+        clients = [DefaultAsyncHttpxClient(verify=verify), DefaultAsyncHttpxClient(verify=verify)]
+    else:
+        clients = [create_http_client(max_keepalive_connections=args.burst, verify=verify)] * 2
+
+    chat = OpenAIChatProvider(api_key="x", base_url=base_url, http_client=clients[0])
+    embeddings = OpenAIEmbeddingsProvider(api_key="x", base_url=base_url, http_client=clients[1])
+
+    def call(i: int) -> Callable[[], Awaitable[Any]]:
+        if i % 2:
+            return lambda: embeddings.embed(["hello"], "e")
+        return lambda: chat.generate(MESSAGES, "m", 0.0, 16)
+
+    if mode == "shared_prewarmed":
+        await prewarm(clients[0], [base_url], args.burst)
+
+    burst = await asyncio.gather(*(_timed(call(i)) for i in range(args.burst)))
+
+    latencies: list[float] = []
+    remaining = args.requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            latencies.append(await _timed(call(remaining)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    for client in set(clients):
+        await client.aclose()
+
+    return {
+        "cold_burst_p50_ms": _ms(burst, 0.5),
+        "cold_burst_max_ms": _ms(burst, 1.0),
+        "steady_p50_ms": round(statistics.median(latencies) * 1000.0, 3),
+        "steady_p99_ms": _ms(latencies, 0.99),
+        "rps": round(args.requests / elapsed, 1),
+    }
+
+
+async def _start_stub(args: argparse.Namespace, port: int) -> subprocess.Popen[bytes]:
+    cmd = [sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(port), "--latency-ms", str(args.latency_ms)]
+    stub = subprocess.Popen(cmd + (["--tls"] if args.tls else []))
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return stub
+        except OSError:
+            await asyncio.sleep(0.1)
+    stub.kill()
+    raise RuntimeError("stub upstream did not start")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tls", action="store_true", help="https stub with a self-signed certificate (needs openssl)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub upstream latency")
+    parser.add_argument("--burst", type=int, default=32, help="concurrent requests right after startup")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    port = _free_port()
+    stub = await _start_stub(args, port)
+    scheme = "https" if args.tls else "http"
+    # The stub's certificate is throwaway and self-signed: skip verification, keep the handshake
+    verify: ssl.SSLContext | bool = True
+    if args.tls:
+        verify = ssl.create_default_context()
+        verify.check_hostname = False
+        verify.verify_mode = ssl.CERT_NONE
+
+    report: dict[str, Any] = {"params": vars(args)}
+    try:
+        async with httpx.AsyncClient(verify=verify) as control:
+            for mode in ("separate", "shared", "shared_prewarmed"):
+                before = (await control.get(f"{scheme}://127.0.0.1:{port}/stats")).json()["connections"]
+                report[mode] = await _scenario(mode, f"{scheme}://127.0.0.1:{port}/v1", verify, args)
+                after = (await control.get(f"{scheme}://127.0.0.1:{port}/stats")).json()["connections"]
+                report[mode]["connections_opened"] = after - before
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Metrics recording overhead benchmark (fully offline).
+
+1. Microbenchmark: cost per call of the hot-path recording primitives and of
+   everything one chat request records (HTTP counter + histogram + in-flight
+   gauge, provider call tracking, token usage).
+2. End-to-end: requests/sec and p50/p99 through the in-process ASGI client
+   (FakeChatProvider, caches off) with METRICS_ENABLED on vs off.
+
+    python -m benchmarks.bench_metrics --ops 200000 --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from collections.abc import Callable
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.metrics import GatewayMetrics
+from app.core.middleware import _record_metrics
+from app.schemas.chat import ChatUsage
+
+
+def _ns_per_op(fn: Callable[[], None], ops: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter_ns() - start) / ops
+
+
+def micro(ops: int) -> dict[str, float]:
+    metrics = GatewayMetrics()
+    labels = ("chat", "openai", "gpt-4o-mini")
+    scope = {"type": "http", "method": "POST", "path": "/v1/chat", "endpoint": object(), "state": {}}
+    usage = ChatUsage(input_tokens=12, output_tokens=30, total_tokens=42)
+
+    def one_request() -> None:
+        metrics.http_in_flight.inc()
+        with metrics.provider_call(*labels):
+            pass
+        metrics.record_tokens("chat", "openai", "gpt-4o-mini", usage)
+        _record_metrics(metrics, scope, 200, 0.0123)
+
+    return {
+        "counter_inc_ns": round(_ns_per_op(lambda: metrics.tokens.inc((*labels, "total"), 1), ops), 1),
+        "histogram_observe_ns": round(_ns_per_op(lambda: metrics.provider_latency.observe(0.0123, labels), ops), 1),
+        "per_request_ns": round(_ns_per_op(one_request, ops), 1),
+    }
+
+
+def _build_app(metrics_enabled: bool) -> FastAPI:
+    # Imported late so the environment set in main() is what Settings sees
+    from app.core.config import settings
+    from app.main import create_app
+
+    settings.metrics_enabled = metrics_enabled
+    return create_app()
+
+
+async def _run(app: FastAPI, requests: int, concurrency: int) -> dict[str, float]:
+    payload = {"messages": [{"role": "user", "content": "hello there"}], "temperature": 0.7}
+    latencies: list[float] = []
+    remaining = requests
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.post("/v1/chat", json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await client.post("/v1/chat", json=payload)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000.0, 3),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000.0, 3),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    os.environ["CHAT_CACHE_ENABLED"] = "false"
+    os.environ["OPENAI_API_KEY"] = ""
+
+    report: dict[str, dict[str, float]] = {"micro": micro(args.ops)}
+    for enabled in (False, True):
+        app = _build_app(enabled)
+        logging.disable(logging.INFO)
+        report["metrics_on" if enabled else "metrics_off"] = await _run(app, args.requests, args.concurrency)
+        logging.disable(logging.NOTSET)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
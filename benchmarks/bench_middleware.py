@@ -0,0 +1,137 @@
+"""
+Request-context middleware overhead benchmark (fully offline).
+
+Drives the full app (FakeChatProvider, caches off) through the in-process
+ASGI client and compares three middleware stacks:
+
+- none:       no request-context middleware (floor)
+- base_http:  the previous BaseHTTPMiddleware implementation
+- pure_asgi:  the current RequestContextMiddleware
+
+    python -m benchmarks.bench_middleware --requests 2000 --concurrency 32
+
+Access logs are silenced so the numbers reflect the middleware mechanics,
+not stdout throughput.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+import httpx
+from fastapi import FastAPI
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.logging import request_id_ctx
+from app.core.middleware import RequestContextMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class BaseHTTPRequestContextMiddleware(BaseHTTPMiddleware):
+    """The pre-ASGI implementation, kept here as the comparison baseline."""
+
+    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        start = time.perf_counter()
+        incoming_rid = request.headers.get("X-Request-ID")
+        rid = incoming_rid.strip() if incoming_rid else str(uuid.uuid4())
+        token = request_id_ctx.set(rid)
+        try:
+            response = await call_next(request)
+        finally:
+            request_id_ctx.reset(token)
+
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        response.headers["X-Request-ID"] = rid
+        response.headers["X-Response-Time-ms"] = f"{latency_ms:.2f}"
+        logger.info("request completed", extra={"fields": {
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "latency_ms": round(latency_ms, 2),
+        }})
+        return response
+
+
+def _build_app(variant: str) -> FastAPI:
+    # Imported late so the environment set in main() is what Settings sees
+    from app.main import create_app
+
+    app = create_app()
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not RequestContextMiddleware]
+    if variant == "base_http":
+        app.user_middleware.insert(0, Middleware(BaseHTTPRequestContextMiddleware))
+    elif variant == "pure_asgi":
+        app.user_middleware.insert(0, Middleware(RequestContextMiddleware))
+    return app
+
+
+async def _run(app: FastAPI, requests: int, concurrency: int, stream: bool) -> dict[str, float]:
+    payload = {"messages": [{"role": "user", "content": "hello there"}], "temperature": 0.7, "stream": stream}
+    latencies: list[float] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/v1/chat", json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        # Warm-up so route compilation / first-call costs don't skew the numbers
+        await client.post("/v1/chat", json=payload)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000.0, 3),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000.0, 3),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="benchmark SSE responses instead of JSON")
+    args = parser.parse_args()
+
+    os.environ["CHAT_CACHE_ENABLED"] = "false"
+    os.environ["OPENAI_API_KEY"] = ""
+
+    report: dict[str, dict[str, float]] = {}
+    for variant in ("none", "base_http", "pure_asgi"):
+        app = _build_app(variant)
+        logging.disable(logging.INFO)
+        report[variant] = await _run(app, args.requests, args.concurrency, args.stream)
+        logging.disable(logging.NOTSET)
+
+    floor = report["none"]
+    for variant in ("base_http", "pure_asgi"):
+        report[variant]["p50_overhead_ms"] = round(report[variant]["p50_ms"] - floor["p50_ms"], 3)
+        report[variant]["p99_overhead_ms"] = round(report[variant]["p99_ms"] - floor["p99_ms"], 3)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Retry amplification during an upstream outage (fully offline).
+
+Sends `--requests` chat calls, `--rps` per second of simulated time, to an upstream
+failing a share of calls with 503, and counts the upstream calls made per request:
+- sdk: fixed `--max-retries` per request, as the OpenAI SDK did (no budget)
+- budget: the gateway's Retrier, with RETRY_BUDGET_RATIO / RETRY_MIN_PER_S credit
+
+Backoff sleeps are skipped; time only advances between requests, for the budget refill.
+
+    python -m benchmarks.bench_retries --failure-rates 0.01 0.1 0.5 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+from unittest import mock
+
+from app.core.errors import UpstreamUnavailable
+from app.core.retry import Retrier, RetryBudget
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.retrying_provider import RetryingChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class FlakyUpstream(FakeChatProvider):
+    def __init__(self, failure_rate: float, rng: random.Random) -> None:
+        super().__init__()
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.calls = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        if self.rng.random() < self.failure_rate:
+            raise UpstreamUnavailable()
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+async def _run(failure_rate: float, budget: RetryBudget, args: argparse.Namespace, clock: list[float]) -> dict:
+    upstream = FlakyUpstream(failure_rate, random.Random(0))
+    provider = RetryingChatProvider(upstream, Retrier(budget, max_retries=args.max_retries, backoff_base_s=0.0, backoff_max_s=0.0))
+
+    ok = 0
+    for _ in range(args.requests):
+        clock[0] += 1.0 / args.rps
+        try:
+            await provider.generate(MESSAGES, "m", 0.0, 10)
+            ok += 1
+        except UpstreamUnavailable:
+            pass
+    return {"upstream_calls_per_request": round(upstream.calls / args.requests, 3), "success_rate": round(ok / args.requests, 4)}
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    clock = [0.0]
+    results = {}
+    with mock.patch("app.core.retry.time.monotonic", lambda: clock[0]):
+        for rate in args.failure_rates:
+            unlimited = RetryBudget(ratio=1.0, min_per_s=0.0, max_burst=float("inf"))
+            budgeted = RetryBudget(ratio=args.budget_ratio, min_per_s=args.min_per_s)
+            results[str(rate)] = {
+                "sdk": await _run(rate, unlimited, args, clock),
+                "budget": await _run(rate, budgeted, args, clock),
+            }
+    return {"params": vars(args), "failure_rates": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rps", type=float, default=500.0)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--budget-ratio", type=float, default=0.1)
+    parser.add_argument("--min-per-s", type=float, default=10.0)
+    parser.add_argument("--failure-rates", type=float, nargs="+", default=[0.01, 0.1, 0.5, 1.0])
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Semantic cache index: search latency and recall, exact scan vs approximate (IVF).
+
+Fills one partition with random unit vectors, then queries with slightly
+perturbed copies of stored vectors. Recall is the share of queries whose
+own entry comes back.
+
+    python -m benchmarks.bench_semantic_cache --sizes 1000,10000,50000 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any
+
+import numpy as np
+
+from app.core.semantic_index import SemanticIndex, normalized
+
+
+def run(size: int, args: argparse.Namespace, approximate: bool) -> dict[str, Any]:
+    rng = np.random.default_rng(size)
+    points = rng.normal(size=(size, args.dim)).astype(np.float32)
+    index = SemanticIndex(max_bytes=1 << 40, ann_min_rows=args.ann_min_rows if approximate else 1 << 62, nprobe=args.nprobe)
+
+    start = time.perf_counter()
+    for i, point in enumerate(points):
+        index.add("p", normalized(point), {"text": str(i)})  # type: ignore[arg-type]
+    build_s = time.perf_counter() - start
+
+    latencies: list[float] = []
+    found = 0
+    for i in rng.choice(size, size=args.queries, replace=False):
+        query = normalized(points[i] + rng.normal(scale=args.noise, size=args.dim).astype(np.float32))
+        start = time.perf_counter()
+        hit = index.search("p", query, 0.0)  # type: ignore[arg-type]
+        latencies.append(time.perf_counter() - start)
+        found += hit is not None and hit[0]["text"] == str(i)
+
+    latencies.sort()
+    return {
+        "size": size,
+        "index": "ivf" if index.stats()["approximate_partitions"] else "exact",
+        "build_s": round(build_s, 3),
+        "search_p50_ms": round(statistics.median(latencies) * 1000.0, 3),
+        "search_p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000.0, 3),
+        "recall": round(found / args.queries, 3),
+        "size_mb": round(index.size_bytes / 1024 / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma-separated entry counts")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.01, help="stddev of the perturbation added to each query")
+    parser.add_argument("--ann-min-rows", type=int, default=10_000)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    runs = []
+    for size in (int(n) for n in args.sizes.split(",")):
+        runs.append(run(size, args, approximate=False))
+        if size >= args.ann_min_rows:
+            runs.append(run(size, args, approximate=True))
+    print(json.dumps({"params": vars(args), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
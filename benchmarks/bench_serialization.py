@@ -0,0 +1,150 @@
+"""
+Response serialization benchmark: FastAPI's default path vs the gateway's (fully offline).
+
+Both paths serve the same services inside one create_app() app:
+- default: the route returns the model and FastAPI handles `response_model=`
+  (validates it again, then serializes it), as before
+- fast: the gateway's /v1 routes (body encoded once, see app.core.serialization)
+
+Each request is a direct ASGI call (no sockets, no HTTP client), so the time is
+the gateway's own: request decoding, service, response encoding, middleware.
+
+Scenarios: /v1/chat with the fake provider, and /v1/embeddings returning
+`--vectors` x `--dim` float32 vectors (array("f"), as the OpenAI provider does).
+Reported per request: median and p95 milliseconds, and body size.
+Request decoding is FastAPI's in both paths.
+
+    python -m benchmarks.bench_serialization --requests 200 --vectors 1000 --dim 1536
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from array import array
+from typing import Any, cast
+
+from fastapi import APIRouter, FastAPI, Request
+
+from app.core.serialization import ORJSON_AVAILABLE
+from app.main import create_app
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.schemas.chat import ChatRequest, ChatResponse
+from app.schemas.embed import EmbeddingsRequest, EmbeddingsResponse
+from app.services.chat_service import ChatService
+from app.services.embed_service import EmbeddingsService
+
+
+class StaticEmbeddingsProvider(EmbeddingsProvider):
+    name = "static"
+
+    def __init__(self, vectors: list[array[float]]) -> None:
+        self.vectors = vectors
+
+    async def embed(self, inputs: list[str], model: str) -> dict[str, Any]:
+        return {"embeddings": self.vectors[:len(inputs)], "model": model, "usage": {"total_tokens": len(inputs)}}
+
+
+default_router = APIRouter()
+
+
+@default_router.post("/chat", response_model=ChatResponse)
+async def default_chat(req: ChatRequest, request: Request) -> ChatResponse:
+    return await cast(ChatService, request.app.state.chat_service).chat(req)
+
+
+@default_router.post("/embeddings", response_model=EmbeddingsResponse)
+async def default_embeddings(req: EmbeddingsRequest, request: Request) -> EmbeddingsResponse:
+    return await cast(EmbeddingsService, request.app.state.embeddings_service).embed(req)
+
+
+async def _post(app: FastAPI, path: str, body: bytes) -> bytes:
+    """One ASGI request; returns the response body."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    received = False
+    status = 0
+    chunks: list[bytes] = []
+
+    async def receive() -> dict[str, Any]:
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"{path} returned {status}: {b''.join(chunks)[:200]!r}")
+    return b"".join(chunks)
+
+
+async def _measure(app: FastAPI, path: str, payload: dict[str, Any], requests: int) -> dict[str, float]:
+    body = json.dumps(payload).encode()
+    latencies: list[float] = []
+    size = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        size = len(await _post(app, path, body))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "body_bytes": size,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    app = create_app()
+    app.include_router(default_router, prefix="/default")
+
+    rng = random.Random(0)
+    vectors = [array("f", (rng.gauss(0.0, 0.05) for _ in range(args.dim))) for _ in range(args.vectors)]
+    embeddings_service = cast(EmbeddingsService, app.state.embeddings_service)
+    embeddings_service.provider = StaticEmbeddingsProvider(vectors)
+
+    scenarios = {
+        "chat": ("/chat", {"messages": [{"role": "user", "content": "What is your refund policy?"}], "temperature": 0.7}, args.requests),
+        "embeddings": ("/embeddings", {"input": [f"document {i}" for i in range(args.vectors)]}, args.embed_requests),
+    }
+
+    results: dict[str, Any] = {}
+    for name, (path, payload, requests) in scenarios.items():
+        # Warm up both paths once before timing
+        await _measure(app, f"/default{path}", payload, 1)
+        await _measure(app, f"/v1{path}", payload, 1)
+        default = await _measure(app, f"/default{path}", payload, requests)
+        fast = await _measure(app, f"/v1{path}", payload, requests)
+        results[name] = {"default": default, "fast": fast, "speedup_p50": round(default["p50_ms"] / fast["p50_ms"], 2)}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="chat requests per path")
+    parser.add_argument("--embed-requests", type=int, default=10, help="embeddings requests per path")
+    parser.add_argument("--vectors", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps({"params": vars(args), "orjson": ORJSON_AVAILABLE, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark: import time, time to first ready request, first request latency.
+
+Each run starts a fresh `python -m app.serve` and measures, from process spawn:
+- ready_ms: the first 200 from /v1/health (imports + create_app + lifespan startup)
+- first_chat_ms: latency of the first /v1/chat after that
+
+for two deployments: fake backends only, and one OpenAI-compatible backend
+(benchmarks.stub_upstream, so the real SDK and connection prewarm are exercised
+offline). The import profile is `python -X importtime -c "import app.main"`,
+summarised as the slowest modules by cumulative time.
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def import_profile(top: int) -> dict[str, Any]:
+    """Parse `-X importtime` output: total for app.main plus the `top` slowest modules (cumulative)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    )
+    modules: list[dict[str, Any]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": round(int(self_us) / 1000.0, 1),
+            "cumulative_ms": round(int(cumulative_us) / 1000.0, 1),
+        })
+
+    total = next(m["cumulative_ms"] for m in modules if m["module"] == "app.main")
+    return {
+        "import_app_main_ms": total,
+        "openai_imported": any(m["module"] == "openai" for m in modules),
+        "slowest": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+    }
+
+
+def cold_start(env: dict[str, str]) -> dict[str, float]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port)],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=url, timeout=10.0) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("gateway exited during startup")
+                try:
+                    if client.get("/v1/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+
+            response = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}]})
+            response.raise_for_status()
+            first_chat = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {"ready_ms": (ready - start) * 1000.0, "first_chat_ms": (first_chat - ready) * 1000.0}
+
+
+def _summary(runs: list[dict[str, float]]) -> dict[str, float]:
+    return {key: round(statistics.median(r[key] for r in runs), 1) for key in runs[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per deployment (medians are reported)")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    stub_port = _free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(stub_port), "--latency-ms", "1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deployments = {
+        "fake": {"PROVIDER_BACKENDS": json.dumps([{"name": "fake", "kind": "fake"}])},
+        "openai": {"PROVIDER_BACKENDS": json.dumps([{"name": "stub", "api_key": "x", "base_url": f"http://127.0.0.1:{stub_port}/v1"}])},
+    }
+    try:
+        results = {name: _summary([cold_start(env) for _ in range(args.runs)]) for name, env in deployments.items()}
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    print(json.dumps({"params": vars(args), "cold_start": results, "imports": import_profile(args.top)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Token accounting cost per chat request (fully offline).
+
+A request here is a shared system prompt (~2k characters, the same for every
+request) plus a fresh user message (~300 characters). Reported in microseconds
+per request:
+- chars_div_4: the old len // 4 estimate, as a floor
+- cold: every text counted from scratch (no memo hits)
+- shared_system_prompt: system prompt memoized, user message counted
+- repeated_request: every message memoized
+- check_context: the full pre-flight check ChatService runs (repeated request)
+
+The encoder is tiktoken when installed, otherwise the built-in estimate (see `encoder`).
+
+    python -m benchmarks.bench_tokens --requests 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections.abc import Callable
+
+from app.core.tokens import TokenCounter
+from app.schemas.chat import ChatMessage
+
+MODEL = "gpt-4o-mini"
+WORDS = "the refund policy customer order shipping account password reset invoice delivery status please help thanks".split()
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    words: list[str] = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words) + f" #{rng.randrange(10**9)}?"
+
+
+def _us_per_request(fn: Callable[[list[ChatMessage]], object], requests: list[list[ChatMessage]]) -> float:
+    start = time.perf_counter_ns()
+    for messages in requests:
+        fn(messages)
+    return round((time.perf_counter_ns() - start) / len(requests) / 1000.0, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--system-chars", type=int, default=2_000)
+    parser.add_argument("--user-chars", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    system = ChatMessage(role="system", content=_text(rng, args.system_chars))
+    requests = [[system, ChatMessage(role="user", content=_text(rng, args.user_chars))] for _ in range(args.requests)]
+    # Same shape, nothing shared: a unique system prompt per request
+    unshared = [
+        [ChatMessage(role="system", content=_text(rng, args.system_chars)), ChatMessage(role="user", content=_text(rng, args.user_chars))]
+        for _ in range(args.requests)
+    ]
+
+    counter = TokenCounter(memo_size=4 * args.requests)
+    encoder = counter.encoder(MODEL)
+
+    # Order matters: each run sees the memo the previous ones left behind
+    results = {
+        "chars_div_4": _us_per_request(lambda ms: sum(len(m.content) // 4 + 1 for m in ms), requests),
+        "cold": _us_per_request(lambda ms: counter.count_chat(ms, MODEL), unshared),
+        "shared_system_prompt": _us_per_request(lambda ms: counter.count_chat(ms, MODEL), requests),
+        "repeated_request": _us_per_request(lambda ms: counter.count_chat(ms, MODEL), requests),
+        "check_context": _us_per_request(lambda ms: counter.check_context(ms, MODEL, 256), requests),
+    }
+    print(json.dumps({
+        "params": vars(args),
+        "encoder": {"name": encoder.name, "exact": encoder.exact},
+        "us_per_request": results,
+        "memo": counter.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
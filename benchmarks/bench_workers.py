@@ -0,0 +1,142 @@
+"""
+Multi-worker throughput scaling benchmark (fully offline).
+
+Starts `python -m app.serve --workers N` for each N, with a fake upstream of
+fixed latency, and drives it over real HTTP from several load-generator
+processes (closed loop, so the generators are not the bottleneck). Reports
+requests/sec, p50/p99 and the speedup over one worker, and checks that
+/v1/metrics (merged across workers) counted every request.
+
+    python -m benchmarks.bench_workers --workers 1,2,4 --duration 10
+
+Scaling is bounded by the cores available (reported as cpu_count): with fewer
+cores than workers plus load generators, extra workers only add contention.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+async def _load(url: str, seconds: float, concurrency: int, client_id: int) -> tuple[int, int, list[float]]:
+    ok = failed = 0
+    latencies: list[float] = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        async def worker(w: int) -> None:
+            nonlocal ok, failed
+            i = 0
+            while time.perf_counter() < deadline:
+                i += 1
+                # Unique prompts: measure serving, not the response cache or coalescing
+                payload = {"messages": [{"role": "user", "content": f"{client_id}-{w}-{i}"}], "temperature": 0}
+                start = time.perf_counter()
+                response = await client.post("/v1/chat", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code == 200:
+                    ok += 1
+                else:
+                    failed += 1
+
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return ok, failed, latencies
+
+
+def _load_process(args: tuple[str, float, int, int]) -> tuple[int, int, list[float]]:
+    return asyncio.run(_load(*args))
+
+
+def _wait_ready(url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/v1/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gateway did not start")
+
+
+def _metrics_chat_total(url: str) -> int:
+    text = httpx.get(f"{url}/v1/metrics", timeout=5.0).text
+    pattern = r'gateway_http_requests_total\{route="/v1/chat",method="POST",status="(\d+)",code="[^"]*"\} (\d+)'
+    return sum(int(n) for _, n in re.findall(pattern, text))
+
+
+def run(workers: int, args: argparse.Namespace) -> dict[str, Any]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "PROVIDER_BACKENDS": json.dumps([{"name": "fake", "kind": "fake", "latency_ms": args.latency_ms}]),
+        "CHAT_CACHE_ENABLED": "false",
+        "OPENAI_API_KEY": "",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(url)
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            results = pool.map(_load_process, [(url, args.duration, args.concurrency, c) for c in range(args.clients)])
+
+        ok = sum(r[0] for r in results)
+        failed = sum(r[1] for r in results)
+        latencies = sorted(lat for r in results for lat in r[2])
+        time.sleep(args.metrics_wait)
+        counted = _metrics_chat_total(url)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "rps": round(ok / args.duration, 1),
+        "failed": failed,
+        "p50_ms": round(statistics.median(latencies) * 1000.0, 2),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000.0, 2),
+        "metrics_counted_all": counted == ok + failed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per worker count")
+    parser.add_argument("--clients", type=int, default=4, help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per load generator")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake upstream latency")
+    parser.add_argument("--metrics-wait", type=float, default=2.0, help="seconds for workers to publish metrics before checking them")
+    args = parser.parse_args()
+
+    runs = [run(int(n), args) for n in args.workers.split(",")]
+    base = runs[0]["rps"] or 1.0
+    for r in runs:
+        r["speedup"] = round(r["rps"] / base, 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "params": vars(args), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Local OpenAI-compatible stub upstream, for benchmarking the gateway's upstream
+HTTP path (connection pooling, prewarm, HTTP/2) fully offline.
+
+Serves POST /v1/chat/completions and POST /v1/embeddings (base64 vectors) with a
+fixed simulated latency, and GET /stats with the number of TCP connections seen.
+Any other request (e.g. the prewarm HEAD) gets an empty 404.
+
+    python -m benchmarks.stub_upstream --port 9100 --latency-ms 20 [--tls]
+
+Point the gateway at it:
+
+    PROVIDER_BACKENDS='[{"name": "stub", "api_key": "x", "base_url": "http://127.0.0.1:9100/v1"}]'
+
+--tls serves https with a throwaway self-signed certificate (needs the openssl
+binary), so handshake cost shows up as it does against a real upstream.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+
+Scope = dict[str, Any]
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    connections: set[tuple[str, int]] = field(default_factory=set)
+
+    def snapshot(self) -> dict[str, int]:
+        return {"requests": self.requests, "connections": len(self.connections)}
+
+
+class StubUpstream:
+    """Minimal ASGI app; no framework so the stub itself costs next to nothing per request."""
+
+    def __init__(self, latency_ms: float = 20.0, embed_dim: int = 256) -> None:
+        self.latency_s = latency_ms / 1000.0
+        self.vector = base64.b64encode(b"\x00\x00\x80\x3f" * embed_dim).decode("ascii")  # 1.0f repeated
+        self.stats = StubStats()
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return
+        if scope.get("client"):
+            self.stats.connections.add(tuple(scope["client"]))
+
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        path = scope["path"]
+        if scope["method"] == "GET" and path == "/stats":
+            await self._send(send, 200, self.stats.snapshot())
+            return
+        if scope["method"] != "POST" or path not in ("/v1/chat/completions", "/v1/embeddings"):
+            await send({"type": "http.response.start", "status": 404, "headers": [(b"content-length", b"0")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        self.stats.requests += 1
+        request = json.loads(body or b"{}")
+        await asyncio.sleep(self.latency_s)
+
+        if path == "/v1/embeddings":
+            inputs = request.get("input", [])
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            await self._send(send, 200, {
+                "object": "list",
+                "model": request.get("model", "stub"),
+                "data": [{"object": "embedding", "index": i, "embedding": self.vector} for i in range(len(inputs))],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            })
+            return
+
+        await self._send(send, 200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "stub reply"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        })
+
+    @staticmethod
+    async def _send(send: Any, status: int, payload: dict[str, Any]) -> None:
+        raw = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(raw)).encode())],
+        })
+        await send({"type": "http.response.body", "body": raw})
+
+
+def self_signed_cert(directory: Path) -> tuple[Path, Path]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def make_server(stub: StubUpstream, port: int, tls: tuple[Path, Path] | None = None) -> uvicorn.Server:
+    config = uvicorn.Config(
+        stub,
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        access_log=False,
+        lifespan="off",
+        ssl_certfile=str(tls[0]) if tls else None,
+        ssl_keyfile=str(tls[1]) if tls else None,
+    )
+    return uvicorn.Server(config)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--tls", action="store_true", help="serve https with a self-signed certificate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tls = self_signed_cert(Path(tmp)) if args.tls else None
+        server = make_server(StubUpstream(args.latency_ms, args.embed_dim), args.port, tls)
+        asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
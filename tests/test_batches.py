@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.batch import parse_args, run
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore
+from app.main import create_app
+from app.schemas.batch import BatchJob
+from app.services.batch_service import BatchRunner, BatchService
+
+
+def _write_lines(path: Path, lines: list[object]) -> None:
+    path.write_text("".join((line if isinstance(line, str) else json.dumps(line)) + "\n" for line in lines))
+
+
+def _chat(content: str) -> dict:
+    return {"messages": [{"role": "user", "content": content}]}
+
+
+def _runner(**kwargs) -> BatchRunner:
+    app = create_app()
+    return BatchRunner(app.state.chat_service, app.state.embeddings_service, **kwargs)
+
+
+def _read_results(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_runner_writes_one_result_per_line_and_captures_errors(tmp_path: Path):
+    inp, out, ckpt = tmp_path / "in.jsonl", tmp_path / "out.jsonl", tmp_path / "ckpt.json"
+    _write_lines(inp, [
+        {"custom_id": "a", "body": _chat("first")},
+        _chat("second"),
+        "not json",
+        {"messages": []},
+        {**_chat("streamed"), "stream": True},
+    ])
+    job = BatchJob(id="t", endpoint="chat", created_at=time.time())
+
+    await _runner(concurrency=2).run(job, inp, out, ckpt)
+
+    results = {r["line"]: r for r in _read_results(out)}
+    assert sorted(results) == [1, 2, 3, 4, 5]
+    assert results[1]["custom_id"] == "a"
+    assert results[1]["response"]["text"] == "echo: first"
+    assert results[2]["status_code"] == 200
+    assert results[3]["error"]["code"] == "INVALID_REQUEST"
+    assert results[4]["error"]["details"]["errors"][0]["loc"] == ["messages"]
+    assert results[5]["status_code"] == 400
+    assert (job.lines_total, job.lines_succeeded, job.lines_failed) == (5, 2, 3)
+    assert json.loads(ckpt.read_text())["line"] == 5
+
+
+@pytest.mark.asyncio
+async def test_runner_resumes_from_checkpoint_without_duplicates(tmp_path: Path):
+    inp, out, ckpt = tmp_path / "in.jsonl", tmp_path / "out.jsonl", tmp_path / "ckpt.json"
+    _write_lines(inp, [_chat(f"line {i}") for i in range(1, 11)])
+    job = BatchJob(id="t", endpoint="chat", created_at=time.time())
+    await _runner(checkpoint_every=1).run(job, inp, out, ckpt)
+
+    # Simulate a crash after line 4 was checkpointed: lines 5 and 7 made it to the
+    # output (7 out of order), line 8 was torn mid-write, the rest never ran.
+    full = {r["line"]: r for r in _read_results(out)}
+    kept = [json.dumps(full[n]) for n in (1, 2, 3, 4, 5, 7)]
+    out.write_text("\n".join(kept) + "\n" + json.dumps(full[8])[:20])
+    line_4_end = sum(len(line) for line in inp.read_bytes().splitlines(keepends=True)[:4])
+    ckpt.write_text(json.dumps({"line": 4, "offset": line_4_end}))
+
+    resumed = BatchJob(id="t", endpoint="chat", created_at=time.time())
+    await _runner().run(resumed, inp, out, ckpt)
+
+    lines = [r["line"] for r in _read_results(out)]
+    assert sorted(lines) == list(range(1, 11))
+    assert resumed.lines_done == resumed.lines_total == 10
+    assert json.loads(ckpt.read_text()) == {"line": 10, "offset": inp.stat().st_size}
+
+
+@pytest.mark.asyncio
+async def test_cli_flushes_the_embeddings_store_on_exit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    store_dir = tmp_path / "store"
+    monkeypatch.setattr(settings, "embed_store_dir", str(store_dir))
+    monkeypatch.setattr(settings, "embed_cache_enabled", False)
+    inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_lines(inp, [{"input": ["a", "abc"], "model": "test-embed-model"}])
+
+    job = await run(parse_args([str(inp), "--endpoint", "embeddings", "--output", str(out)]))
+
+    assert job.status == "completed" and job.lines_done == 1
+    store = EmbeddingStore(store_dir, max_bytes=1024 * 1024)
+    assert store.get(store.key("test-embed-model", "a")).tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert store.get(store.key("test-embed-model", "abc")).tolist() == [3.0, 4.0, 5.0, 6.0]
+    store.close()
+
+
+@pytest.fixture
+def batch_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "batch_dir", str(tmp_path / "batches"))
+    return tmp_path / "batches"
+
+
+def _wait_done(client: TestClient, batch_id: str) -> dict:
+    for _ in range(200):
+        job = client.get(f"/v1/batches/{batch_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("batch did not finish")
+
+
+def test_batch_api_create_poll_and_download(batch_dir: Path):
+    body = "\n".join(json.dumps({"input": f"text {i}"}) for i in range(5)) + "\n"
+
+    with TestClient(create_app()) as client:
+        created = client.post("/v1/batches?endpoint=embeddings", content=body)
+        assert created.status_code == 202
+        batch_id = created.json()["id"]
+
+        job = _wait_done(client, batch_id)
+        assert job["status"] == "completed"
+        assert job["lines_succeeded"] == 5
+
+        output = client.get(f"/v1/batches/{batch_id}/output")
+        assert output.headers["content-type"].startswith("application/jsonl")
+        results = [json.loads(line) for line in output.text.splitlines()]
+        assert sorted(r["line"] for r in results) == [1, 2, 3, 4, 5]
+        assert all(len(r["response"]["embeddings"]) == 1 for r in results)
+
+        assert [j["id"] for j in client.get("/v1/batches").json()["data"]] == [batch_id]
+        assert (batch_dir / batch_id / "job.json").exists()
+
+
+def test_batch_api_errors(batch_dir: Path):
+    with TestClient(create_app()) as client:
+        missing = client.get("/v1/batches/batch_nope")
+        assert missing.status_code == 404
+        assert missing.json()["error"]["code"] == "NOT_FOUND"
+
+        client.app.state.batch_service.max_input_bytes = 10
+        too_big = client.post("/v1/batches?endpoint=chat", content=json.dumps(_chat("way too long")))
+        assert too_big.status_code == 413
+        assert list(batch_dir.iterdir()) == []
+
+
+class _IdleRunner(BatchRunner):
+    """Reports progress until cancelled; counts how many workers ran the job."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+
+    async def run(self, job, input_path, output_path, checkpoint_path, on_progress=None) -> None:
+        self.runs += 1
+        while True:
+            if on_progress is not None:
+                on_progress()
+            await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_batch_dir_run_each_job_once(tmp_path: Path):
+    runner_a, runner_b = _IdleRunner(), _IdleRunner()
+    worker_a = BatchService(runner_a, tmp_path, max_input_bytes=1024)
+    worker_b = BatchService(runner_b, tmp_path, max_input_bytes=1024)
+
+    async def body():
+        yield json.dumps(_chat("hi")).encode() + b"\n"
+
+    job = await worker_a.create("chat", body())
+    await asyncio.sleep(0.02)
+    worker_b.resume_pending()
+    await asyncio.sleep(0.02)
+
+    assert (runner_a.runs, runner_b.runs) == (1, 0)
+    assert worker_b.get(job.id).status == "running"
+    assert [j.id for j in worker_b.list()] == [job.id]
+
+    await worker_b.cancel(job.id)
+    for _ in range(100):
+        if worker_b.get(job.id).status == "cancelled":
+            break
+        await asyncio.sleep(0.01)
+    assert worker_b.get(job.id).status == "cancelled"
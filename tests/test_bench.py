@@ -0,0 +1,30 @@
+import pytest
+
+from app.bench import bench, parse_args
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("endpoint", ["chat", "chat_stream", "embeddings"])
+async def test_bench_smoke_run_reports_throughput_and_percentiles(endpoint: str):
+    args = parse_args([
+        "--endpoint", endpoint, "--rps", "200", "--duration", "0.1", "--warmup", "1",
+        "--latency-dist", "constant", "--latency-ms", "1", "--embed-dim", "8",
+    ])
+
+    report = await bench(args)
+
+    assert report["requests"]["scheduled"] == 20
+    assert report["requests"]["ok"] == 20
+    assert report["latency"]["p50_ms"] is not None
+    assert report["latency"]["p50_ms"] <= report["latency"]["p999_ms"]
+    assert report["params"]["endpoint"] == endpoint
+
+
+@pytest.mark.asyncio
+async def test_bench_counts_simulated_failures():
+    args = parse_args(["--rps", "200", "--duration", "0.1", "--warmup", "0", "--latency-ms", "0", "--failure-rate", "1.0"])
+
+    report = await bench(args)
+
+    assert report["requests"]["ok"] == 0
+    assert report["requests"]["statuses"] == {"503": 20}
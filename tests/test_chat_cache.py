@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import InMemoryCache
+from app.main import create_app
+
+
+def test_deterministic_chat_is_served_from_cache():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {
+        "messages": [{"role": "user", "content": "hello"}],
+        "model": "test-model",
+        "temperature": 0,
+    }
+
+    first = client.post("/v1/chat", json=payload)
+    second = client.post("/v1/chat", json=payload)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["text"] == first.json()["text"]
+    assert client.get("/v1/status").json()["response_cache"] == {"hits": 1, "misses": 1, "bypassed": 0}
+
+
+def test_sampled_chat_bypasses_cache():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {
+        "messages": [{"role": "user", "content": "hello"}],
+        "temperature": 0.7,
+    }
+
+    client.post("/v1/chat", json=payload)
+    response = client.post("/v1/chat", json=payload)
+
+    assert response.json()["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=2, ttl_s=None)
+
+    await cache.set("a", {"v": 1})
+    await cache.set("b", {"v": 2})
+    await cache.get("a")
+    await cache.set("c", {"v": 3})
+
+    assert await cache.get("a") == {"v": 1}
+    assert await cache.get("b") is None
+    assert await cache.get("c") == {"v": 3}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_expires_entries():
+    cache = InMemoryCache(max_entries=10, ttl_s=60)
+
+    await cache.set("a", {"v": 1}, ttl_s=-1)
+
+    assert await cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.core.errors import UpstreamTimeout
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.hedging_provider import HedgingChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class ScriptedProvider(FakeChatProvider):
+    """Each call takes the next latency (or raises the next error) from the script."""
+
+    def __init__(self, script: list[float | Exception]) -> None:
+        super().__init__()
+        self.script = list(script)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        step = self.script[self.calls] if self.calls < len(self.script) else 0.0
+        self.calls += 1
+        call = self.calls
+        if isinstance(step, Exception):
+            raise step
+        try:
+            await asyncio.sleep(step)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"text": f"call {call}", "model": model, "usage": None}
+
+
+async def _warm_up(provider: HedgingChatProvider, n: int) -> None:
+    for _ in range(n):
+        await provider.generate(MESSAGES, "m", 0.0, 10)
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_loser_cancelled():
+    upstream = ScriptedProvider([0.005] * 20 + [1.0, 0.005])
+    provider = HedgingChatProvider(upstream, min_samples=20, max_hedge_ratio=0.5)
+    await _warm_up(provider, 20)
+
+    start = asyncio.get_running_loop().time()
+    result = await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    assert result["text"] == "call 22"
+    assert asyncio.get_running_loop().time() - start < 0.5
+    await asyncio.sleep(0)
+    assert upstream.cancelled == 1
+    assert provider.stats()["hedges"] == 1
+    assert provider.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedging_before_enough_samples():
+    upstream = ScriptedProvider([0.05])
+    provider = HedgingChatProvider(upstream, min_samples=20, max_hedge_ratio=1.0)
+
+    await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    assert upstream.calls == 1
+    assert provider.stats()["hedges"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_caps_duplicate_traffic():
+    upstream = ScriptedProvider([0.002] * 20 + [0.05] * 40)
+    provider = HedgingChatProvider(upstream, min_samples=20, max_hedge_ratio=0.05, max_burst=1.0)
+    await _warm_up(provider, 20)
+
+    await asyncio.gather(*(provider.generate(MESSAGES, "m", 0.0, 10) for _ in range(20)))
+
+    stats = provider.stats()
+    assert stats["hedges"] <= 0.05 * stats["requests"] + 1
+    assert stats["budget_exhausted"] > 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_covers_failing_primary():
+    upstream = ScriptedProvider([0.002] * 20 + [0.05, UpstreamTimeout()])
+    provider = HedgingChatProvider(upstream, min_samples=20, max_hedge_ratio=1.0)
+    await _warm_up(provider, 20)
+
+    # Primary is slow, hedge fails: the primary's answer is still returned
+    result = await provider.generate(MESSAGES, "m", 0.0, 10)
+    assert result["text"] == "call 21"
+    assert provider.stats()["hedge_wins"] == 0
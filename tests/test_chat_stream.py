@@ -0,0 +1,59 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events: list[tuple[str, dict]] = []
+    for block in body.strip().split("\n\n"):
+        event = "message"
+        data = ""
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = line[len("data: "):]
+        events.append((event, json.loads(data)))
+    return events
+
+
+def test_chat_stream_relays_deltas_and_final_frame():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {
+        "messages": [{"role": "user", "content": "hello there"}],
+        "model": "test-model",
+        "stream": True,
+    }
+
+    response = client.post("/v1/chat", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(response.text)
+    deltas = [data["text"] for event, data in events if event == "message"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == "echo: hello there"
+
+    event, done = events[-1]
+    assert event == "done"
+    assert done["model"] == "test-model"
+    assert done["ttft_ms"] is not None
+    assert done["latency_ms"] >= done["ttft_ms"]
+    assert "request_id" in done
+
+
+def test_chat_without_stream_flag_returns_json():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {"messages": [{"role": "user", "content": "hello"}], "stream": False}
+
+    response = client.post("/v1/chat", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["text"] == "echo: hello"
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from app.core.errors import UpstreamUnavailable
+from app.providers.coalescing_provider import CoalescingChatProvider, CoalescingEmbeddingsProvider
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+from app.providers.fake_provider import FakeChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="viral prompt")]
+
+
+class SlowProvider(FakeChatProvider):
+    def __init__(self, delay_s: float = 0.02, error: Exception | None = None) -> None:
+        super().__init__()
+        self.delay_s = delay_s
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        call = self.calls
+        try:
+            await asyncio.sleep(self.delay_s)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {"text": f"call {call}", "model": model, "usage": None}
+
+
+class CountingEmbeddings(FakeEmbeddingsProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return await super().embed(inputs, model)
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_share_one_upstream_call():
+    upstream = SlowProvider()
+    provider = CoalescingChatProvider(upstream)
+
+    results = await asyncio.gather(*(provider.generate(MESSAGES, "m", 0.7, 10) for _ in range(20)))
+
+    assert upstream.calls == 1
+    assert {r["text"] for r in results} == {"call 1"}
+    assert len({id(r) for r in results}) == 20
+    assert provider.stats() == {"leaders": 1, "coalesced": 19, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_or_sequential_requests_are_not_coalesced():
+    upstream = SlowProvider(delay_s=0.0)
+    provider = CoalescingChatProvider(upstream)
+
+    await asyncio.gather(provider.generate(MESSAGES, "m", 0.0, 10), provider.generate(MESSAGES, "m", 0.0, 20))
+    await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    assert upstream.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared_by_all_waiters():
+    upstream = SlowProvider(error=UpstreamUnavailable("down"))
+    provider = CoalescingChatProvider(upstream)
+
+    results = await asyncio.gather(*(provider.generate(MESSAGES, "m", 0.0, 10) for _ in range(5)), return_exceptions=True)
+
+    assert upstream.calls == 1
+    assert all(isinstance(r, UpstreamUnavailable) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    upstream = SlowProvider(delay_s=0.05)
+    provider = CoalescingChatProvider(upstream)
+
+    leader = asyncio.create_task(provider.generate(MESSAGES, "m", 0.0, 10))
+    follower = asyncio.create_task(provider.generate(MESSAGES, "m", 0.0, 10))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    result = await follower
+
+    assert result["text"] == "call 1"
+    assert leader.cancelled()
+    assert upstream.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_when_every_waiter_leaves():
+    upstream = SlowProvider(delay_s=1.0)
+    provider = CoalescingChatProvider(upstream)
+
+    waiters = [asyncio.create_task(provider.generate(MESSAGES, "m", 0.0, 10)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    for w in waiters:
+        w.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert upstream.cancelled == 1
+    assert provider.stats()["in_flight"] == 0
+
+    # The key is free again: a new request starts a fresh call
+    upstream.delay_s = 0.0
+    assert (await provider.generate(MESSAGES, "m", 0.0, 10))["text"] == "call 2"
+
+
+@pytest.mark.asyncio
+async def test_identical_embeddings_requests_share_one_upstream_call():
+    upstream = CountingEmbeddings()
+    provider = CoalescingEmbeddingsProvider(upstream)
+
+    results = await asyncio.gather(*(provider.embed(["a", "b"], "e") for _ in range(4)), provider.embed(["b", "a"], "e"))
+
+    assert upstream.calls == 2
+    assert results[0]["embeddings"] == results[3]["embeddings"]
+    assert results[0]["embeddings"] is not results[1]["embeddings"]
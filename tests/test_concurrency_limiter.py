@@ -0,0 +1,109 @@
+import asyncio
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimiterRegistry
+from app.core.errors import Overloaded, UpstreamTimeout
+from app.main import create_app
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.limited_provider import ConcurrencyLimitedChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_load_with_retry_after():
+    limiters = ConcurrencyLimiterRegistry(initial_limit=1, max_queue=1)
+    provider = ConcurrencyLimitedChatProvider(inner=FakeChatProvider(latency_s=0.05), limiters=limiters)
+
+    results = await asyncio.gather(
+        *(provider.generate(MESSAGES, "m", 0.0, 10) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    rejected = [r for r in results if isinstance(r, Overloaded)]
+    assert len(rejected) == 1
+    assert rejected[0].retry_after_s is not None and rejected[0].retry_after_s >= 1.0
+    assert sum(isinstance(r, dict) for r in results) == 2
+
+    snapshot = limiters.snapshot()["fake/m"]
+    assert snapshot["in_flight"] == 0
+    assert snapshot["rejected"] == 1
+
+
+def test_limit_grows_when_fast_and_backs_off_when_slow():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, latency_tolerance=2.0, backoff=0.5)
+
+    for _ in range(50):
+        limiter.in_flight += 1
+        limiter.release(0.01)
+    grown = limiter.limit
+    assert grown > 10
+
+    limiter.in_flight += 1
+    limiter.release(0.5)
+    assert limiter.limit == pytest.approx(grown * 0.5)
+
+    limiter.in_flight += 1
+    limiter.release(None, overloaded=True)
+    assert limiter.limit == pytest.approx(grown * 0.25)
+
+
+def test_heavy_tailed_latency_without_congestion_keeps_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20)
+    rng = random.Random(0)
+
+    # Lognormal, mean ~50ms, sigma 0.5: many single calls are >2x the fastest
+    for _ in range(2000):
+        limiter.in_flight += 1
+        limiter.release(rng.lognormvariate(math.log(0.05) - 0.125, 0.5))
+
+    assert limiter.limit >= 20
+
+
+@pytest.mark.asyncio
+async def test_upstream_overload_shrinks_limit():
+    class TimingOutProvider(FakeChatProvider):
+        async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+            raise UpstreamTimeout()
+
+    limiters = ConcurrencyLimiterRegistry(initial_limit=10, backoff=0.5)
+    provider = ConcurrencyLimitedChatProvider(inner=TimingOutProvider(), limiters=limiters)
+
+    with pytest.raises(UpstreamTimeout):
+        await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    assert limiters.get("fake", "m").limit == pytest.approx(5.0)
+
+
+def test_overloaded_maps_to_503_with_retry_after_header():
+    app = create_app()
+
+    @app.get("/boom")
+    async def boom() -> dict:
+        raise Overloaded(retry_after_s=2.2)
+
+    client = TestClient(app)
+    response = client.get("/boom")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["error"]["code"] == "OVERLOADED"
+    assert response.json()["error"]["retryable"] is True
+
+
+def test_status_exposes_limiter_state():
+    app = create_app()
+    client = TestClient(app)
+
+    client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}], "model": "status-model"})
+    response = client.get("/v1/status")
+
+    assert response.status_code == 200
+    limiter = response.json()["limiters"]["fake/status-model"]
+    assert limiter["in_flight"] == 0
+    assert limiter["limit"] >= 1
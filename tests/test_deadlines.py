@@ -0,0 +1,265 @@
+import asyncio
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import deadline
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.errors import DeadlineExceeded, UpstreamRateLimited, UpstreamUnavailable
+from app.core.retry import Retrier, RetryBudget
+from app.core.singleflight import SingleFlight
+from app.main import create_app
+from app.providers.base import ChatProvider
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.retrying_provider import RetryingChatProvider
+from app.providers.routing import Backend, BackendPool, RoutingChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class FailingProvider(FakeChatProvider):
+    """Fails its first `failures` calls with `error`, then answers."""
+
+    def __init__(self, failures: int, error: Exception | None = None, name: str = "fake") -> None:
+        super().__init__()
+        self.name = name
+        self.failures = failures
+        self.error = error or UpstreamUnavailable()
+        self.calls = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+def _retrier(budget: RetryBudget | None = None, max_retries: int = 2) -> Retrier:
+    return Retrier(budget or RetryBudget(), max_retries=max_retries, backoff_base_s=0.001, backoff_max_s=0.002, rng=random.Random(0))
+
+
+def _with_deadline(timeout_s: float) -> None:
+    deadline.deadline_ctx.set(deadline.parse_timeout_ms(str(timeout_s * 1000.0)))
+
+
+def test_parse_timeout_header():
+    assert deadline.parse_timeout_ms(None) is None
+    assert deadline.parse_timeout_ms("soon") is None
+    assert deadline.parse_timeout_ms(None, default_ms=1000.0) is not None
+    capped = deadline.parse_timeout_ms("600000", max_ms=100.0)
+    assert capped is not None and deadline.parse_timeout_ms("50") <= capped <= deadline.parse_timeout_ms("150")
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    upstream = FailingProvider(failures=2)
+    retrier = _retrier()
+
+    result = await RetryingChatProvider(upstream, retrier).generate(MESSAGES, "m", 0.0, 10)
+
+    assert result["text"].startswith("echo:")
+    assert upstream.calls == 3
+    assert retrier.stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_max_retries():
+    upstream = FailingProvider(failures=5)
+    retrier = _retrier(max_retries=1)
+
+    with pytest.raises(UpstreamUnavailable):
+        await RetryingChatProvider(upstream, retrier).generate(MESSAGES, "m", 0.0, 10)
+
+    assert upstream.calls == 2
+    assert retrier.stats()["gave_up"]["max_retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_caps_retries_across_requests():
+    budget = RetryBudget(ratio=0.0, min_per_s=0.0, max_burst=3.0)
+    retrier = _retrier(budget)
+    upstream = FailingProvider(failures=100)
+    provider = RetryingChatProvider(upstream, retrier)
+
+    for _ in range(5):
+        with pytest.raises(UpstreamUnavailable):
+            await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    assert retrier.stats()["retries"] == 3
+    assert upstream.calls == 5 + 3
+    assert budget.stats()["exhausted"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_no_retry_when_backoff_would_outlive_the_deadline():
+    upstream = FailingProvider(failures=1, error=UpstreamRateLimited(retry_after_s=5.0))
+    retrier = _retrier()
+    _with_deadline(1.0)
+
+    with pytest.raises(UpstreamRateLimited):
+        await RetryingChatProvider(upstream, retrier).generate(MESSAGES, "m", 0.0, 10)
+
+    assert upstream.calls == 1
+    assert retrier.stats()["gave_up"]["deadline"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_failover_spends_the_retry_budget():
+    broken = FailingProvider(failures=100, name="broken")
+    healthy = FailingProvider(failures=0, name="healthy")
+    budget = RetryBudget(ratio=0.0, min_per_s=0.0, max_burst=1.0)
+    pool: BackendPool[ChatProvider] = BackendPool(
+        [Backend(p.name, p, CircuitBreaker(100, 30.0)) for p in (broken, healthy)],
+        rng=random.Random(0),
+        retry_budget=budget,
+    )
+    # Only the broken backend is healthy-looking at first
+    pool.backends[1].ewma_latency_s = 10.0
+    router = RoutingChatProvider(pool)
+
+    await router.generate(MESSAGES, "m", 0.0, 10)
+    with pytest.raises(UpstreamUnavailable):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+
+    assert healthy.calls == 1
+    assert budget.stats()["spent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bounded_raises_deadline_exceeded():
+    _with_deadline(0.02)
+
+    with pytest.raises(DeadlineExceeded):
+        async with deadline.bounded():
+            await asyncio.sleep(1.0)
+
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+@pytest.mark.asyncio
+async def test_detached_tasks_ignore_the_callers_deadline():
+    _with_deadline(0.01)
+
+    async def outlives_the_caller() -> bool:
+        await asyncio.sleep(0.03)
+        async with deadline.bounded():
+            return True
+
+    task = asyncio.get_running_loop().create_task(outlives_the_caller(), context=deadline.detached())
+
+    assert await task
+    assert deadline.expired()
+
+
+def test_expired_header_is_rejected_before_the_provider():
+    client = TestClient(create_app())
+
+    response = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers={"X-Request-Timeout-ms": "0"})
+
+    assert response.status_code == 504
+    assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+
+
+def test_slow_upstream_is_cut_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "chat_cache_enabled", False)
+    client = TestClient(create_app(upstreams=[("slow", FakeChatProvider(latency_s=1.0), FakeEmbeddingsProvider())]))
+
+    response = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers={"X-Request-Timeout-ms": "50"})
+    fast = client.post("/v1/embeddings", json={"input": "hi"}, headers={"X-Request-Timeout-ms": "5000"})
+
+    assert response.status_code == 504
+    assert response.json()["error"]["code"] == "DEADLINE_EXCEEDED"
+    assert response.elapsed.total_seconds() < 0.5
+    assert fast.status_code == 200
+
+
+class DeadlineRecordingChat(FakeChatProvider):
+    def __init__(self, error: Exception | None = None) -> None:
+        super().__init__()
+        self.error = error
+        self.remaining: list[float | None] = []
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.remaining.append(deadline.remaining_s())
+        if self.error is not None:
+            raise self.error
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+class DeadlineRecordingEmbeddings(FakeEmbeddingsProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.remaining: list[float | None] = []
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.remaining.append(deadline.remaining_s())
+        return await super().embed(inputs, model)
+
+
+def test_shared_deadline_is_the_latest_of_its_requests():
+    shared = deadline.SharedDeadline()
+    for at in (5.0, 9.0, 7.0):
+        deadline.deadline_ctx.set(at)
+        shared.join()
+    assert shared.at == 9.0
+
+    nested = deadline.SharedDeadline()
+    deadline.deadline_ctx.set(shared)
+    nested.join()
+    deadline.deadline_ctx.set(12.0)
+    shared.join()
+    assert nested.at == 12.0
+
+    deadline.deadline_ctx.set(None)
+    shared.join()
+    assert shared.at is None and nested.at is None
+
+
+@pytest.mark.asyncio
+async def test_coalesced_call_runs_until_the_latest_callers_deadline():
+    flight: SingleFlight[float | None] = SingleFlight()
+
+    async def call() -> float | None:
+        await asyncio.sleep(0.01)
+        return deadline.current()
+
+    async def caller(timeout_s: float) -> float | None:
+        _with_deadline(timeout_s)
+        return await flight.do("k", call)
+
+    first, second = await asyncio.gather(caller(1.0), caller(5.0))
+
+    # The shared call ran under the later caller's deadline, not the first caller's
+    assert first == second
+    assert first is not None and first - time.monotonic() > 4.0
+
+
+def test_upstream_calls_see_the_request_deadline_with_default_settings():
+    chat = DeadlineRecordingChat()
+    embeddings = DeadlineRecordingEmbeddings()
+    client = TestClient(create_app(upstreams=[("east", chat, embeddings)]))
+    headers = {"X-Request-Timeout-ms": "5000"}
+
+    assert client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers=headers).status_code == 200
+    assert client.post("/v1/embeddings", json={"input": ["a", "bb"]}, headers=headers).status_code == 200
+
+    assert len(chat.remaining) == 1 and 0 < chat.remaining[0] <= 5.0
+    assert len(embeddings.remaining) == 1 and 0 < embeddings.remaining[0] <= 5.0
+
+
+def test_retry_is_skipped_when_the_backoff_would_pass_the_deadline():
+    chat = DeadlineRecordingChat(error=UpstreamRateLimited(retry_after_s=10.0))
+    client = TestClient(create_app(upstreams=[("east", chat, FakeEmbeddingsProvider())]))
+
+    response = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "hi"}]}, headers={"X-Request-Timeout-ms": "2000"})
+
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "UPSTREAM_RATE_LIMITED"
+    assert len(chat.remaining) == 1
+    assert client.get("/v1/status").json()["retries"]["gave_up"]["deadline"] == 1
@@ -0,0 +1,127 @@
+import subprocess
+import sys
+from array import array
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.embedding_store import EmbeddingStore
+from app.main import create_app
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+from app.providers.stored_embeddings_provider import StoredEmbeddingsProvider
+
+MB = 1024 * 1024
+
+
+class CountingEmbeddings(FakeEmbeddingsProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[list[str]] = []
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.calls.append(inputs)
+        return await super().embed(inputs, model)
+
+
+def _vector(i: int, dim: int = 8) -> array:
+    return array("f", [float(i + d) for d in range(dim)])
+
+
+def test_vectors_survive_reopening(tmp_path):
+    store = EmbeddingStore(tmp_path, max_bytes=MB)
+    assert store.put_many([(store.key("m", "a"), _vector(1)), (store.key("m", "b"), [0.5, 0.25])]) == 2
+    assert store.put_many([(store.key("m", "a"), _vector(9))]) == 0
+    store.close()
+
+    reopened = EmbeddingStore(tmp_path, max_bytes=MB)
+
+    view = reopened.get(reopened.key("m", "a"))
+    assert isinstance(view, memoryview) and view.tolist() == _vector(1).tolist()
+    assert reopened.get(reopened.key("m", "b")).tolist() == [0.5, 0.25]
+    assert reopened.get(reopened.key("other-model", "a")) is None
+    assert reopened.stats()["entries"] == 2
+
+
+def test_index_grows_past_its_initial_capacity(tmp_path):
+    store = EmbeddingStore(tmp_path, max_bytes=MB, initial_capacity=8)
+
+    for start in range(0, 100, 10):
+        store.put_many([(store.key("m", str(i)), _vector(i)) for i in range(start, start + 10)])
+
+    assert store.stats()["capacity"] >= 128
+    assert all(store.get(store.key("m", str(i))).tolist() == _vector(i).tolist() for i in range(100))
+
+
+def test_compaction_keeps_the_newest_vectors_within_max_bytes(tmp_path):
+    record_bytes = 24 + 4 * 256
+    store = EmbeddingStore(tmp_path, max_bytes=100 * record_bytes)
+    other_worker = EmbeddingStore(tmp_path, max_bytes=100 * record_bytes)
+
+    for start in range(0, 200, 20):
+        store.put_many([(store.key("m", str(i)), _vector(i, 256)) for i in range(start, start + 20)])
+
+    stats = store.stats()
+    assert stats["compactions"] >= 1
+    assert stats["data_bytes"] <= 100 * record_bytes
+    assert store.get(store.key("m", "0")) is None
+    assert store.get(store.key("m", "199")).tolist() == _vector(199, 256).tolist()
+    # Another handle on the same files picks up the compacted files on its next read
+    assert other_worker.get(other_worker.key("m", "199")).tolist() == _vector(199, 256).tolist()
+
+
+def test_unreadable_files_start_an_empty_store(tmp_path):
+    (tmp_path / "vectors.bin").write_bytes(b"garbage")
+    (tmp_path / "index.bin").write_bytes(b"garbage")
+
+    store = EmbeddingStore(tmp_path, max_bytes=MB)
+
+    assert store.stats()["entries"] == 0
+    assert store.put_many([(store.key("m", "a"), _vector(1))]) == 1
+
+
+def test_vectors_written_by_another_process_are_visible(tmp_path):
+    store = EmbeddingStore(tmp_path, max_bytes=MB)
+    store.get(store.key("m", "warm"))  # maps the data file before the other process appends
+
+    script = (
+        "import sys; from array import array; from app.core.embedding_store import EmbeddingStore;"
+        "s = EmbeddingStore(sys.argv[1], max_bytes=2**20);"
+        "s.put_many([(s.key('m', str(i)), array('f', [float(i)] * 4)) for i in range(50)])"
+    )
+    subprocess.run([sys.executable, "-c", script, str(tmp_path)], check=True)
+
+    assert store.get(store.key("m", "49")).tolist() == [49.0] * 4
+
+
+@pytest.mark.asyncio
+async def test_provider_serves_stored_vectors_after_a_restart(tmp_path):
+    upstream = CountingEmbeddings()
+    provider = StoredEmbeddingsProvider(inner=upstream, store=EmbeddingStore(tmp_path, max_bytes=MB))
+
+    first = await provider.embed(["a", "bb", "a"], model="m")
+    await provider.flush()
+    provider.store.close()
+
+    restarted = StoredEmbeddingsProvider(inner=upstream, store=EmbeddingStore(tmp_path, max_bytes=MB))
+    second = await restarted.embed(["bb", "a", "ccc"], model="m")
+
+    assert upstream.calls == [["a", "bb"], ["ccc"]]
+    assert first["embeddings"][2] == [1.0, 2.0, 3.0, 4.0]
+    assert [list(v) for v in second["embeddings"]] == [[2.0, 3.0, 4.0, 5.0], [1.0, 2.0, 3.0, 4.0], [3.0, 4.0, 5.0, 6.0]]
+    assert restarted.stats()["hits"] == 2
+
+
+def test_endpoint_uses_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "embed_store_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "embed_cache_enabled", False)
+
+    with TestClient(create_app()) as client:
+        client.post("/v1/embeddings", json={"input": ["a", "abc"], "model": "test-embed-model"})
+    with TestClient(create_app()) as client:
+        response = client.post("/v1/embeddings", json={"input": ["a", "abc"], "model": "test-embed-model"})
+        status = client.get("/v1/status").json()["embed_store"]
+
+    assert response.json()["embeddings"] == [[1.0, 2.0, 3.0, 4.0], [3.0, 4.0, 5.0, 6.0]]
+    assert response.json()["usage"] == {"total_tokens": 0}
+    assert status["entries"] == 2 and status["hits"] == 2
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.errors import BadUpstreamResponse, UpstreamTimeout
+from app.main import create_app
+from app.providers.batching_embeddings_provider import BatchingEmbeddingsProvider
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+
+
+class ScriptedEmbeddingsProvider(FakeEmbeddingsProvider):
+    def __init__(self, fail_on: str | None = None, error: Exception | None = None) -> None:
+        super().__init__()
+        self.calls: list[list[str]] = []
+        self.fail_on = fail_on
+        self.error = error
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.calls.append(list(inputs))
+        if self.fail_on is not None and self.fail_on in inputs and self.error is not None:
+            raise self.error
+        return await super().embed(inputs, model)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_upstream_call():
+    upstream = ScriptedEmbeddingsProvider()
+    provider = BatchingEmbeddingsProvider(inner=upstream, window_ms=20)
+
+    results = await asyncio.gather(
+        provider.embed(["a"], model="m"),
+        provider.embed(["bb", "ccc"], model="m"),
+        provider.embed(["dddd"], model="m"),
+    )
+
+    assert upstream.calls == [["a", "bb", "ccc", "dddd"]]
+    assert results[0]["embeddings"] == [[1.0, 2.0, 3.0, 4.0]]
+    assert results[1]["embeddings"] == [[2.0, 3.0, 4.0, 5.0], [3.0, 4.0, 5.0, 6.0]]
+    assert results[2]["embeddings"] == [[4.0, 5.0, 6.0, 7.0]]
+
+
+@pytest.mark.asyncio
+async def test_batches_are_split_by_model_and_size():
+    upstream = ScriptedEmbeddingsProvider()
+    provider = BatchingEmbeddingsProvider(inner=upstream, window_ms=20, max_batch_size=2)
+
+    await asyncio.gather(
+        provider.embed(["a"], model="m1"),
+        provider.embed(["b"], model="m2"),
+        provider.embed(["c"], model="m1"),
+        provider.embed(["d"], model="m1"),
+    )
+
+    assert sorted(upstream.calls) == [["a", "c"], ["b"], ["d"]]
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_batch_failure_is_isolated_per_request():
+    upstream = ScriptedEmbeddingsProvider(fail_on="bad", error=BadUpstreamResponse("bad input"))
+    provider = BatchingEmbeddingsProvider(inner=upstream, window_ms=20)
+
+    good, bad = await asyncio.gather(
+        provider.embed(["good"], model="m"),
+        provider.embed(["bad"], model="m"),
+        return_exceptions=True,
+    )
+
+    assert isinstance(good, dict)
+    assert good["embeddings"] == [[4.0, 5.0, 6.0, 7.0]]
+    assert isinstance(bad, BadUpstreamResponse)
+
+
+@pytest.mark.asyncio
+async def test_retryable_batch_failure_reaches_every_waiter():
+    upstream = ScriptedEmbeddingsProvider(fail_on="a", error=UpstreamTimeout())
+    provider = BatchingEmbeddingsProvider(inner=upstream, window_ms=20)
+
+    results = await asyncio.gather(
+        provider.embed(["a"], model="m"),
+        provider.embed(["b"], model="m"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, UpstreamTimeout) for r in results)
+    assert len(upstream.calls) == 1
+
+
+def test_batching_counters_are_listed_in_status(monkeypatch):
+    monkeypatch.setattr(settings, "embed_cache_enabled", False)
+    client = TestClient(create_app())
+
+    client.post("/v1/embeddings", json={"input": ["a"], "model": "test-embed-model"})
+    stats = client.get("/v1/status").json()["embed_batching"]
+
+    assert stats == {"upstream_calls": 1, "batched_requests": 1}
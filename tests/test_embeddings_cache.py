@@ -0,0 +1,72 @@
+from array import array
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import EmbeddingCache
+from app.main import create_app
+from app.providers.cached_embeddings_provider import CachingEmbeddingsProvider
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+
+
+class RecordingEmbeddingsProvider(FakeEmbeddingsProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[list[str]] = []
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.calls.append(list(inputs))
+        return await super().embed(inputs, model)
+
+
+@pytest.mark.asyncio
+async def test_only_misses_go_upstream_and_order_is_preserved():
+    upstream = RecordingEmbeddingsProvider()
+    provider = CachingEmbeddingsProvider(inner=upstream, cache=EmbeddingCache(max_bytes=1 << 20))
+
+    await provider.embed(["a", "bb"], model="m")
+    result = await provider.embed(["ccc", "a", "ccc", "bb"], model="m")
+
+    assert upstream.calls == [["a", "bb"], ["ccc"]]
+    assert [list(v) for v in result["embeddings"]] == [
+        [3.0, 4.0, 5.0, 6.0],
+        [1.0, 2.0, 3.0, 4.0],
+        [3.0, 4.0, 5.0, 6.0],
+        [2.0, 3.0, 4.0, 5.0],
+    ]
+    assert provider.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_full_hit_skips_upstream_and_is_keyed_by_model():
+    upstream = RecordingEmbeddingsProvider()
+    provider = CachingEmbeddingsProvider(inner=upstream, cache=EmbeddingCache(max_bytes=1 << 20))
+
+    await provider.embed(["a"], model="m1")
+    hit = await provider.embed(["a"], model="m1")
+    await provider.embed(["a"], model="m2")
+
+    assert hit["usage"] == {"total_tokens": 0}
+    assert upstream.calls == [["a"], ["a"]]
+
+
+def test_embedding_cache_evicts_past_memory_cap():
+    entry_bytes = 4 * 4 + EmbeddingCache.ENTRY_OVERHEAD_BYTES
+    cache = EmbeddingCache(max_bytes=2 * entry_bytes)
+
+    for text in ("a", "b", "c"):
+        cache.put(cache.key("m", text), array("f", [0.0, 1.0, 2.0, 3.0]))
+
+    assert len(cache) == 2
+    assert cache.size_bytes <= cache.max_bytes
+    assert cache.get(cache.key("m", "a")) is None
+
+
+def test_cache_counters_are_listed_in_status():
+    client = TestClient(create_app())
+
+    client.post("/v1/embeddings", json={"input": ["a", "bb"], "model": "test-embed-model"})
+    client.post("/v1/embeddings", json={"input": ["bb", "ccc"], "model": "test-embed-model"})
+    stats = client.get("/v1/status").json()["embed_cache"]
+
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
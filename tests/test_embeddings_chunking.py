@@ -0,0 +1,60 @@
+import pytest
+
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+from app.schemas.embed import EmbeddingsRequest
+from app.services.embed_service import EmbeddingsService
+
+
+class ConcurrencyTrackingProvider(FakeEmbeddingsProvider):
+    def __init__(self) -> None:
+        super().__init__(latency_s=0.01)
+        self.calls: list[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        self.calls.append(len(inputs))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            result = await super().embed(inputs, model)
+        finally:
+            self.in_flight -= 1
+        result["usage"] = {"total_tokens": len(inputs)}
+        return result
+
+
+@pytest.mark.asyncio
+async def test_large_batch_is_chunked_concurrently_and_reassembled_in_order():
+    provider = ConcurrencyTrackingProvider()
+    service = EmbeddingsService(provider=provider, max_chunk_size=3, chunk_concurrency=2)
+
+    texts = ["x" * n for n in range(1, 11)]
+    response = await service.embed(EmbeddingsRequest(input=texts, model="m"))
+
+    assert provider.calls == [3, 3, 3, 1]
+    assert provider.max_in_flight == 2
+    assert [v[0] for v in response.embeddings] == [float(n) for n in range(1, 11)]
+    assert response.usage is not None
+    assert response.usage.total_tokens == 10
+
+
+@pytest.mark.asyncio
+async def test_chunks_respect_token_budget():
+    provider = ConcurrencyTrackingProvider()
+    service = EmbeddingsService(provider=provider, max_chunk_size=100, max_chunk_tokens=10)
+
+    # Each 20-char text is estimated at 6 tokens, so only one fits per chunk
+    await service.embed(EmbeddingsRequest(input=["y" * 20] * 3, model="m"))
+
+    assert provider.calls == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_small_batch_is_a_single_call():
+    provider = ConcurrencyTrackingProvider()
+    service = EmbeddingsService(provider=provider, max_chunk_size=3)
+
+    await service.embed(EmbeddingsRequest(input=["a", "b"], model="m"))
+
+    assert provider.calls == [2]
@@ -0,0 +1,43 @@
+import base64
+import struct
+
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+
+
+def test_base64_encoding_returns_little_endian_float32():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {"input": ["ab"], "model": "test-embed-model", "encoding_format": "base64"}
+
+    response = client.post("/v1/embeddings", json=payload)
+
+    assert response.status_code == 200
+    encoded = response.json()["embeddings"][0]
+    assert isinstance(encoded, str)
+    assert struct.unpack("<4f", base64.b64decode(encoded)) == (2.0, 3.0, 4.0, 5.0)
+
+
+def test_binary_encoding_returns_npy_matrix():
+    app = create_app()
+    client = TestClient(app)
+
+    payload = {"input": ["a", "abc"], "model": "test-embed-model", "encoding_format": "binary"}
+
+    response = client.post("/v1/embeddings", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["X-Embeddings-Model"] == "test-embed-model"
+
+    body = response.content
+    assert body[:6] == b"\x93NUMPY"
+    header_len = int.from_bytes(body[8:10], "little")
+    header = body[10:10 + header_len].decode("latin1")
+    assert "'shape': (2, 4)" in header
+    assert (10 + header_len) % 64 == 0
+
+    data = struct.unpack("<8f", body[10 + header_len:])
+    assert data == (1.0, 2.0, 3.0, 4.0, 3.0, 4.0, 5.0, 6.0)
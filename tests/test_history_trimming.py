@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.history import TRUNCATION_MARKER, HistoryTrimmer
+from app.core.tokens import TokenCounter
+from app.main import create_app
+from app.providers.fake_provider import FakeChatProvider
+from app.schemas.chat import ChatMessage, ChatRequest
+from app.services.chat_service import ChatService
+
+TURN = " word" * 500  # 500 tokens
+
+
+class RecordingChat(FakeChatProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.sent: list[list[ChatMessage]] = []
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.sent.append(messages)
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+def _conversation(turns: int) -> list[ChatMessage]:
+    messages = [ChatMessage(role="system", content="You are a helpful assistant.")]
+    for i in range(turns):
+        messages.append(ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"turn {i}" + TURN))
+    return messages
+
+
+def test_short_conversations_are_untouched():
+    trimmer = HistoryTrimmer(TokenCounter(), budget_tokens=8_000)
+    messages = _conversation(4)
+
+    trimmed, report = trimmer.trim(messages, "gpt-4o", 256)
+
+    assert trimmed is messages
+    assert report is None
+
+
+def test_keeps_system_and_latest_turns_and_truncates_the_boundary_turn():
+    counter = TokenCounter()
+    trimmer = HistoryTrimmer(counter, budget_tokens=1_800)
+    messages = _conversation(10)
+
+    trimmed, report = trimmer.trim(messages, "gpt-4o", 256)
+
+    assert trimmed[0] == messages[0]
+    assert trimmed[-3:] == messages[-3:]
+    assert trimmed[1].content.startswith(TRUNCATION_MARKER)
+    assert trimmed[1].content.endswith(messages[-4].content[-100:])
+    assert report is not None
+    assert report.dropped_messages == 6 and report.truncated_messages == 1
+    assert report.input_tokens_after == counter.count_chat(trimmed, "gpt-4o") <= 1_800
+    assert trimmer.stats()["tokens_removed"] == report.input_tokens_before - report.input_tokens_after
+
+
+def test_budget_is_per_model_prefix_and_capped_by_the_context_window():
+    trimmer = HistoryTrimmer(TokenCounter(), budget_tokens=8_000, model_budgets={"gpt-4o": 2_000, "gpt-4o-mini": 1_000})
+
+    assert trimmer.budget("gpt-4o-2024-08-06", 256) == 2_000
+    assert trimmer.budget("gpt-4o-mini", 256) == 1_000
+    assert trimmer.budget("gpt-4-0613", 1_000) == 7_192
+    assert trimmer.budget("test-model", 256) == 8_000
+
+
+@pytest.mark.asyncio
+async def test_trimmed_prompt_fits_where_the_untrimmed_one_is_rejected():
+    upstream = RecordingChat()
+    counter = TokenCounter()
+    service = ChatService(provider=upstream, tokens=counter, trimmer=HistoryTrimmer(counter, budget_tokens=100_000))
+
+    messages = _conversation(30)
+
+    response = await service.chat(ChatRequest(messages=messages, model="gpt-4"))
+
+    assert response.trimmed is not None
+    assert response.trimmed.input_tokens_after <= 8_192 - 256
+    assert upstream.sent[0][0] == messages[0] and upstream.sent[0][-1] == messages[-1]
+
+
+def test_endpoint_reports_trimming(monkeypatch):
+    monkeypatch.setattr(settings, "chat_history_trim_enabled", True)
+    monkeypatch.setattr(settings, "chat_history_budget_tokens", 1_000)
+    client = TestClient(create_app())
+    messages = [m.model_dump() for m in _conversation(6)]
+
+    response = client.post("/v1/chat", json={"messages": messages, "model": "gpt-4o", "stream": True})
+    done = response.text.split("event: done\ndata: ")[1]
+
+    assert response.status_code == 200
+    assert '"dropped_messages":' in done
+    assert client.get("/v1/status").json()["history_trimming"]["requests_trimmed"] == 1
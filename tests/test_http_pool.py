@@ -0,0 +1,89 @@
+import asyncio
+import socket
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.core.config import settings
+from app.core.http import create_http_client, prewarm
+from app.main import create_app
+from app.providers.openai_embeddings_provider import OpenAIEmbeddingsProvider
+from app.providers.openai_provider import OpenAIChatProvider
+from app.schemas.chat import ChatMessage
+from benchmarks.stub_upstream import StubUpstream, make_server
+
+
+@pytest_asyncio.fixture
+async def stub() -> AsyncIterator[tuple[StubUpstream, str]]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    upstream = StubUpstream(latency_ms=1)
+    server = make_server(upstream, port)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    yield upstream, f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    await serving
+
+
+@pytest.mark.asyncio
+async def test_chat_and_embeddings_share_prewarmed_connections(stub: tuple[StubUpstream, str]):
+    upstream, base_url = stub
+    client = create_http_client(max_keepalive_connections=4)
+    chat = OpenAIChatProvider(api_key="x", base_url=base_url, http_client=client)
+    embeddings = OpenAIEmbeddingsProvider(api_key="x", base_url=base_url, http_client=client)
+
+    report = await prewarm(client, [base_url, base_url + "/embeddings"], connections=4)
+    assert report == {"origins": [base_url.removesuffix("v1")], "opened": 4, "failed": 0}
+    assert len(upstream.stats.connections) == 4
+
+    await asyncio.gather(
+        *(chat.generate([ChatMessage(role="user", content="hi")], "m", 0.0, 8) for _ in range(2)),
+        *(embeddings.embed(["hi"], "e") for _ in range(2)),
+    )
+
+    assert upstream.stats.requests == 4
+    assert len(upstream.stats.connections) == 4
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_prewarm_failure_is_reported_not_raised():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+    client = create_http_client()
+
+    report = await prewarm(client, [f"http://127.0.0.1:{closed_port}/v1"], connections=2)
+
+    assert report["opened"] == 0
+    assert report["failed"] == 2
+    await client.aclose()
+
+
+def test_app_prewarms_openai_backends_and_closes_client(monkeypatch: pytest.MonkeyPatch):
+    calls: list[tuple[list[str], int]] = []
+
+    async def fake_prewarm(client: object, urls: list[str], connections: int) -> dict:
+        calls.append((urls, connections))
+        return {}
+
+    monkeypatch.setattr(main_module, "prewarm", fake_prewarm)
+    monkeypatch.setattr(settings, "openai_api_key", "x")
+    app = create_app()
+
+    chat_client = app.state.chat_service.provider
+    while hasattr(chat_client, "inner"):
+        chat_client = chat_client.inner
+    assert chat_client.client._client is app.state.http_client
+
+    with TestClient(app):
+        assert calls == [(["https://api.openai.com/v1/", "https://api.openai.com/v1/"], settings.http_prewarm_connections)]
+        assert not app.state.http_client.is_closed
+    assert app.state.http_client.is_closed
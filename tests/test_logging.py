@@ -0,0 +1,81 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.logging import DroppingQueueHandler, JsonFormatter, LogWriter, request_id_ctx
+from app.core.middleware import RequestContextMiddleware
+
+
+def _record(msg: str = "hello", **fields: object) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+    record.fields = fields
+    return record
+
+
+def test_formatter_output_is_json_with_static_fields():
+    formatter = JsonFormatter(static_fields={"env": "test"})
+
+    payload = json.loads(formatter.format(_record(path="/v1/chat")))
+
+    assert payload["msg"] == "hello"
+    assert payload["path"] == "/v1/chat"
+    assert payload["env"] == "test"
+    assert payload["ts"].endswith("+00:00")
+
+
+def test_queue_handler_drops_instead_of_blocking_and_keeps_request_id():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+
+    token = request_id_ctx.set("rid-1")
+    try:
+        for _ in range(5):
+            handler.handle(_record())
+    finally:
+        request_id_ctx.reset(token)
+
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 3
+
+    # Formatted on another thread, after the context var was reset
+    line = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert line["request_id"] == "rid-1"
+
+
+def test_writer_flushes_everything_queued_on_stop():
+    log_queue: queue.Queue = queue.Queue()
+    stream = io.StringIO()
+    writer = LogWriter(log_queue, stream, JsonFormatter())
+    handler = DroppingQueueHandler(log_queue)
+
+    writer.start()
+    for i in range(100):
+        handler.handle(_record(f"line {i}"))
+    writer.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["msg"] for line in lines] == [f"line {i}" for i in range(100)]
+
+
+@pytest.mark.parametrize("path, expected", [("/ok", 0), ("/fail", 1)])
+def test_sampled_access_log_always_keeps_errors(caplog: pytest.LogCaptureFixture, path: str, expected: int):
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    async def fail(request):
+        return PlainTextResponse("nope", status_code=500)
+
+    app = Starlette(routes=[Route("/ok", ok), Route("/fail", fail)])
+    client = TestClient(RequestContextMiddleware(app, access_log_sample_rate=0.0))
+
+    with caplog.at_level(logging.INFO, logger="app.core.middleware"):
+        client.get(path)
+
+    assert len([r for r in caplog.records if r.getMessage() == "request completed"]) == expected
@@ -0,0 +1,91 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.errors import UpstreamTimeout
+from app.core.metrics import GatewayMetrics, Histogram
+from app.main import create_app
+from app.providers.fake_embeddings_provider import FakeEmbeddingsProvider
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.metered_provider import MeteredChatProvider
+from app.schemas.chat import ChatMessage, ChatRequest
+from app.services.chat_service import ChatService
+
+
+def test_histogram_buckets_are_cumulative_in_exposition():
+    hist = Histogram("latency_seconds", "test", ("route",), buckets=(0.01, 0.1, 1.0))
+
+    for value in (0.005, 0.05, 0.05, 5.0):
+        hist.observe(value, ("/x",))
+
+    lines = hist.samples()
+    assert 'latency_seconds_bucket{route="/x",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/x"} 4' in lines
+
+
+def test_metrics_endpoint_reports_requests_latency_and_tokens():
+    client = TestClient(create_app())
+
+    payload = {"messages": [{"role": "user", "content": "hello"}], "model": "test-model", "temperature": 0.7}
+    assert client.post("v1/chat", json=payload).status_code == 200
+    client.get("v1/health")
+
+    body = client.get("v1/metrics").text
+
+    assert 'gateway_http_requests_total{route="/v1/chat",method="POST",status="200",code=""} 1' in body
+    assert 'gateway_http_request_duration_seconds_count{route="/v1/health",method="GET"} 1' in body
+    assert 'gateway_provider_request_duration_seconds_count{operation="chat",provider="fake",model="test-model"} 1' in body
+    assert 'gateway_provider_requests_in_flight{operation="chat",provider="fake",model="test-model"} 0' in body
+
+
+@pytest.mark.asyncio
+async def test_provider_errors_are_counted_by_code():
+    class TimeoutProvider(FakeChatProvider):
+        async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+            raise UpstreamTimeout()
+
+    metrics = GatewayMetrics()
+    service = ChatService(provider=MeteredChatProvider(TimeoutProvider(), metrics, backend="east"))
+
+    with pytest.raises(UpstreamTimeout):
+        await service.chat(ChatRequest(messages=[ChatMessage(role="user", content="hi")], model="m"))
+
+    assert metrics.provider_errors.value(("chat", "east", "m", "UPSTREAM_TIMEOUT")) == 1
+    assert metrics.provider_latency.count(("chat", "east", "m")) == 0
+
+
+@pytest.mark.asyncio
+async def test_token_usage_is_counted():
+    class UsageProvider(FakeChatProvider):
+        async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+            return {"text": "ok", "model": model, "usage": {"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}}
+
+    metrics = GatewayMetrics()
+    service = ChatService(provider=MeteredChatProvider(UsageProvider(), metrics, backend="east"))
+
+    for _ in range(2):
+        await service.chat(ChatRequest(messages=[ChatMessage(role="user", content="hi")], model="m"))
+
+    assert metrics.tokens.value(("chat", "east", "m", "input")) == 14
+    assert metrics.tokens.value(("chat", "east", "m", "output")) == 6
+    assert metrics.tokens.value(("chat", "east", "m", "total")) == 20
+
+
+def test_provider_metrics_are_per_backend_and_skip_cache_hits():
+    upstreams = [(name, FakeChatProvider(), FakeEmbeddingsProvider()) for name in ("east", "west")]
+    client = TestClient(create_app(upstreams=upstreams))
+
+    payload = {"messages": [{"role": "user", "content": "hello"}], "model": "test-model", "temperature": 0}
+    for _ in range(3):
+        assert client.post("v1/chat", json=payload).status_code == 200
+
+    body = client.get("v1/metrics").text
+
+    counts = {
+        backend: f'gateway_provider_request_duration_seconds_count{{operation="chat",provider="{backend}",model="test-model"}} 1' in body
+        for backend in ("east", "west")
+    }
+    assert sum(counts.values()) == 1
+    assert 'provider="router"' not in body
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from app.core.config import BackendConfig
+from app.providers import registry
+from app.providers.registry import create_providers, register_provider
+
+
+def _no_http_client() -> object:
+    raise AssertionError("fake backends must not build the HTTP client")
+
+
+def test_fake_backend_is_built_without_http_client():
+    chat, embeddings = create_providers(BackendConfig(name="local", kind="fake", latency_ms=5), _no_http_client)
+
+    assert (chat.name, embeddings.name) == ("local", "local")
+    assert chat.upstream_url is None
+
+
+def test_unknown_kind_is_rejected_with_known_kinds():
+    with pytest.raises(ValueError, match="'nope'.*fake, openai"):
+        create_providers(BackendConfig(name="x", kind="nope"), _no_http_client)
+
+
+def test_registered_kind_is_used(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(registry, "_FACTORIES", dict(registry._FACTORIES))
+    built = []
+
+    @register_provider("custom")
+    def custom(cfg: BackendConfig, http_client):
+        built.append(cfg.name)
+        return create_providers(BackendConfig(name=cfg.name, kind="fake"), http_client)
+
+    create_providers(BackendConfig(name="mine", kind="custom"), _no_http_client)
+    assert built == ["mine"]
+
+
+def test_fake_deployment_starts_without_importing_openai():
+    code = "import sys, app.main; app.main.create_app(); print(json.dumps(['openai' in sys.modules, 'httpx2' in sys.modules]))"
+    env = {"PROVIDER_BACKENDS": json.dumps([{"name": "fake", "kind": "fake"}]), "OPENAI_API_KEY": "", "PATH": ""}
+    out = subprocess.run([sys.executable, "-c", "import json; " + code], env=env, capture_output=True, text=True, check=True)
+
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == [False, False]
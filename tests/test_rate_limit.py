@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from app.core.errors import RateLimited, UpstreamRateLimited
+from app.core.rate_limit import ModelRateLimiter, RateLimiterRegistry, parse_rate_limit_headers
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.limited_provider import RateLimitedChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+@pytest.mark.asyncio
+async def test_request_beyond_max_wait_is_rejected_before_upstream():
+    limiter = ModelRateLimiter(rpm=60, max_wait_s=0.5)
+
+    await limiter.acquire(estimated_tokens=10)
+    limiter.requests.take(59)
+
+    with pytest.raises(RateLimited) as exc:
+        await limiter.acquire(estimated_tokens=10)
+
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after_s is not None and exc.value.retry_after_s > 0.5
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_request_within_max_wait_is_queued():
+    limiter = ModelRateLimiter(tpm=6000, max_wait_s=1.0)
+
+    await limiter.acquire(estimated_tokens=6000)
+    start = time.perf_counter()
+    await limiter.acquire(estimated_tokens=10)
+
+    # 10 tokens at 100 tokens/s
+    assert time.perf_counter() - start >= 0.09
+
+
+def test_token_estimate_is_corrected_from_real_usage():
+    limiter = ModelRateLimiter(tpm=1000)
+
+    limiter.tokens.take(300)
+    limiter.reconcile(estimated_tokens=300, actual_tokens=100)
+
+    assert limiter.tokens.tokens == pytest.approx(900, abs=1)
+
+
+def test_quota_is_learned_from_provider_headers():
+    limits = parse_rate_limit_headers({
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-remaining-requests": "3",
+        "x-ratelimit-limit-tokens": "20000",
+    })
+    assert limits == {"limit_requests": 500, "remaining_requests": 3, "limit_tokens": 20000, "remaining_tokens": None}
+    assert parse_rate_limit_headers({"content-type": "application/json"}) is None
+
+    limiter = ModelRateLimiter()
+    assert limits is not None
+    limiter.update_from_headers(limits)
+
+    assert limiter.requests.capacity == 500
+    assert limiter.requests.tokens == pytest.approx(3, abs=0.1)
+    assert limiter.tokens.capacity == 20000
+
+
+@pytest.mark.asyncio
+async def test_wrapper_applies_headers_and_drains_on_upstream_429():
+    class QuotaProvider(FakeChatProvider):
+        fail = False
+
+        async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+            if self.fail:
+                raise UpstreamRateLimited()
+            result = await super().generate(messages, model, temperature, max_output_tokens)
+            result["rate_limits"] = {"limit_requests": 100, "remaining_requests": 50, "limit_tokens": None, "remaining_tokens": None}
+            return result
+
+    upstream = QuotaProvider()
+    registry = RateLimiterRegistry(max_wait_s=0.0)
+    provider = RateLimitedChatProvider(inner=upstream, limiters=registry)
+
+    await provider.generate(MESSAGES, "m", 0.0, 10)
+    assert registry.snapshot()["fake/m"]["rpm"] == 100
+
+    upstream.fail = True
+    with pytest.raises(UpstreamRateLimited):
+        await provider.generate(MESSAGES, "m", 0.0, 10)
+
+    with pytest.raises(RateLimited):
+        await provider.generate(MESSAGES, "m", 0.0, 10)
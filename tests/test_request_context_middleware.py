@@ -28,3 +28,16 @@ def test_upstream_request_id_is_preserved():
 
     assert response.status_code == 200
     assert response.headers["X-Request-ID"] == custom_id
+
+
+def test_headers_present_on_streamed_response():
+    app = create_app()
+    client = TestClient(app)
+
+    with client.stream("POST", "v1/chat", json={"messages": [{"role": "user", "content": "hi"}], "stream": True}, headers={"X-Request-ID": "stream-id"}) as response:
+        body = response.read().decode()
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "stream-id"
+    assert "X-Response-Time-ms" in response.headers
+    assert "event: done" in body
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.errors import BadUpstreamResponse, Overloaded, UpstreamTimeout, UpstreamUnavailable
+from app.providers.base import ChatProvider
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.routing import Backend, BackendPool, RoutingChatProvider
+from app.schemas.chat import ChatMessage
+
+MESSAGES = [ChatMessage(role="user", content="hi")]
+
+
+class FlakyProvider(FakeChatProvider):
+    def __init__(self, name: str, latency_s: float = 0.0, error: Exception | None = None) -> None:
+        super().__init__(latency_s=latency_s)
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+def _router(*providers: FlakyProvider, threshold: int = 5, reset_s: float = 30.0) -> tuple[RoutingChatProvider, BackendPool[ChatProvider]]:
+    backends: list[Backend[ChatProvider]] = [Backend(p.name, p, CircuitBreaker(threshold, reset_s)) for p in providers]
+    pool = BackendPool(backends, rng=random.Random(0))
+    return RoutingChatProvider(pool), pool
+
+
+@pytest.mark.asyncio
+async def test_traffic_shifts_to_faster_backend():
+    fast = FlakyProvider("fast", latency_s=0.001)
+    slow = FlakyProvider("slow", latency_s=0.03)
+    router, _ = _router(fast, slow)
+
+    for _ in range(20):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+
+    assert fast.calls > slow.calls
+    assert slow.calls <= 3
+
+
+@pytest.mark.asyncio
+async def test_failover_on_upstream_timeout():
+    broken = FlakyProvider("broken", error=UpstreamTimeout())
+    healthy = FlakyProvider("healthy")
+    router, pool = _router(broken, healthy)
+
+    for _ in range(5):
+        result = await router.generate(MESSAGES, "m", 0.0, 10)
+        assert result["text"].startswith("echo:")
+
+    assert healthy.calls == 5
+    assert pool.snapshot()["broken"]["failures"] == broken.calls
+
+
+@pytest.mark.asyncio
+async def test_breaker_ejects_failing_backend_then_all_down_is_503():
+    broken = FlakyProvider("broken", error=UpstreamUnavailable())
+    healthy = FlakyProvider("healthy")
+    router, pool = _router(broken, healthy, threshold=2)
+
+    for _ in range(10):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+
+    assert broken.calls == 2
+    assert pool.snapshot()["broken"]["state"] == "open"
+
+    healthy.error = UpstreamUnavailable()
+    with pytest.raises(UpstreamUnavailable):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+
+
+@pytest.mark.asyncio
+async def test_local_load_shedding_fails_over_without_opening_breakers():
+    first = FlakyProvider("first", error=Overloaded())
+    second = FlakyProvider("second", error=Overloaded())
+    router, pool = _router(first, second, threshold=2)
+
+    for _ in range(6):
+        with pytest.raises(Overloaded):
+            await router.generate(MESSAGES, "m", 0.0, 10)
+
+    assert first.calls == second.calls == 6
+    assert {b["state"] for b in pool.snapshot().values()} == {"closed"}
+    assert {b["failures"] for b in pool.snapshot().values()} == {0}
+
+    first.error = second.error = None
+    result = await router.generate(MESSAGES, "m", 0.0, 10)
+    assert result["text"].startswith("echo:")
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_closes_breaker_on_success():
+    recovering = FlakyProvider("recovering", error=UpstreamTimeout())
+    router, pool = _router(recovering, threshold=1, reset_s=0.0)
+
+    with pytest.raises(UpstreamTimeout):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+    assert pool.snapshot()["recovering"]["state"] == "open"
+
+    recovering.error = None
+    await router.generate(MESSAGES, "m", 0.0, 10)
+    assert pool.snapshot()["recovering"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_non_failover_errors_are_not_retried_elsewhere():
+    bad = FlakyProvider("bad", error=BadUpstreamResponse("garbled"))
+    other = FlakyProvider("other", error=BadUpstreamResponse("garbled"))
+    router, _ = _router(bad, other)
+
+    with pytest.raises(BadUpstreamResponse):
+        await router.generate(MESSAGES, "m", 0.0, 10)
+
+    assert bad.calls + other.calls == 1
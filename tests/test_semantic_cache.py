@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import re
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import GatewayMetrics
+from app.core.semantic_index import SemanticIndex, normalized
+from app.main import create_app
+from app.providers.embeddings_base import EmbeddingsProvider
+from app.providers.fake_provider import FakeChatProvider
+from app.providers.semantic_cache_provider import SemanticCachingChatProvider
+from app.schemas.chat import ChatMessage
+
+SYNONYMS = {"whats": "what", "is": "", "your": "", "the": ""}
+
+
+class BagOfWordsEmbeddings(EmbeddingsProvider):
+    """Hashed bag of words, so prompts sharing their words embed close together."""
+
+    name = "bow"
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+
+    async def embed(self, inputs: list[str], model: str) -> dict:
+        if self.fail:
+            raise RuntimeError("embeddings down")
+        vectors = []
+        for text in inputs:
+            vector = [0.0] * 64
+            for word in re.findall(r"\w+", text.lower()):
+                word = SYNONYMS.get(word, word)
+                if word:
+                    vector[zlib.crc32(word.encode()) % 64] += 1.0
+            vectors.append(vector)
+        return {"embeddings": vectors, "model": model, "usage": None}
+
+
+class CountingChat(FakeChatProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+def _provider(upstream: CountingChat, embeddings: EmbeddingsProvider | None = None, **kwargs) -> SemanticCachingChatProvider:
+    return SemanticCachingChatProvider(
+        inner=upstream,
+        embeddings=embeddings or BagOfWordsEmbeddings(),
+        index=SemanticIndex(max_bytes=1024 * 1024),
+        embed_model="e",
+        **kwargs,
+    )
+
+
+def _ask(text: str, system: str | None = None) -> list[ChatMessage]:
+    messages = [ChatMessage(role="system", content=system)] if system else []
+    return [*messages, ChatMessage(role="user", content=text)]
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_prompt_is_served_from_cache():
+    upstream = CountingChat()
+    metrics = GatewayMetrics()
+    provider = _provider(upstream, metrics=metrics)
+
+    first = await provider.generate(_ask("whats the refund policy"), "m", 0.0, 64)
+    second = await provider.generate(_ask("What is your refund policy?"), "m", 0.0, 64)
+
+    assert upstream.calls == 1
+    assert second == {**first, "cached": True}
+    assert provider.stats()["hit_rate"] == 0.5
+    assert metrics.semantic_cache_lookups.value(("m", "hit")) == 1
+    assert metrics.semantic_cache_latency.count(("search",)) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_partitioned_by_model_and_system_prompt():
+    upstream = CountingChat()
+    provider = _provider(upstream)
+
+    await provider.generate(_ask("refund policy", system="You are terse."), "m", 0.0, 64)
+    await provider.generate(_ask("refund policy", system="You are verbose."), "m", 0.0, 64)
+    await provider.generate(_ask("refund policy", system="You are terse."), "other", 0.0, 64)
+    await provider.generate(_ask("refund policy", system="You are terse."), "m", 0.0, 128)
+
+    assert upstream.calls == 4
+    assert provider.stats()["index"]["partitions"] == 4
+
+
+@pytest.mark.asyncio
+async def test_dissimilar_prompt_misses_below_threshold():
+    upstream = CountingChat()
+    provider = _provider(upstream, threshold=0.9)
+
+    await provider.generate(_ask("refund policy"), "m", 0.0, 64)
+    result = await provider.generate(_ask("shipping policy"), "m", 0.0, 64)
+
+    assert upstream.calls == 2
+    assert "cached" not in result
+
+
+@pytest.mark.asyncio
+async def test_multi_turn_and_sampled_requests_bypass():
+    upstream = CountingChat()
+    provider = _provider(upstream)
+    dialogue = [
+        ChatMessage(role="user", content="refund policy"),
+        ChatMessage(role="assistant", content="30 days"),
+        ChatMessage(role="user", content="refund policy"),
+    ]
+
+    await provider.generate(dialogue, "m", 0.0, 64)
+    await provider.generate(dialogue, "m", 0.0, 64)
+    await provider.generate(_ask("refund policy"), "m", 0.7, 64)
+
+    assert upstream.calls == 3
+    assert provider.stats()["bypassed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_embedding_failure_falls_through_to_upstream(caplog: pytest.LogCaptureFixture):
+    upstream = CountingChat()
+    provider = _provider(upstream, embeddings=BagOfWordsEmbeddings(fail=True))
+
+    with caplog.at_level(logging.WARNING, logger="app.providers.semantic_cache_provider"):
+        result = await provider.generate(_ask("refund policy"), "m", 0.0, 64)
+
+    assert result["text"] == "echo: refund policy"
+    assert provider.stats()["errors"] == 1
+    assert len(provider.index) == 0
+    [record] = [r for r in caplog.records if r.getMessage() == "semantic cache embedding failed"]
+    assert record.fields == {"model": "e"}
+
+
+@pytest.mark.asyncio
+async def test_completed_stream_is_cached():
+    upstream = CountingChat()
+    provider = _provider(upstream)
+
+    chunks = [chunk async for chunk in provider.stream(_ask("whats the refund policy"), "m", 0.0, 64)]
+    cached = [chunk async for chunk in provider.stream(_ask("what is the refund policy"), "m", 0.0, 64)]
+
+    assert cached == [{"text": "".join(c["text"] for c in chunks), "model": "m", "usage": chunks[-1]["usage"], "cached": True}]
+
+
+def test_index_evicts_least_recently_used_past_memory_cap():
+    vectors = [normalized(v) for v in np.eye(4, dtype=np.float32)]
+    entry_size = 16 + SemanticIndex.ENTRY_OVERHEAD_BYTES + 1
+    index = SemanticIndex(max_bytes=3 * entry_size)
+
+    for i, v in enumerate(vectors[:3]):
+        index.add("p", v, {"text": str(i)})
+    assert index.search("p", vectors[0], 0.99) == ({"text": "0"}, 1.0)
+    index.add("p", vectors[3], {"text": "3"})
+
+    assert index.search("p", vectors[1], 0.99) is None
+    assert [index.search("p", vectors[i], 0.99) for i in (0, 2, 3)] == [({"text": str(i)}, 1.0) for i in (0, 2, 3)]
+    assert index.stats()["evictions"] == 1
+    assert index.size_bytes == 3 * entry_size
+
+
+def test_approximate_index_finds_nearest_neighbour():
+    rng = np.random.default_rng(7)
+    points = rng.normal(size=(2000, 32)).astype(np.float32)
+    index = SemanticIndex(max_bytes=1 << 30, ann_min_rows=500, nprobe=8)
+    for i, point in enumerate(points):
+        index.add("p", normalized(point), {"text": str(i)})
+
+    assert index.stats()["approximate_partitions"] == 1
+    found = 0
+    for i in rng.choice(len(points), size=50, replace=False):
+        query = normalized(points[i] + rng.normal(scale=0.05, size=32).astype(np.float32))
+        hit = index.search("p", query, 0.9)
+        found += hit is not None and hit[0]["text"] == str(i)
+    assert found >= 45
+
+
+def test_app_wires_semantic_cache_when_enabled(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", True)
+    monkeypatch.setattr(settings, "chat_cache_enabled", False)
+    client = TestClient(create_app())
+
+    payload = {"messages": [{"role": "user", "content": "hello"}], "temperature": 0}
+    client.post("/v1/chat", json=payload)
+    response = client.post("/v1/chat", json=payload)
+
+    assert response.json()["cached"] is True
+    assert client.get("/v1/status").json()["semantic_cache"]["hits"] == 1
+    assert 'gateway_semantic_cache_lookups_total{model="gpt-o-mini",result="hit"} 1' in client.get("/v1/metrics").text
+
+
+@pytest.mark.asyncio
+async def test_approximate_index_trains_off_the_event_loop():
+    rng = np.random.default_rng(3)
+    points = rng.normal(size=(300, 16)).astype(np.float32)
+    index = SemanticIndex(max_bytes=1 << 30, ann_min_rows=200)
+    for i, point in enumerate(points[:250]):
+        index.add("p", normalized(point), {"text": str(i)})
+
+    # Still exact while k-means runs in the executor; rows added meanwhile are assigned on install
+    assert index.stats()["approximate_partitions"] == 0
+    for i, point in enumerate(points[250:], start=250):
+        index.add("p", normalized(point), {"text": str(i)})
+    while not index.stats()["approximate_partitions"]:
+        await asyncio.sleep(0.01)
+
+    assert index.search("p", normalized(points[299]), 0.99)[0] == {"text": "299"}
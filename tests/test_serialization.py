@@ -0,0 +1,48 @@
+import json
+from array import array
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import serialization
+from app.core.serialization import dumps
+from app.main import create_app
+from app.schemas.chat import ChatResponse, ChatUsage
+
+VECTOR = array("f", [0.1, -2.5, 3.0e-8])
+
+
+def test_float32_arrays_encode_like_the_equivalent_float_lists():
+    content = {"embeddings": [VECTOR, [1.0, 2.0]], "usage": None}
+
+    assert json.loads(dumps(content)) == {"embeddings": [VECTOR.tolist(), [1.0, 2.0]], "usage": None}
+
+
+def test_pydantic_core_fallback_matches(monkeypatch):
+    monkeypatch.setattr(serialization, "_dumps", lambda content: serialization.pydantic_core.to_json(content, fallback=serialization._to_list))
+
+    assert json.loads(dumps({"embeddings": [VECTOR]})) == {"embeddings": [VECTOR.tolist()]}
+
+
+def test_models_are_encoded_without_revalidation():
+    response = ChatResponse.model_construct(text="hi", model="m", latency_ms=1.5, request_id="r", usage=ChatUsage(input_tokens=1), cached=False, trimmed=None)
+
+    assert json.loads(dumps(response)) == json.loads(response.model_dump_json())
+
+
+def test_unsupported_types_are_rejected():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_routes_return_the_documented_json():
+    client = TestClient(create_app())
+
+    chat = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "Hello"}]})
+    embeddings = client.post("/v1/embeddings", json={"input": ["a", "abc"], "model": "test-embed-model"})
+
+    assert chat.headers["content-type"] == "application/json"
+    assert ChatResponse.model_validate(chat.json()).text
+    assert embeddings.headers["content-type"] == "application/json"
+    assert embeddings.json()["embeddings"] == [[1.0, 2.0, 3.0, 4.0], [3.0, 4.0, 5.0, 6.0]]
+    assert set(embeddings.json()) == {"embeddings", "model", "latency_ms", "request_id", "usage"}
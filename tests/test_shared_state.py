@@ -0,0 +1,95 @@
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from app.core.cache import InMemoryCache
+from app.core.errors import RateLimited
+from app.core.metrics import GatewayMetrics
+from app.core.rate_limit import RateLimiterRegistry
+from app.core.shared_state import (
+    MetricsPublisher,
+    SharedCache,
+    SharedRateLimiterRegistry,
+    SharedStateClient,
+    SharedStateServer,
+)
+
+
+@pytest_asyncio.fixture
+async def state_socket(tmp_path: Path) -> AsyncIterator[str]:
+    path = str(tmp_path / "s.sock")
+    server = SharedStateServer(path, cache=InMemoryCache(), rate_limiters=RateLimiterRegistry(rpm=2, max_wait_s=0.0))
+    await server.start()
+    yield path
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_entry_written_by_one_worker_is_a_hit_in_another(state_socket: str):
+    worker_a, worker_b = SharedStateClient(state_socket), SharedStateClient(state_socket)
+    cache_a = SharedCache(worker_a, fallback=InMemoryCache())
+    cache_b = SharedCache(worker_b, fallback=InMemoryCache())
+
+    assert await cache_a.get("k") is None
+    await cache_a.set("k", {"text": "hello"})
+    await worker_a.call("ping")  # set is fire-and-forget; this orders it before the read below
+
+    assert await cache_b.get("k") == {"text": "hello"}
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_quota_is_shared_across_workers(state_socket: str):
+    worker_a, worker_b = SharedStateClient(state_socket), SharedStateClient(state_socket)
+    limiter_a = SharedRateLimiterRegistry(worker_a, rpm=2, max_wait_s=0.0).get("openai", "m")
+    limiter_b = SharedRateLimiterRegistry(worker_b, rpm=2, max_wait_s=0.0).get("openai", "m")
+
+    await limiter_a.acquire(0)
+    await limiter_b.acquire(0)
+    with pytest.raises(RateLimited):
+        await limiter_a.acquire(0)
+
+    assert limiter_a.rejected == 1
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_metrics_render_sums_all_workers(state_socket: str):
+    metrics_a, metrics_b = GatewayMetrics(), GatewayMetrics()
+    publisher_a = MetricsPublisher(SharedStateClient(state_socket), metrics_a)
+    publisher_b = MetricsPublisher(SharedStateClient(state_socket), metrics_b)
+    publisher_b.worker = "other"
+
+    metrics_a.http_requests.inc(("/v1/chat", "POST", "200", ""), 3)
+    metrics_b.http_requests.inc(("/v1/chat", "POST", "200", ""), 4)
+    metrics_a.provider_latency.observe(0.01, ("chat", "openai", "m"))
+    metrics_b.provider_latency.observe(0.02, ("chat", "openai", "m"))
+    await publisher_b.push()
+
+    rendered = await publisher_a.render()
+
+    assert 'gateway_http_requests_total{route="/v1/chat",method="POST",status="200",code=""} 7' in rendered
+    assert 'gateway_provider_request_duration_seconds_count{operation="chat",provider="openai",model="m"} 2' in rendered
+
+
+@pytest.mark.asyncio
+async def test_unreachable_server_falls_back_to_per_process_state(tmp_path: Path):
+    client = SharedStateClient(str(tmp_path / "missing.sock"))
+    cache = SharedCache(client, fallback=InMemoryCache())
+    limiter = SharedRateLimiterRegistry(client, rpm=1, max_wait_s=0.0).get("openai", "m")
+
+    await cache.set("k", {"text": "local"})
+    assert await cache.get("k") == {"text": "local"}
+
+    await limiter.acquire(0)
+    with pytest.raises(RateLimited):
+        await limiter.acquire(0)
+
+    metrics = GatewayMetrics()
+    metrics.http_in_flight.inc()
+    assert await MetricsPublisher(client, metrics).render() == metrics.render()
+    assert client.stats()["connected"] is False
@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.errors import ContextLengthExceeded
+from app.core.tokens import ApproximateEncoder, TokenCounter
+from app.main import create_app
+from app.providers.fake_provider import FakeChatProvider
+from app.schemas.chat import ChatMessage, ChatRequest
+from app.services.chat_service import ChatService
+
+LONG = " word" * 4000  # 4000 tokens, at the 20k-character message cap
+
+
+class CountingChat(FakeChatProvider):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    async def generate(self, messages: list[ChatMessage], model: str, temperature: float, max_output_tokens: int) -> dict:
+        self.calls += 1
+        return await super().generate(messages, model, temperature, max_output_tokens)
+
+
+def test_approximate_encoder_splits_like_bpe_pretokenizers():
+    encoder = ApproximateEncoder("o200k_base")
+
+    assert encoder.count("Hello world") == 2
+    assert encoder.count("What is your refund policy?") == 6
+    assert encoder.count("1234567") == 3
+    assert encoder.count(LONG) == 4000
+    # CJK runs: one token per character, without the long-word surcharge on top
+    assert encoder.count("退款政策" * 250) == 1000
+    assert encoder.count("Refund 政策 policy") == 4
+
+
+def test_repeated_messages_are_counted_once():
+    counter = TokenCounter()
+    system = ChatMessage(role="system", content="You are a helpful assistant. " * 50)
+
+    first = counter.count_chat([system, ChatMessage(role="user", content="hi")], "gpt-4o")
+    second = counter.count_chat([system, ChatMessage(role="user", content="hello")], "gpt-4o")
+
+    assert first == second
+    assert counter.stats()["memo_hits"] == 1
+    assert counter.stats()["encoders"] == {"o200k_base": "approximate"}
+
+
+def test_context_window_is_matched_by_longest_prefix_and_overridable():
+    counter = TokenCounter(context_windows={"my-model": 32_768})
+
+    assert counter.context_window("gpt-4-0613") == 8_192
+    assert counter.context_window("gpt-4-turbo-2024-04-09") == 128_000
+    assert counter.context_window("gpt-4o-mini") == 128_000
+    assert counter.context_window("my-model-v2") == 32_768
+    assert counter.context_window("test-model") is None
+
+
+@pytest.mark.asyncio
+async def test_oversized_prompt_is_rejected_before_the_upstream_call():
+    upstream = CountingChat()
+    service = ChatService(provider=upstream, tokens=TokenCounter())
+    request = ChatRequest(messages=[ChatMessage(role="user", content=LONG)] * 3, model="gpt-4")
+
+    with pytest.raises(ContextLengthExceeded) as exc_info:
+        await service.chat(request)
+
+    assert upstream.calls == 0
+    assert exc_info.value.details == {"prompt_tokens": 12_015, "max_output_tokens": 256, "context_window": 8_192}
+
+
+@pytest.mark.asyncio
+async def test_estimated_counts_leave_a_margin_before_rejecting():
+    upstream = CountingChat()
+    service = ChatService(provider=upstream, tokens=TokenCounter(context_windows={"small": 4_200}))
+
+    # ~4007 estimated prompt tokens + 256 output is over 4200, but within the 10% allowance
+    await service.chat(ChatRequest(messages=[ChatMessage(role="user", content=LONG)], model="small"))
+
+    assert upstream.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cjk_prompt_under_the_window_is_not_rejected():
+    upstream = CountingChat()
+    service = ChatService(provider=upstream, tokens=TokenCounter(context_windows={"small": 1_000}))
+
+    await service.chat(ChatRequest(messages=[ChatMessage(role="user", content="退款政策" * 240)], model="small", max_output_tokens=32))
+    # Estimated over the window, but an estimate of non-ASCII text is no grounds for a hard rejection
+    await service.chat(ChatRequest(messages=[ChatMessage(role="user", content="退款政策" * 300)], model="small", max_output_tokens=32))
+
+    assert upstream.calls == 2
+
+
+def test_endpoint_reports_context_errors_and_estimated_usage():
+    client = TestClient(create_app())
+
+    too_long = client.post("/v1/chat", json={"messages": [{"role": "user", "content": LONG}] * 3, "model": "gpt-4", "stream": True})
+    ok = client.post("/v1/chat", json={"messages": [{"role": "user", "content": "Hello world"}], "model": "gpt-4"})
+
+    assert too_long.status_code == 400
+    assert too_long.json()["error"]["code"] == "CONTEXT_LENGTH_EXCEEDED"
+    assert ok.json()["usage"] == {"input_tokens": 9, "output_tokens": 4, "total_tokens": 13}